@@ -0,0 +1,49 @@
+import datetime
+import itertools
+from collections import deque
+
+class Chat():
+    """
+    Chat of a game.  Only the last size messages are kept (ring buffer),
+    every message gets a unique id counting up from 1 such that clients
+    can page through the history by id.
+    """
+
+    def __init__(self, size=200):
+        self.size = size
+        self.messages = deque(maxlen=size)
+        self.message_id = 0     # id of the latest message
+
+    def add_message(self, sender, text):
+        self.message_id += 1
+        message = {
+            "id": self.message_id,
+            "sender": sender,
+            "text": text,
+            "time": datetime.datetime.now().strftime("%H:%M:%S")
+        }
+        self.messages.append(message)
+        return message
+
+    def get_history(self, before_id=None, limit=50):
+        """
+        Returns up to limit messages with an id smaller than before_id
+        (the latest messages if before_id is None), oldest first:
+            {"messages": [message], "hasMore": (bool)}
+        hasMore is True if older messages are still kept.
+        """
+        if not self.messages:
+            return {"messages": [], "hasMore": False}
+
+        first_id = self.messages[0]["id"]
+        if before_id is None or before_id > self.message_id:
+            before_id = self.message_id + 1
+
+        # the ids are consecutive, thus the index follows from the id
+        end = max(before_id - first_id, 0)
+        start = max(end - limit, 0)
+
+        return {
+            "messages": list(itertools.islice(self.messages, start, end)),
+            "hasMore": start > 0
+        }
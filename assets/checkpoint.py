@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import struct
+
+logger = logging.getLogger("backend")
+
+# Binary format of a checkpoint, a compact encoding of Inegleit.to_json()
+# together with the number of moves it contains and the position in the
+# event log where the commands after them start.  All integers are little
+# endian, cards and players are stored by id:
+#
+#   header      : magic b"INEG", format version (B), moves (I), log
+#                 offset (Q, bytes), state version (I), unique_id (H), n_players (H), active_index
+#                 (H), can_choose_color (H, 0 for False), chosen color
+#                 (B, index in COLORS), penalty own/next (H H),
+#                 testcase (B, 0 for None), flags (B)
+#   strings     : game id, name, seed and initial seed, each as length
+#                 (H) and utf-8 bytes
+#   order       : number (B) and player ids (H)
+#   winners     : number (B) and player ids (H)
+#   players     : number (B), per player id (H), name (string), flags
+#                 (B), penalty (H), rank (H), hand changes (I), hand
+#                 version (I), and the
+#                 card ids of hand, added and removed cards, each as
+#                 number (B) and ids (B)
+#   deck        : card ids of the draw pile and the pile (number (B) and
+#                 ids (B)), the generator state: version (B), 625 words
+#                 (I) and gauss_next (B flag and d)
+
+MAGIC = b"INEG"
+FORMAT_VERSION = 3
+
+COLORS = ("", "red", "green", "blue", "yellow", "black")
+
+HEADER = struct.Struct("<4sBIQIHHHHBHHBB")
+PLAYER = struct.Struct("<HBHHII")
+
+GAME_FLAGS = ("gameStarted", "forward", "cardPickedUp")
+PLAYER_FLAGS = ("king", "said_uno", "has_received_initial_cards", "finished")
+
+
+def pack_flags(values, names):
+    return sum(1 << i for i, name in enumerate(names) if values[name])
+
+def unpack_flags(flags, names):
+    return {name: bool(flags >> i & 1) for i, name in enumerate(names)}
+
+
+class Writer():
+
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack(fmt, *values))
+
+    def string(self, value):
+        data = str(value).encode()
+        self.parts.append(struct.pack("<H", len(data)) + data)
+
+    def ids(self, values, fmt="B"):
+        self.parts.append(struct.pack("<B{}{}".format(len(values), fmt),
+                                      len(values), *values))
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+class Reader():
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def string(self):
+        n, = self.unpack("<H")
+        self.offset += n
+        return self.data[self.offset - n:self.offset].decode()
+
+    def ids(self, fmt="B"):
+        n, = self.unpack("<B")
+        return list(self.unpack("<{}{}".format(n, fmt)))
+
+
+def optional_int(value):
+    return None if value in ("", "None") else int(value)
+
+def pack(game, moves, log_offset=0):
+    """
+    Returns the checkpoint of game, a dict returned by Inegleit.to_json(),
+    containing moves recorded commands.  log_offset is the size of the
+    event log containing them, see EventLog.
+    """
+    writer = Writer()
+    writer.parts.append(HEADER.pack(
+        MAGIC, FORMAT_VERSION, moves, log_offset, game["version"], game["uniqueId"],
+        game["nPlayers"], game["activeIndex"], game["canChooseColor"] or 0,
+        COLORS.index(game["chosenColor"]), game["penalty"]["own"],
+        game["penalty"]["next"], game["testcase"] or 0,
+        pack_flags(game, GAME_FLAGS)))
+    for value in (game["gameId"], game["name"], game["seed"],
+                  game["initialSeed"]):
+        writer.string(value)
+    writer.ids(game["order"], "H")
+    writer.ids(game["winners"], "H")
+
+    writer.pack("<B", len(game["players"]))
+    for player in game["players"]:
+        attr = player["attr"]
+        writer.parts.append(PLAYER.pack(
+            attr["id"], pack_flags(attr, PLAYER_FLAGS), attr["penalty"],
+            attr["rank"], player["handChanges"], player["handVersion"]))
+        writer.string(attr["name"])
+        writer.ids(attr["hand"])
+        writer.ids(player["added"])
+        writer.ids(player["removed"])
+
+    deck = game["deck"]
+    writer.ids(deck["draw"])
+    writer.ids(deck["pile"])
+    version, internal, gauss_next = deck["rng"]
+    writer.pack("<B{}I".format(len(internal)), version, *internal)
+    writer.pack("<Bd", gauss_next is not None, gauss_next or 0.0)
+    return writer.getvalue()
+
+def unpack(data):
+    """
+    Returns (game, moves) of a checkpoint written by pack(), game can be
+    restored by Inegleit.from_json().
+    """
+    reader = Reader(data)
+    (magic, format_version, moves, _, version, unique_id, n_players,
+     active_index, can_choose_color, color, own, next_penalty, testcase,
+     flags) = reader.unpack(HEADER.format)
+
+    game_id, name, seed, initial_seed = [reader.string() for _ in range(4)]
+    game = {
+        "gameId": optional_int(game_id),
+        "name": name,
+        "seed": optional_int(seed),
+        "initialSeed": optional_int(initial_seed),
+        "testcase": testcase or None,
+        "uniqueId": unique_id,
+        "nPlayers": n_players,
+        "order": reader.ids("H"),
+        "winners": reader.ids("H"),
+        "activeIndex": active_index,
+        "canChooseColor": can_choose_color or False,
+        "chosenColor": COLORS[color],
+        "penalty": {"own": own, "next": next_penalty},
+        "version": version,
+    }
+    game.update(unpack_flags(flags, GAME_FLAGS))
+
+    game["players"] = []
+    for _ in range(reader.unpack("<B")[0]):
+        player_id, player_flags, penalty, rank, hand_changes, hand_version = \
+            reader.unpack(PLAYER.format)
+        attr = {"id": player_id, "name": reader.string(), "hand": reader.ids(),
+                "penalty": penalty, "rank": rank}
+        attr.update(unpack_flags(player_flags, PLAYER_FLAGS))
+        game["players"].append({"attr": attr, "added": reader.ids(),
+                                "removed": reader.ids(),
+                                "handChanges": hand_changes,
+                                "handVersion": hand_version})
+
+    draw = reader.ids()
+    pile = reader.ids()
+    rng_version, = reader.unpack("<B")
+    internal = list(reader.unpack("<625I"))
+    has_gauss, gauss_next = reader.unpack("<Bd")
+    game["deck"] = {"draw": draw, "pile": pile,
+                    "rng": [rng_version, internal,
+                            gauss_next if has_gauss else None]}
+    return game, moves
+
+def log_position(data):
+    """
+    Returns (moves, log offset) of a checkpoint without unpacking it.
+    """
+    magic, format_version = struct.unpack_from("<4sB", data)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError("not a checkpoint of format {}".format(FORMAT_VERSION))
+    return HEADER.unpack_from(data)[2:4]
+
+
+class Checkpointer():
+    """
+    Writes the commands and checkpoints of the changed games to the event
+    log in the background.  Routes only mark a game as dirty, every
+    interval seconds the new commands and checkpoints of the dirty games
+    are taken on the event loop and written by an executor thread.  The
+    cost of a round depends on the number of games that changed, not on
+    the number of running games.
+    """
+
+    def __init__(self, event_log, interval=1.0, executor=None):
+        self.event_log = event_log
+        self.interval = interval
+        self.executor = executor
+
+        self.dirty = {}     # {game_id: Inegleit object} changed games
+        self.closed = set() # ids of games closed while they are written
+        self.writing = set()
+        self.lock = None    # created in start() on the running event loop
+        self.task = None
+
+        # metrics
+        self.rounds = 0
+        self.written = 0
+        self.failed = 0
+
+    def mark(self, inegleit):
+        self.dirty[inegleit.game_id] = inegleit
+
+    def discard(self, game_id):
+        # a closed game must not be written again by a running round
+        self.dirty.pop(game_id, None)
+        if game_id in self.writing:
+            self.closed.add(game_id)
+
+    def start(self):
+        self.lock = asyncio.Lock()
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        # writes the games changed since the last round, e.g. on SIGTERM
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if not self.dirty:
+                return
+            dirty, self.dirty = self.dirty, {}
+
+            # taken in one go, the executor appends the commands of a
+            # game before writing its checkpoint
+            updates = {game_id: self.event_log.prepare(inegleit)
+                       for game_id, inegleit in dirty.items()}
+
+            self.writing = set(updates)
+            loop = asyncio.get_event_loop()
+            try:
+                await loop.run_in_executor(self.executor, self.write, updates)
+            finally:
+                for game_id in self.closed:
+                    self.event_log.remove(game_id)
+                self.closed = set()
+                self.writing = set()
+            self.rounds += 1
+
+    def write(self, updates):
+        # runs in the executor
+        for game_id, update in updates.items():
+            try:
+                self.event_log.write(game_id, *update)
+                self.written += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Checkpoint of game %s failed", game_id)
+
+    def get_stats(self):
+        return {
+            "interval": self.interval,
+            "rounds": self.rounds,
+            "written": self.written,
+            "failed": self.failed,
+            "dirty": len(self.dirty),
+        }
@@ -1,5 +1,6 @@
 import json
 import random
+from array import array
 
 class Deck():
     """
@@ -7,67 +8,37 @@ class Deck():
 
     N(int)          : number of cards in the deck
     allcards(list)  : list containing 108 Card(class) in order
-    current_cards   : list of length <108 storing the index of the current cards
-    (list)            in the deck in allcards
-                      e.g. [0,1] corresponds to the two cards "red 0" and "green 0"
-                      according to the order of creation
+    draw(array)     : preallocated array of the N card ids, the draw pile
+                      are the first n_draw ids with the top card at the end
+                      e.g. draw[:2] == [0,1] means "green 0" is dealt
+                      first and "red 0" is the last card of the draw pile
+    n_draw(int)     : cursor, number of cards left in the draw pile
     pile(list)      : list of already played cards
+    rng(Random)     : random generator of the deck, seeded with seed
                 
     Class methods:
 
     __init__(seed)  : creates all Card instances and shuffles them
-    shuffle_cards() : applies a random permutation to the current_cards
+    shuffle_cards() : applies a random permutation to the draw pile
     get_card(i)     : helper function that returns the Card(class) corresponding
                       to the index i
     deal_cards(n)   : deals the n top cards e.g. at the beginning of the game, 
                       after +2/+4 cards, or after a player is unable to play
-                      returns n instances of Card(class)
+                      returns n instances of Card(class), fewer if there
+                      are not enough cards left in the draw pile and pile
     play_card(i)    : attemts to play the Card with index i, returns True if it
                       is possible and adds it to the pile, and False otherwise
     """
     def __init__(self, seed=None, testcase=None):
-        if seed:
-            random.seed(seed)
-        self.N = 0 # anzahl karten
-        self.allcards = [] # verdeckter stapel
+        # own generator, seeding it does not affect other decks
+        self.rng = random.Random(seed)
+        self.allcards = create_cards() # verdeckter stapel
+        self.N = len(self.allcards) # anzahl karten
         self.pile = [] # offener stapel
 
-        """
-        For colored cards:
-        0-9     : normal numbers
-        10      : reverse direction
-        11      : skip player
-        12      : +2 
-        =============================
-        
-        For black cards:
-        0       : choose color
-        1       : +4 and choose color
-
-        =============================
-        In the end there is a list of 108 Cards.
-        """
-
-        # creates all colored cards
-        for color in ["red", "green", "blue", "yellow"]:
-            # add a single zero per color
-            self.allcards.append(Card(color, 0, self.N))
-            self.N += 1
-            # add two of each kind
-            for i in range(12):
-                self.allcards.append(Card(color, i+1, self.N))
-                self.allcards.append(Card(color, i+1, self.N+1))
-                self.N += 2
-        # creates the black cards
-        for i in range(4): 
-            self.allcards.append(Card("black", 0, self.N)) # choose color
-            self.N += 1
-        for i in range(4):
-            self.allcards.append(Card("black", 1, self.N)) # +4 card
-            self.N += 1
-
-        # make a copy of the deck
-        self.current_cards = self.allcards.copy()
+        # the ids of all cards, the array is never reallocated
+        self.draw = array('B', range(self.N))
+        self.n_draw = self.N
 
         # apply random permutation (possibility to select a seed)
         self.shuffle_cards()
@@ -78,44 +49,99 @@ class Deck():
 
     def place_starting_card(self):
         # places the starting card:
-        self.pile.append(self.current_cards.pop())
+        cards = self.deal_cards(1)
+        self.pile.extend(cards)
         
         # avoids having a black starting card
-        if self.top_card().attr["color"] == "black":
+        if cards and self.top_card().attr["color"] == "black":
             self.place_starting_card()
 
     def get_card(self, i):
         return self.allcards[i]
     
     def shuffle_cards(self):
-        random.shuffle(self.current_cards)
+        self.shuffle_range(0, self.n_draw)
+
+    def shuffle_range(self, start, stop):
+        ids = self.draw[start:stop].tolist()
+        self.shuffle_ids(ids)
+        self.draw[start:stop] = array('B', ids)
+
+    def shuffle_ids(self, ids):
+        # shuffles the list in place by sorting it by random keys, which
+        # is faster than a Fisher-Yates shuffle in python (also one
+        # swapping the ids in the array)
+        rand = self.rng.random
+        ids.sort(key=lambda i: rand())
 
     def top_card(self):
         if len(self.pile) > 0:
             return self.pile[-1]
         else:
             # placeholder card
-            return Card('white', 'no card yet', '-1')
+            return PLACEHOLDER
+
+    def reshuffle_pile(self):
+        """
+        Puts the pile except for the top card shuffled under the remaining
+        cards of the draw pile.  Only the ids of the returned cards are
+        shuffled, the remaining cards keep their order.
+        """
+        k = len(self.pile) - 1
+        if k <= 0:
+            return
+
+        draw = self.draw
+        n_draw = self.n_draw
+
+        # make room at the bottom, then copy the shuffled ids of the pile
+        # there
+        ids = [card.attr["id"] for card in self.pile[:k]]
+        self.shuffle_ids(ids)
+        draw[k:k + n_draw] = draw[:n_draw]
+        draw[:k] = array('B', ids)
+        del self.pile[:k]
+
+        self.n_draw = n_draw + k
 
     def deal_cards(self, n):
-        # checks if there are enough cards in the deck otherwise the pile is
-        # added to the currentcards and reshuffled, keeping the top card
-        if n < len(self.current_cards):
-            cards = [self.current_cards.pop() for i in range(n)]
-            return cards
-        else:
-            topcard = self.pile.pop()
-            self.current_cards.extend(self.pile)
-            self.pile = [topcard]
-            self.shuffle_cards()
-            self.deal_cards(n)
+        # checks if there are enough cards in the deck otherwise the pile
+        # (except for the top card) is put under the draw pile
+        if n > self.n_draw:
+            self.reshuffle_pile()
+            n = min(n, self.n_draw)
+
+        # the top n cards, a single card without slicing the array
+        stop = self.n_draw
+        self.n_draw = stop - n
+        allcards = self.allcards
+        if n == 1:
+            return [allcards[self.draw[stop - 1]]]
+        return [allcards[i] for i in self.draw[stop - n:stop]]
             
     def to_json(self):
+        # the cards are stored by id, the draw pile with the top card at
+        # the end, together with the state of the generator
+        version, internal, gauss_next = self.rng.getstate()
         return {
-            'stack' : [card.to_json() for card in self.allcards],
-            'pile': [card.to_json() for card in self.pile]
+            'draw': self.draw[:self.n_draw].tolist(),
+            'pile': [card.attr["id"] for card in self.pile],
+            'rng': [version, list(internal), gauss_next],
         }
 
+    def from_json(self, deck):
+        # restores a deck stored by to_json() and returns it
+        version, internal, gauss_next = deck['rng']
+        self.rng.setstate((version, tuple(internal), gauss_next))
+
+        # the dealt cards are on the hands, their order does not matter
+        n_draw = len(deck['draw'])
+        dealt = set(range(self.N)) - set(deck['draw'])
+        self.draw = array('B', deck['draw'] + sorted(dealt))
+        self.n_draw = n_draw
+        self.pile = [self.allcards[i] for i in deck['pile']]
+        return self
+
     def play_card(self, card):
         self.pile.append(card)
 
@@ -126,17 +152,102 @@ class Deck():
         if testcase == 1:
             card_ids = [104, 105, 11, 12, 13, 14, 15, 16, 17, 106, 107, 77]
             cards = [self.get_card(i) for i in card_ids]
-            print("TEST / Added " + str([str(card) for card in cards]) + " to deck.")
-            self.current_cards.extend(cards)
-
-    # def from_json(self, deck):
-    #     self.allcards = []
-    #     self.pile = []
-    #     for card in deck['stack']:
-    #         self.allcards.append( Card(card['color'], card['number'], card['uid']))
-    #     for card in deck['pile']:
-    #         self.pile.append( Card(card['color'], card['number'], card['uid']))
-   
+            print("TEST / Moved " + str([str(card) for card in cards]) + " to the top of the deck.")
+
+            # the last card is on top
+            ids = [i for i in self.draw if i not in card_ids] + card_ids
+            self.draw[:] = array('B', ids)
+
+
+def create_cards():
+    """
+    For colored cards:
+    0-9     : normal numbers
+    10      : reverse direction
+    11      : skip player
+    12      : +2 
+    =============================
+    
+    For black cards:
+    0       : choose color
+    1       : +4 and choose color
+
+    =============================
+    In the end there is a list of 108 Cards, the index of a card in
+    the list is its id.
+    """
+    N = 0
+    cards = []
+
+    # creates all colored cards
+    for color in ["red", "green", "blue", "yellow"]:
+        # add a single zero per color
+        cards.append(Card(color, 0, N))
+        N += 1
+        # add two of each kind
+        for i in range(12):
+            cards.append(Card(color, i+1, N))
+            cards.append(Card(color, i+1, N+1))
+            N += 2
+    # creates the black cards
+    for i in range(4): 
+        cards.append(Card("black", 0, N)) # choose color
+        N += 1
+    for i in range(4):
+        cards.append(Card("black", 1, N)) # +4 card
+        N += 1
+
+    return cards
+
+
+# Rules comparing the attributes of two cards, the Card methods use the
+# precomputed tables below instead.
+
+def check_playable(card, top_card):
+    """
+    tests if card can be placed upon top card on the staple
+    """
+    if card.attr["color"] == "black":
+        return True
+    elif card.attr["color"] == top_card.attr["color"] or card.attr["number"] == top_card.attr["number"]:
+        return True
+    return False
+
+def check_inegleitable(card, top_card):
+    """ 
+    tests if the card can be inegleit
+    """
+    if card.attr["color"] == top_card.attr["color"] and card.attr["number"] == top_card.attr["number"]:
+        return True
+    if card.attr["number"] == 9 and top_card.attr["number"] == 6:
+        return True        
+    return False
+
+def check_raise_penalty(card, top_card):
+    if card.attr["color"] == "black" and top_card.attr["color"] == "black" and card.attr["number"] == 1 and top_card.attr["number"] == 1:
+        return True
+    if card.attr["number"] == 12 and top_card.attr["number"] == 12:
+        return True
+    return False
+
+def build_row(rule, top_card, cards):
+    """
+    Returns a bitset (int) of the ids of the cards for which
+    rule(card, top_card) is True.
+    """
+    bits = 0
+    for card in cards:
+        if rule(card, top_card):
+            bits |= 1 << card.attr["id"]
+    return bits
+
+def build_table(rule, cards):
+    # the rows of all cards, indexed by the id of the top card
+    return [build_row(rule, top_card, cards) for top_card in cards]
+
+# filled at the end of the module
+PLAYABLE = INEGLEITABLE = RAISES_PENALTY = ()
+
 
 class Card():
     def __init__(self, color, number, id):
@@ -145,17 +256,27 @@ class Card():
             "color": color,
             "number": number
         }
+        # position of the card in the bitsets of the tables, the
+        # placeholder card has a string id and no bit
+        self.bit = 1 << id if isinstance(id, int) else 0
+
+        # rows of the compatibility tables i.e. bitsets of the ids of the
+        # cards that can be played on, inegleit on, or raise the penalty
+        # of this card
+        if isinstance(id, int) and id < len(PLAYABLE):
+            self.playable_cards = PLAYABLE[id]
+            self.inegleitable_cards = INEGLEITABLE[id]
+            self.raising_cards = RAISES_PENALTY[id]
+        else:
+            self.playable_cards = 0
+            self.inegleitable_cards = 0
+            self.raising_cards = 0
 
     def playable(self, top_card):
         """
         tests if this card (self) can be placed upon top card on the staple
         """
-
-        if self.attr["color"] == "black":
-            return True
-        elif self.attr["color"] == top_card.attr["color"] or self.attr["number"] == top_card.attr["number"]:
-            return True
-        return False
+        return top_card.playable_cards & self.bit != 0
         
     # def to_json(self):
     #     return self.attr
@@ -168,18 +289,10 @@ class Card():
         """ 
         tests if the card can be inegleit
         """
-        if self.attr["color"] == top_card.attr["color"] and self.attr["number"] == top_card.attr["number"]:
-            return True
-        if self.attr["number"] == 9 and top_card.attr["number"] == 6:
-            return True        
-        return False
+        return top_card.inegleitable_cards & self.bit != 0
 
     def able_to_raise_penalty(self, top_card):
-        if self.attr["color"] == "black" and top_card.attr["color"] == "black" and self.attr["number"] == 1 and top_card.attr["number"] == 1:
-            return True
-        if self.attr["number"] == 12 and top_card.attr["number"] == 12:
-            return True
-        return False
+        return top_card.raising_cards & self.bit != 0
 
     def __str__(self):
         if self.attr["color"] == "black":
@@ -197,3 +310,16 @@ class Card():
             text = str(self.attr["number"])
 
         return f'{self.attr["color"]} {text} [{self.attr["id"]}]'
+
+
+# Compatibility tables of all 108 cards, built once per process.
+# e.g. PLAYABLE[top_id] >> card_id & 1 tells if card_id can be played on
+# top_id.  The cards created from now on carry their rows.
+_cards = create_cards()
+PLAYABLE = build_table(check_playable, _cards)
+INEGLEITABLE = build_table(check_inegleitable, _cards)
+RAISES_PENALTY = build_table(check_raise_penalty, _cards)
+
+# top card before the game started
+PLACEHOLDER = Card('white', 'no card yet', '-1')
+PLACEHOLDER.playable_cards = build_row(check_playable, PLACEHOLDER, _cards)
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+
+from .game import Inegleit
+from .checkpoint import log_position, pack, unpack
+
+logger = logging.getLogger("backend")
+
+class EventLog():
+    """
+    Stores the games on disk such that they survive a restart of the
+    server.  Every game has two files in directory:
+
+    {game_id}.log       : append-only log of the recorded commands of the
+                          game (see game.recorded()), one JSON line
+                          [command, [args]] per command
+    {game_id}.snapshot  : checkpoint of the game at some point of the
+                          log in the binary format of checkpoint.py,
+                          together with the size of the log at that point
+
+    A game is restored from its snapshot and the commands logged after
+    it, read from the end of the log the snapshot contains, so the
+    restore reads and replays at most snapshot_interval commands no
+    matter how long the game has been running.
+    Without a Checkpointer sync() appends the commands and writes a
+    snapshot every snapshot_interval commands while handling the request.
+    A Checkpointer takes the new commands and the snapshot with prepare()
+    on the event loop and writes them with write() in its executor.
+    """
+
+    def __init__(self, directory, snapshot_interval=100):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.created = False    # the directory is created on the first write
+
+        self.logged = {}        # {game_id: number of commands in the log}
+        self.sizes = {}         # {game_id: size of the log in bytes}
+        self.snapshots = {}     # {game_id: commands in the snapshot}
+
+    def log_path(self, game_id):
+        return os.path.join(self.directory, "{}.log".format(game_id))
+
+    def snapshot_path(self, game_id):
+        return os.path.join(self.directory, "{}.snapshot".format(game_id))
+
+    def sync(self, inegleit):
+        """
+        Appends the commands of the game that are not logged yet and
+        writes a new snapshot every snapshot_interval commands.  Called
+        after every request changing the game if there is no Checkpointer.
+        """
+        game_id = inegleit.game_id
+        lines, moves = self.pending(inegleit)
+        self.append(game_id, lines, moves)
+
+        if game_id not in self.snapshots or (
+                self.snapshot_interval and
+                moves - self.snapshots[game_id] >= self.snapshot_interval):
+            self.write_snapshot(inegleit)
+
+    def get_logged(self, inegleit):
+        # the number of logged commands, the log of a game that forgot
+        # its first commands starts after them
+        return self.logged.get(inegleit.game_id, inegleit.moves_offset)
+
+    def pending(self, inegleit):
+        # returns the lines of the commands not logged yet and the number
+        # of logged commands after appending them
+        lines = "".join(json.dumps(move, separators=(",", ":")) + "\n"
+                        for move in inegleit.moves_since(self.get_logged(inegleit)))
+        return lines.encode(), inegleit.count_moves()
+
+    def append(self, game_id, lines, moves):
+        if lines:
+            self.create_directory()
+            size = self.get_size(game_id)
+            with open(self.log_path(game_id), "ab") as logfile:
+                logfile.write(lines)
+            self.sizes[game_id] = size + len(lines)
+        self.logged[game_id] = moves
+
+    def prepare(self, inegleit):
+        """
+        Returns the new commands of the game and a snapshot after them
+        for write(), taken at once on the event loop.
+        """
+        lines, moves = self.pending(inegleit)
+        data = pack(inegleit.to_json(), moves,
+                    self.get_size(inegleit.game_id) + len(lines))
+        return lines, moves, data
+
+    def write(self, game_id, lines, moves, data):
+        # runs in the executor of the Checkpointer, the snapshot is
+        # written after the commands it contains
+        self.append(game_id, lines, moves)
+        self.write_snapshot_data(game_id, data, moves)
+
+    def create_directory(self):
+        if not self.created:
+            os.makedirs(self.directory, exist_ok=True)
+            self.created = True
+
+    def get_size(self, game_id):
+        if game_id not in self.sizes:
+            path = self.log_path(game_id)
+            self.sizes[game_id] = os.path.getsize(path) if os.path.exists(path) else 0
+        return self.sizes[game_id]
+
+    def write_snapshot(self, inegleit):
+        # all commands of the game must be logged
+        moves = inegleit.count_moves()
+        self.write_snapshot_data(
+            inegleit.game_id,
+            pack(inegleit.to_json(), moves, self.get_size(inegleit.game_id)), moves)
+
+    def write_snapshot_data(self, game_id, data, moves):
+        # the snapshot is replaced atomically once it is on the disk, a
+        # crash while writing leaves the previous one.  The log is synced
+        # first such that no snapshot covers commands lost by a crash.
+        self.create_directory()
+        self.fsync_log(game_id)
+        path = self.snapshot_path(game_id)
+        with open(path + ".tmp", "wb") as outfile:
+            outfile.write(data)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(path + ".tmp", path)
+        self.snapshots[game_id] = moves
+
+    def fsync_log(self, game_id):
+        path = self.log_path(game_id)
+        if os.path.exists(path):
+            with open(path, "ab") as logfile:
+                os.fsync(logfile.fileno())
+
+    def read_log(self, game_id, offset=0, repair=True):
+        """
+        Returns the commands logged from offset (in bytes) on.  A line
+        torn by a crash while appending is cut off the file, without
+        repair the commands up to it are returned and the file is left
+        as it is.
+        """
+        moves = []
+        size = offset
+        path = self.log_path(game_id)
+        if not os.path.exists(path):
+            if repair:
+                self.sizes[game_id] = 0
+            return moves
+
+        with open(path, "rb") as logfile:
+            logfile.seek(offset)
+            for line in logfile:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("line not terminated")
+                    moves.append(json.loads(line.decode()))
+                except ValueError:
+                    if not repair:
+                        break
+                    logger.warning("Cut torn line off the log of game %s", game_id)
+                    with open(path, "r+b") as truncated:
+                        truncated.truncate(size)
+                    break
+                size += len(line)
+        if repair:
+            self.sizes[game_id] = min(size, os.path.getsize(path))
+        return moves
+
+    def load(self, game_id):
+        """
+        Restores the game with id game_id from its snapshot and the
+        commands logged after it.  The restored game only keeps these
+        commands (see Inegleit.forget_moves()).
+        """
+        with open(self.snapshot_path(game_id), "rb") as infile:
+            data = infile.read()
+        game, n = unpack(data)
+        _, offset = log_position(data)
+
+        moves = self.read_log(game_id, offset)
+        if self.sizes[game_id] < offset:
+            # the snapshot is the latest state of the game, the log lost
+            # commands it covers (e.g. the log was restored from an older
+            # backup)
+            logger.warning("Log of game %s is shorter than its snapshot, "
+                           "restored the snapshot without the tail", game_id)
+            inegleit = Inegleit.from_json(game, moves_offset=n)
+            self.logged[game_id] = n
+            self.write_snapshot(inegleit)
+            return inegleit
+
+        inegleit = Inegleit.from_json(game, moves_offset=n)
+        for command, args in moves:
+            inegleit.apply(command, args)
+
+        self.logged[game_id] = inegleit.count_moves()
+        self.snapshots[game_id] = n
+        logger.info("Restored game %s replaying %s of %s commands",
+                    game_id, len(moves), inegleit.count_moves())
+        return inegleit
+
+    def load_all(self):
+        """
+        Returns all stored games, games that cannot be restored are
+        skipped.
+        """
+        games = []
+        if not os.path.isdir(self.directory):
+            return games
+        for filename in sorted(os.listdir(self.directory)):
+            game_id, extension = os.path.splitext(filename)
+            if extension != ".snapshot" or not game_id.isdigit():
+                continue
+            try:
+                games.append(self.load(int(game_id)))
+            except Exception:
+                logger.exception("Could not restore game %s", game_id)
+        return games
+
+    def remove(self, game_id):
+        # deletes the files of a closed game
+        for path in (self.log_path(game_id), self.snapshot_path(game_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self.logged.pop(game_id, None)
+        self.sizes.pop(game_id, None)
+        self.snapshots.pop(game_id, None)
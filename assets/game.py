@@ -1,4 +1,6 @@
+import functools
 import logging
+import random
 
 import json
 
@@ -9,6 +11,30 @@ DEBUG = True
 
 logger = logging.getLogger("backend")
 
+# names of the recorded commands, the only methods a move log may call
+COMMANDS = set()
+
+def recorded(command):
+    """
+    Decorator of the commands changing the game.  Every call is appended
+    to the move log of the game as [name, [args]], such that the game can
+    be replayed from its seed (see Inegleit.replay()).  Denied requests
+    are recorded as well because some of them change the game too
+    e.g. the punishment for not saying UNO.  A command raising an error
+    is removed from the log again, it would raise in the replay as well.
+    """
+    COMMANDS.add(command.__name__)
+
+    @functools.wraps(command)
+    def wrapper(self, *args):
+        self.moves.append([command.__name__, list(args)])
+        try:
+            return command(self, *args)
+        except Exception:
+            self.moves.pop()
+            raise
+    return wrapper
+
 class Inegleit():
     """
     Uno game instance handling the game logic, the players, and the
@@ -20,17 +46,34 @@ class Inegleit():
     to play a card, the card has actually been played.  If the request
     is not valid, there is a {"message": (str)} keyword explaining the
     reason for the denied request.
+    Methods changing the game state publish the change which increases
+    the state version.  The router pushes only the changed fields to the
+    clients (see pop_delta()) and a full snapshot to joining clients.
     """
 
-    def __init__(self, seed=None, testcase=None):
-        # for testing purposes, only relevant for self.deck
+    def __init__(self, seed=None, testcase=None, game_id=None, name=""):
+        # identifies the game if several games are hosted at once
+        self.game_id = game_id
+        self.name = name
+
+        # every game shuffles with its own generator, without a seed a
+        # random one is drawn such that the game can always be replayed
+        if seed is None:
+            seed = random.getrandbits(32)
         self.seed = seed            # for randomized card shuffling
         self.testcase = testcase    # creates a certain deck config.
 
         if self.testcase:
             logger.warning("Initialized test case")
-        if self.seed:
-            logger.warning("Initialized game with seed")
+        logger.debug("Initialized game with seed %s", seed)
+
+        # commands changing the game since the start (see recorded()),
+        # together with the first seed they replay the game exactly.
+        # Commands stored elsewhere are forgotten (see forget_moves()),
+        # moves are the ones after the first moves_offset commands.
+        self.initial_seed = seed
+        self.moves = []
+        self.moves_offset = 0
 
         self.game_started = False
 
@@ -67,6 +110,106 @@ class Inegleit():
         # players that reached zero cards
         self.winners = []
 
+        # the version counts the changes of the game state, the
+        # published state is the state the clients know of
+        self.version = 0
+        self.published_version = 0
+        self.published_state = self.get_state()
+
+        # answers of get_legal_moves() for the state version
+        self.legal_moves_version = 0
+        self.legal_moves_cache = {}
+
+    def publish(self):
+        """
+        Called by every method changing the game state.
+        """
+        self.version += 1
+
+    def get_state(self):
+        """
+        Returns the game state visible to all players, the players are
+        stored by their id.
+        """
+        active_player = self.get_active_player()
+        return {
+            "topCard": self.get_top_card(),
+            "turn": self.get_active_player_id(),
+            "activePlayerName": active_player.attr["name"],
+            "penalty": self.penalty["own"] + active_player.attr["penalty"],
+            "colorChosen": self.chosen_color != "",
+            "chosenColor": self.chosen_color,
+            "forward": self.forward,
+            "started": self.game_started,
+            "players": {key: self.players[key].to_json()
+                        for key in self.players},
+        }
+
+    def pop_hand_deltas(self):
+        """
+        Returns the changes of the hands since the last call as
+        {player_id: delta}, see Player.pop_hand_delta().
+        """
+        deltas = {}
+        for player_id, player in self.players.items():
+            delta = player.pop_hand_delta()
+            if delta is not None:
+                deltas[player_id] = delta
+        return deltas
+
+    def get_snapshot(self):
+        """
+        Returns the whole game state e.g. for a client joining the game.
+        """
+        state = self.get_state()
+        state["players"] = list(state["players"].values())
+        return {"gameId": self.game_id, "version": self.version,
+                "state": state}
+
+    def pop_delta(self):
+        """
+        Returns the fields of the game state that changed since the last
+        call, or None if nothing changed:
+            {"version": (int), "since": (int), "changes": {field: value},
+             "players": {player_id: {field: value}},
+             "removedPlayers": [player_id]}
+        A client at version "since" applies the delta, a client at a
+        newer version ignores it, any other client needs a new snapshot.
+        """
+        if self.version == self.published_version:
+            return None
+
+        state = self.get_state()
+        old_state = self.published_state
+
+        changes = {key: value for key, value in state.items()
+                   if key != "players" and old_state.get(key) != value}
+
+        players = {}
+        for player_id, player in state["players"].items():
+            old_player = old_state["players"].get(player_id, {})
+            changed = {key: value for key, value in player.items()
+                       if old_player.get(key) != value}
+            if changed:
+                players[player_id] = changed
+
+        removed_players = [player_id for player_id in old_state["players"]
+                           if player_id not in state["players"]]
+
+        delta = {"version": self.version, "since": self.published_version}
+        if changes:
+            delta["changes"] = changes
+        if players:
+            delta["players"] = players
+        if removed_players:
+            delta["removedPlayers"] = removed_players
+
+        self.published_version = self.version
+        self.published_state = state
+
+        return delta
+
+    @recorded
     def add_player(self, name):
         """
         Answers requests to add a player.
@@ -86,7 +229,7 @@ class Inegleit():
 
         # check for empty string
         if not name:
-            logger.debug("{} is not a valid name".format(name))
+            logger.debug("%s is not a valid name", name)
             return {"requestValid": False, "message": "choose non-empty string"}
 
         # check for duplicate names
@@ -102,17 +245,19 @@ class Inegleit():
         self.n_players += 1
         self.order.append(player_id)
 
-        logger.info("Added player: {} [{}]".format(name, player_id))
+        logger.info("Added player: %s [%s]", name, player_id)
+        self.publish()
 
-        return {"requestValid": True, "player": p.attr}
+        return {"requestValid": True, "player": p.get_attr()}
 
+    @recorded
     def remove_player(self, player_id):
         """
         Removes a player and adds his cards to the pile. Handles special
         situations such as the player being active or currently choosing
         a color. Special situations are not thoroughly tested.
         """
-        logger.debug("Try to remove player ID {}".format(player_id))
+        logger.debug("Try to remove player ID %s", player_id)
 
         if not player_id in self.players.keys():
             logger.debug("player not found")
@@ -144,9 +289,11 @@ class Inegleit():
 
         message = "Removed player: {}".format(player)
         logger.info(message)
+        self.publish()
 
         return {"requestValid": True, "message": message, "name": player.attr["name"]}
 
+    @recorded
     def deal_cards(self, player_id, n):
         """
         Deals cards of the deck and returns them to the frontend
@@ -156,6 +303,8 @@ class Inegleit():
             message = "Player with id {} not found!".format(player_id)
             logger.critical(message)
             return {"requestValid": False, "message": message}
+        if n < 1:
+            return {"requestValid": False, "message": "deal at least one card"}
 
         # lifts the n top cards of the deck
         cards = self.deck.deal_cards(n)
@@ -163,12 +312,14 @@ class Inegleit():
         # adds them to the hand of the player with id=player_id
         self.players[player_id].add_cards(cards)
 
-        logger.info("Dealt {} cards to player {} [{}]".format(n, self.players[player_id].attr["name"], player_id))
+        logger.info("Dealt %s cards to player %s [%s]", n, self.players[player_id].attr["name"], player_id)
         if n == 7:
             self.players[player_id].attr['has_received_initial_cards'] = True
+        self.publish()
         return {"requestValid": True}
 
 
+    @recorded
     def start_game(self):
         """
         Currently all players can call start_game. Only place the top_card
@@ -180,8 +331,9 @@ class Inegleit():
             self.deck.place_starting_card()
             self.game_started = True
 
-            logger.info("Started game. {}'s turn".format(
-                        self.get_active_player().attr["name"]))
+            logger.info("Started game. %s's turn",
+                        self.get_active_player().attr["name"])
+            self.publish()
 
         return {"requestValid": True}
 
@@ -214,11 +366,9 @@ class Inegleit():
             new_index = (self.active_index + (2*self.forward-1)) % self.n_players
             self.active_index = new_index
 
-        message = "{}'s turn. {} penalty cards".format(
-            self.get_active_player().attr["name"],
-            self.penalty["own"]
-        )
-        logger.info(message)
+        logger.info("%s's turn. %s penalty cards",
+                    self.get_active_player().attr["name"], self.penalty["own"])
+        self.publish()
 
     def get_active_player_id(self):
         if not self.n_players:  # no players have joined
@@ -237,6 +387,15 @@ class Inegleit():
     def get_top_card(self):
         return self.deck.top_card().attr
 
+    def get_info(self):
+        # short description of the game e.g. for the list of open games
+        return {
+            "id": self.game_id,
+            "name": self.name,
+            "numberOfPlayers": len(self.players),
+            "started": self.game_started,
+        }
+
     def get_cards(self, player_id):
         return [card.attr for card in self.players[player_id].attr["hand"]]
 
@@ -244,6 +403,71 @@ class Inegleit():
         # helper method for readability
         return self.get_active_player_id() == player_id
 
+    def get_legal_moves(self, player_id):
+        """
+        Returns what the player can do right now, following the rules of
+        validate_move() without changing the game:
+            {"requestValid": True, "version": (int),
+             "play": [card_id], "inegleit": [card_id],
+             "canPickUp": (bool), "chooseColor": (bool),
+             "sayUnoFirst": (bool)}
+        "play" are the cards the active player can play, "inegleit" the
+        cards another player can inegleit.  If the player has to say UNO
+        before playing the last card, "play" is empty and "sayUnoFirst"
+        is set.  The answers are cached until the state changes.
+        """
+        if not player_id in self.players:
+            return {"requestValid": False, "message": "player not found"}
+
+        if self.legal_moves_version != self.version:
+            self.legal_moves_cache = {}
+            self.legal_moves_version = self.version
+
+        if player_id in self.legal_moves_cache:
+            return self.legal_moves_cache[player_id]
+
+        player = self.players[player_id]
+        hand = player.attr["hand"]
+        top_card = self.deck.top_card()
+
+        moves = {
+            "requestValid": True,
+            "version": self.version,
+            "play": [],
+            "inegleit": [],
+            "canPickUp": False,
+            "chooseColor": False,
+            "sayUnoFirst": False,
+        }
+
+        if not self.player_is_active(player_id):
+            moves["inegleit"] = hand.inegleit_moves(top_card)
+
+        elif not player.attr["finished"]:
+            missed_uno = len(hand) == 1 and not player.attr["said_uno"]
+
+            if self.penalty["own"]:
+                moves["play"] = hand.legal_moves(top_card, self.chosen_color,
+                                                 self.penalty["own"])
+            elif player.attr["penalty"]:
+                pass
+            elif missed_uno:
+                moves["sayUnoFirst"] = bool(
+                    hand.legal_moves(top_card, self.chosen_color))
+            else:
+                moves["play"] = hand.legal_moves(top_card, self.chosen_color)
+
+            moves["canPickUp"] = bool(self.penalty["own"]
+                                      or player.attr["penalty"]
+                                      or missed_uno
+                                      or not self.card_picked_up)
+
+        moves["chooseColor"] = (self.can_choose_color == player_id
+                                and self.player_is_active(player_id))
+
+        self.legal_moves_cache[player_id] = moves
+        return moves
+
     def validate_move(self, player, card, top_card):
         """
         Only internally called by both play_card() and play_black_card().
@@ -285,10 +509,8 @@ class Inegleit():
                     if not card.able_to_raise_penalty(top_card):
                         # this shouldn't happen!
                         logger.critical(
-                            "{} inegleited {} on {} while own penalty was {}"
-                            .format(
-                                player, card, top_card, self.penalty["own"]
-                            )
+                            "%s inegleited %s on %s while own penalty was %s",
+                            player, card, top_card, self.penalty["own"]
                         )
                     return {"requestValid": True,
                             "inegleit": True,
@@ -303,10 +525,8 @@ class Inegleit():
                     if not card.able_to_raise_penalty(top_card):
                         # this shouldn't happen!
                         logger.critical(
-                            "{} inegleited {} on {} while next penalty was {}"
-                            .format(
-                                player, card, top_card, self.penalty["next"]
-                            )
+                            "%s inegleited %s on %s while next penalty was %s",
+                            player, card, top_card, self.penalty["next"]
                         )
                         logger.debug("black +4 inegleit before choosing color")
                         return {"requestValid": True,
@@ -339,13 +559,10 @@ class Inegleit():
 
         # checks if the card can be played, argument chosen_color is only
         # relevant if a black card lies on top
-        if (top_card.attr["color"] == "black"
-          and not card.attr["color"] == "black"):
-                if card.attr["color"] == self.chosen_color:
-                    # reset color choice to empty
-                    self.chosen_color = ""
-                    return {"requestValid": True}
-                else:
+        on_chosen_color = (top_card.attr["color"] == "black"
+                           and not card.attr["color"] == "black")
+        if on_chosen_color:
+                if card.attr["color"] != self.chosen_color:
                     return {"requestValid": False,
                             "message": "play color {}".format(self.chosen_color)}
 
@@ -353,20 +570,26 @@ class Inegleit():
               # remove request to play a wrong card
             return {"requestValid": False, "message": "card not playable"}
 
+        response = {"requestValid": True}
         if len(player.attr["hand"]) == 1:
-            # the player has one card
+            # the player has one card, also on a chosen color
             if player.attr["said_uno"]:
-                return {"requestValid": True, "playerFinished": player.attr}
+                response["playerFinished"] = player.attr
             else:
                 # punish player for not saying uno
                 player.attr["penalty"] = 2
                 message = "{} didn't say uno, has to pick up two cards!".format(
                     player)
                 logger.info(message)
+                self.publish()
                 return {"requestValid": False, "message": message, "missedUno": player.attr["name"]}
 
-        return {"requestValid": True}
+        if on_chosen_color:
+            # reset color choice to empty
+            self.chosen_color = ""
+        return response
 
+    @recorded
     def play_card(self, player_id, card_id):
         """
         Method that handles request by players to play a certain card.
@@ -382,19 +605,21 @@ class Inegleit():
         player = self.players[player_id]
         top_card = self.deck.top_card()
 
-        logger.debug("Request from {} to play {} on {}".format(
-            player, card, top_card))
+        logger.debug("Request from %s to play %s on %s",
+                     player, card, top_card)
 
         if not player.has_card(card):
             # this shouldn't happen!
             response = "player does not have that card"
-            logger.critical("Move denied:" + response)
+            logger.critical("Move denied: %s", response)
             return {"requestValid": False, "message": response}
 
         # check if the move is valid and the card can be played
         response = self.validate_move(player, card, top_card)
 
-        logger.debug(response)
+        if logger.isEnabledFor(logging.DEBUG):
+            # a copy, response is changed below before the log is written
+            logger.debug("%s", dict(response))
 
         if not response["requestValid"]:
             return response
@@ -433,7 +658,8 @@ class Inegleit():
 
         self.deck.play_card(card)
         player.remove_card(card)
-        logger.info("{} played {}. ".format(player, card))
+        self.publish()
+        logger.info("%s played %s. ", player, card)
         logger.debug(message)
 
         # already checked in validate_move() if the player said UNO
@@ -448,6 +674,7 @@ class Inegleit():
             response["inegleit"] = player.attr["name"]
         return response
 
+    @recorded
     def play_black_card(self, player_id, card_id):
         """
         Method that handles request by players to play a black card.
@@ -463,19 +690,21 @@ class Inegleit():
         player = self.players[player_id]
         top_card = self.deck.top_card()
 
-        logger.debug("Request from {} to play {} on {}".format(
-            player, card, top_card))
+        logger.debug("Request from %s to play %s on %s",
+                     player, card, top_card)
 
         if not player.has_card(card):
             # this shouldn't happen!
             response = "player does not have that card"
-            logger.warning("Move denied:" + response)
+            logger.warning("Move denied: %s", response)
             return {"requestValid": False, "message": response}
 
 
         response = self.validate_move(player, card, top_card)
 
-        logger.debug(response)
+        if logger.isEnabledFor(logging.DEBUG):
+            # a copy, response is changed below before the log is written
+            logger.debug("%s", dict(response))
 
         if not response["requestValid"]:
             return response
@@ -511,8 +740,9 @@ class Inegleit():
 
         self.deck.play_card(card)
         player.remove_card(card)
-        logger.debug("{} played {}. ".format(player, card) + message)
-        logger.info("{} played {}".format(player, card))
+        self.publish()
+        logger.debug("%s played %s. %s", player, card, message)
+        logger.info("%s played %s", player, card)
         logger.debug(message)
 
         # already checked in validate_move() if the player said UNO
@@ -528,9 +758,10 @@ class Inegleit():
             response["inegleit"] = player.attr["name"]
         return response
 
+    @recorded
     def event_choose_color(self, player_id, color):
-        logger.debug("Request from {} to choose color {}".format(
-            self.players[player_id], color))
+        logger.debug("Request from %s to choose color %s",
+                     self.players[player_id], color)
 
         if not player_id == self.get_active_player_id():
             response = {"requestValid": False, "message": "not your turn"}
@@ -543,18 +774,21 @@ class Inegleit():
             logger.debug(response)
             return response
 
-        logger.info("{} chose color {}".format(self.players[player_id], color))
+        logger.info("%s chose color %s", self.players[player_id], color)
 
         self.chosen_color = color
         self.can_choose_color = False
+        self.publish()
         self.next_player()
 
         return {"requestValid": True, "color": color}
 
+    @recorded
     def event_cant_play(self, player_id):
         self.next_player()
         return {"requestValid": True}
 
+    @recorded
     def event_pickup_card(self, player_id):
         """ 
         returns (bool1, bool2, str)
@@ -602,10 +836,16 @@ class Inegleit():
             return {"requestValid": False, "message": "you already have enough cards"}
 
         card = self.deck.deal_cards(1)  # returns a list of length 1
+        if not card:
+            # all cards are in the hands of the players
+            self.next_player()
+            return {"requestValid": False, "message": "no cards left"}
+
         player.add_cards(card)
         player.attr["said_uno"] = False
+        self.publish()
 
-        logger.debug(f"{player} picks up {card[0]}")
+        logger.debug("%s picks up %s", player, card[0])
 
         response["requestValid"] = True
         response["reasonIsPenalty"] = reason_is_penalty
@@ -613,11 +853,13 @@ class Inegleit():
 
         return response
 
+    @recorded
     def event_uno(self, player_id):
         player = self.players[player_id]
         if len(player.attr["hand"]) == 1:
             player.attr["said_uno"] = True
-            logger.info("{} said UNO".format(self.players[player_id]))
+            logger.info("%s said UNO", self.players[player_id])
+            self.publish()
             return {"requestValid": True, 
                     "message": "UNO", 
                     "name": player.attr["name"]}
@@ -636,6 +878,7 @@ class Inegleit():
 
         player.attr["finished"] = True
         player.attr["rank"] = len(self.winners)
+        self.publish()
 
         # still let the winner choose the color if he finishes with a black card
         if not self.can_choose_color:
@@ -646,34 +889,167 @@ class Inegleit():
                 "rank": len(self.winners),
                 "message": message}
 
+    @recorded
     def reset_game(self, player_id):
         try:
-            logger.info("Game reset by {}".format(self.players[player_id]))
+            logger.info("Game reset by %s", self.players[player_id])
         except KeyError:
             # if somebody else already reset the game there is no key anymore
-            logger.warning("Game reset by former id {}".format(player_id))
-
-        self.__init__(seed=self.seed, testcase=self.testcase)
+            logger.warning("Game reset by former id %s", player_id)
+
+        # the clients keep their state version across the reset
+        version = self.version
+        published_version = self.published_version
+        published_state = self.published_state
+        initial_seed = self.initial_seed
+        moves = self.moves
+        moves_offset = self.moves_offset
+
+        # the next deck is seeded by the current one, such that a replay
+        # deals the same cards after the reset
+        self.__init__(seed=self.deck.rng.getrandbits(32),
+                      testcase=self.testcase,
+                      game_id=self.game_id, name=self.name)
+
+        self.version = version
+        self.published_version = published_version
+        self.published_state = published_state
+        self.initial_seed = initial_seed
+        self.moves = moves
+        self.moves_offset = moves_offset
+        self.publish()
 
         return {"requestValid": True}
 
-    # def to_json(self, filename):
-    #     game = {
-    #         'game': 'uno',
-    #         'direction': self.forward,
-    #         'players': [player.to_json() for player in self.players],
-    #         'deck': self.deck.to_json(),
-    #     }
-    #     with open(filename, 'w') as outfile:
-    #         json.dump(game, outfile)
+    def get_move_log(self, moves=None):
+        """
+        Returns everything needed to replay the game:
+            {"requestValid": True, "seed": (int), "testcase": ...,
+             "moves": [[command, [args]]]}
+        moves are all commands of the game if it forgot some of them.
+        """
+        if moves is None:
+            if self.moves_offset:
+                return {"requestValid": False,
+                        "message": "the first {} moves are not kept".format(
+                            self.moves_offset)}
+            moves = self.moves
+        return {"requestValid": True, "seed": self.initial_seed,
+                "testcase": self.testcase, "moves": moves}
+
+    def count_moves(self):
+        # the number of recorded commands, including the forgotten ones
+        return self.moves_offset + len(self.moves)
+
+    def moves_since(self, start):
+        # the recorded commands from the command with index start on
+        if start < self.moves_offset:
+            raise ValueError("move {} is forgotten".format(start))
+        return self.moves[start - self.moves_offset:]
+
+    def forget_moves(self, n):
+        """
+        Forgets the first n recorded commands, e.g. once a snapshot
+        containing them is stored, such that a long running game does
+        not keep its whole history.
+        """
+        if n > self.moves_offset:
+            del self.moves[:n - self.moves_offset]
+            self.moves_offset = n
 
-    # def from_json(self, filename):
-    #     with open(filename, 'r') as infile:
-    #         game = json.load(infile)
+    @classmethod
+    def replay(cls, seed, moves, testcase=None, **kwargs):
+        """
+        Creates a game with the seed and applies the logged moves in
+        order.  Since every game shuffles with its own generator the
+        result is the same game, no matter what happened in other games
+        in the meantime.
+        """
+        inegleit = cls(seed=seed, testcase=testcase, **kwargs)
+        for command, args in moves:
+            inegleit.apply(command, args)
+        return inegleit
 
-    #         self.forward = game['direction']
-    #         self.players = [Player(self, player['name']) for player in game['players']]
-    #         self.deck = Deck().from_json(game['deck'])
+    def apply(self, command, args):
+        """
+        Runs a command [command, [args]] of a move log, raises ValueError
+        for anything but a recorded command since the log may come from
+        another process.
+        """
+        if command not in COMMANDS or not isinstance(args, list):
+            raise ValueError("not a recorded command: {!r}".format(command))
+        return getattr(self, command)(*args)
+
+    def to_json(self):
+        """
+        Returns the whole game as JSON serializable dict, together with
+        the moves after it (see from_json()) the game can be restored
+        without replaying it from the start.  The move log itself is not
+        included.
+        """
+        return {
+            "gameId": self.game_id,
+            "name": self.name,
+            "seed": self.seed,
+            "initialSeed": self.initial_seed,
+            "testcase": self.testcase,
+            "gameStarted": self.game_started,
+            "uniqueId": self.unique_id,
+            "nPlayers": self.n_players,
+            "players": [player.dump() for player in self.players.values()],
+            "deck": self.deck.to_json(),
+            "order": self.order,
+            "activeIndex": self.active_index,
+            "forward": self.forward,
+            "canChooseColor": self.can_choose_color,
+            "chosenColor": self.chosen_color,
+            "penalty": self.penalty,
+            "cardPickedUp": self.card_picked_up,
+            "winners": self.winners,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_json(cls, game, moves=(), moves_offset=0):
+        """
+        Restores a game stored by to_json(), moves are the commands
+        recorded up to that point after the first moves_offset ones.  The
+        restored game counts as published, clients get a snapshot when
+        they join again.
+        """
+        inegleit = cls.__new__(cls)
+        inegleit.load_json(game, moves, moves_offset)
+        return inegleit
+
+    def load_json(self, game, moves=(), moves_offset=0):
+        # like from_json() but restores the game in place
+        self.__init__(seed=game["seed"], testcase=game["testcase"],
+                      game_id=game["gameId"], name=game["name"])
+        self.initial_seed = game["initialSeed"]
+        self.moves = list(moves)
+        self.moves_offset = moves_offset
+
+        self.deck.from_json(game["deck"])
+        self.players = {}
+        for player in game["players"]:
+            player = Player.load(player, self.deck)
+            self.players[player.attr["id"]] = player
+        self.n_players = game["nPlayers"]
+
+        self.game_started = game["gameStarted"]
+        self.unique_id = game["uniqueId"]
+        self.order = game["order"]
+        self.active_index = game["activeIndex"]
+        self.forward = game["forward"]
+        self.can_choose_color = game["canChooseColor"]
+        self.chosen_color = game["chosenColor"]
+        self.penalty = dict(game["penalty"])
+        self.card_picked_up = game["cardPickedUp"]
+        self.winners = game["winners"]
+
+        self.version = game["version"]
+        self.published_version = self.version
+        self.published_state = self.get_state()
 
     # def event_play_card(self, player_id, card_id):
     #     """
@@ -693,7 +1069,7 @@ class Inegleit():
     #     # asserts that the player actually has the card
     #     if not player.has_card(card):
     #         response = "player does not have that card"
-    #         logger.warning("Move denied:" + response)
+    #         logger.warning("Move denied: %s", response)
     #         return {"requestValid": False, "message": response}
 
     #     response = ""
@@ -0,0 +1,102 @@
+import json
+import logging
+
+logger = logging.getLogger("events")
+
+# kinds of the cards, for the statistics per rule
+KINDS = {10: "reverse", 11: "skip", 12: "+2"}
+
+def card_kind(card):
+    if card.attr["color"] == "black":
+        return "+4" if card.attr["number"] == 1 else "wild"
+    return KINDS.get(card.attr["number"], "number")
+
+class JSONFormatter(logging.Formatter):
+    # one JSON object per line, the msg of the records are the events
+
+    def format(self, record):
+        event = dict(record.msg, time=round(record.created, 3))
+        return json.dumps(event, separators=(",", ":"))
+
+class EventExport():
+    """
+    Logs the events of the commands stored by GameManager.execute() as
+    dicts to the events logger, which writes them as JSON lines (see
+    JSONFormatter and setup_logging() in logqueue.py).  Every event has
+    the keys "event", "game", "seq" (the index of the command in the move
+    log), "player" (the name) and "time":
+
+    start       : the game started, "players" are the names
+    move        : every command, "command", "valid" and for played cards
+                  the "card" kind and "color"
+    inegleit    : a card was played out of turn
+    raise       : a +2 or +4 raised the penalty to "penalty"
+    stack       : the player starts picking up a penalty of "penalty"
+                  cards
+    missedUno   : the player did not say UNO
+    finish      : the player finished with "rank"
+
+    Replayed commands, e.g. of other processes or restored games, are
+    not exported again.
+    """
+
+    def __init__(self, logger=logger):
+        self.logger = logger
+        self.stacks = {}    # {game_id: penalty cards still to pick up}
+
+    def before(self, inegleit):
+        # the state of the game the events depend on, taken before the
+        # command runs
+        return inegleit.penalty["own"], inegleit.game_started
+
+    def record(self, inegleit, seq, command, args, response, before):
+        penalty, started = before
+        valid = bool(response.get("requestValid"))
+        player = None
+        if command == "add_player":
+            player = response.get("player", {}).get("name")
+        elif args and args[0] in inegleit.players:
+            player = inegleit.players[args[0]].attr["name"]
+
+        def emit(event, **fields):
+            self.logger.info(dict(fields, event=event, game=inegleit.game_id,
+                                  seq=seq, player=player))
+
+        if command == "start_game" and not started and inegleit.game_started:
+            emit("start", players=[inegleit.players[player_id].attr["name"]
+                                   for player_id in inegleit.order])
+
+        if command in ("play_card", "play_black_card"):
+            card = inegleit.deck.get_card(args[1])
+            emit("move", command=command, valid=valid, card=card_kind(card),
+                 color=card.attr["color"])
+        else:
+            emit("move", command=command, valid=valid)
+
+        if valid and response.get("inegleit"):
+            emit("inegleit")
+        if valid and response.get("raisePenalty"):
+            emit("raise", penalty=inegleit.penalty["next"]
+                 or inegleit.penalty["own"])
+
+        # a penalty is picked up one card per command, without a penalty
+        # no stack is being picked up
+        if not penalty:
+            self.stacks.pop(inegleit.game_id, None)
+        elif command == "event_pickup_card" and valid:
+            if inegleit.game_id not in self.stacks:
+                emit("stack", penalty=penalty)
+            if inegleit.penalty["own"]:
+                self.stacks[inegleit.game_id] = inegleit.penalty["own"]
+            else:
+                self.stacks.pop(inegleit.game_id, None)
+
+        if response.get("missedUno"):
+            player = response["missedUno"]
+            emit("missedUno")
+        if "playerFinished" in response and "rank" in response:
+            player = response["playerFinished"]
+            emit("finish", rank=response["rank"])
+
+    def discard(self, game_id):
+        self.stacks.pop(game_id, None)
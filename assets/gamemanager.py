@@ -0,0 +1,423 @@
+import asyncio
+import base64
+import functools
+import logging
+import struct
+
+from .game import Inegleit
+from .store import MemoryStore
+from .checkpoint import pack, unpack
+
+logger = logging.getLogger("backend")
+
+class GameManager():
+    """
+    Registry of all running games.  Every table is its own Inegleit
+    instance identified by a unique game id, so that one server process
+    can host many games at the same time.
+    Like Inegleit, the methods answering requests return a dict
+    containing the key {"requestValid": (bool)} and a {"message": (str)}
+    if the request is denied.
+    The games are kept in a store (see store.py), the Inegleit instances
+    are a cache of it.  Commands are run by execute() which stores them,
+    get_game() applies the commands other processes stored in the
+    meantime, so with a store shared by several processes any process
+    can serve any request.
+    Both are coroutines, they serialize the refreshes and commands of a
+    game with a lock per game and run the calls of a blocking store
+    (e.g. SQLite waiting for the write lock of another process) in a
+    thread, such that the event loop keeps serving the other games.
+    The games forget the commands contained in a stored snapshot once
+    they are saved and logged (see save_game()), the full move log of a
+    game is read from the event log or the store.
+    With an EventLog the games are stored on disk (see save_game()) and
+    restored by restore_games(), with a Checkpointer their commands and
+    snapshots are written in the background.  An EventExport logs the
+    events of the stored commands for the statistics.
+    """
+
+    def __init__(self, chat_size=200, event_log=None, checkpointer=None,
+                 store=None, snapshot_interval=100, retries=3, events=None):
+        if store is None:
+            store = MemoryStore(chat_size)
+        self.store = store
+        self.games = {}     # dictionary of {game_id: Inegleit object}
+
+        # a snapshot is stored every snapshot_interval commands, such
+        # that a process loads a game replaying at most as many commands
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = {} # {game_id: commands in the stored snapshot}
+        self.retries = retries
+        self.locks = {}     # {game_id: asyncio.Lock}
+        # serializes assigning the ids of new games, created on the
+        # running event loop
+        self.creating = None
+
+        self.event_log = event_log
+        self.checkpointer = checkpointer
+        self.events = events
+
+    async def create_game(self, name="", seed=None, testcase=None, game_id=None):
+        """
+        Creates a new game and returns its description.  Without a name
+        the game is called after its id, without a game_id the store
+        assigns one.
+        """
+        async with self.create_lock():
+            if game_id is not None and await self.call_store(self.store.has_game,
+                                                             game_id):
+                return {"requestValid": False, "message": "game already exists"}
+            game_id = await self.call_store(self.store.create_game, game_id)
+
+            if not name:
+                name = "Game {}".format(game_id)
+
+            inegleit = Inegleit(seed=seed, testcase=testcase,
+                                game_id=game_id, name=name)
+            await self.call_store(self.store_created, inegleit)
+            self.games[game_id] = inegleit
+        self.save_game(inegleit)
+
+        logger.info("Created game: %s [%s]", name, game_id)
+
+        return {"requestValid": True, "game": inegleit.get_info()}
+
+    def store_created(self, inegleit):
+        game_id = inegleit.game_id
+        self.store.append_moves(game_id, 0, [], inegleit.get_info())
+        self.save_snapshot(inegleit)
+        self.get_chat(game_id).add_message("server", "Viel Spass mit Inegleit Online!")
+
+    def fetch_game(self, game_id):
+        # returns the snapshot of the game in the store and the commands
+        # after it
+        snapshot = self.store.load_snapshot(game_id)
+        if snapshot is None:
+            return None, None
+        return snapshot, self.store.get_moves(game_id, snapshot[0])
+
+    def add_loaded(self, game_id, snapshot, moves):
+        if snapshot is None or moves is None:
+            return None
+
+        n, data = snapshot
+        game, _ = unpack(data)
+        inegleit = Inegleit.from_json(game, moves_offset=n)
+        self.replay(inegleit, moves)
+
+        self.games[game_id] = inegleit
+        self.snapshots[game_id] = n
+        return inegleit
+
+    def apply_stored(self, inegleit, moves):
+        # moves are the stored commands the game does not have yet
+        if moves is None:
+            self.games.pop(inegleit.game_id, None)
+            return False
+        if moves:
+            self.replay(inegleit, moves)
+        return True
+
+    def replay(self, inegleit, moves):
+        # The state and hand versions follow from the commands, such that
+        # the deltas pushed by any process fit together.  Clients that got
+        # the changes from another process need a snapshot now and then.
+        for command, args in moves:
+            inegleit.apply(command, args)
+
+    def restore(self, inegleit, snapshot, moves):
+        n, data = snapshot
+        game, _ = unpack(data)
+        inegleit.load_json(game, moves_offset=n)
+        self.replay(inegleit, moves)
+
+    def lock(self, game_id):
+        if game_id not in self.locks:
+            self.locks[game_id] = asyncio.Lock()
+        return self.locks[game_id]
+
+    def create_lock(self):
+        if self.creating is None:
+            self.creating = asyncio.Lock()
+        return self.creating
+
+    async def call_store(self, function, *args):
+        # runs function(*args) calling the store, in a thread if it may block
+        if not self.store.blocking:
+            return function(*args)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(function, *args))
+
+    async def get_game(self, game_id):
+        """
+        Returns the game with all stored commands applied, or None if
+        there is no game with that id.
+        """
+        async with self.lock(game_id):
+            inegleit = await self.get_game_unlocked(game_id)
+        if inegleit is None:
+            self.locks.pop(game_id, None)
+        return inegleit
+
+    async def refresh(self, inegleit):
+        """
+        Applies the commands stored by other processes since the game
+        was used by this one.  Returns False if the game was closed.  The
+        lock of the game is held.
+        """
+        return self.apply_stored(
+            inegleit, await self.call_store(self.store.get_moves, inegleit.game_id,
+                                            inegleit.count_moves()))
+
+    async def execute(self, inegleit, command, *args):
+        """
+        Runs a recorded command of the game e.g.
+        execute(inegleit, "play_card", player_id, card_id) and stores it.
+        If another process stored a command of the game in the meantime
+        the command is run again on the latest state.  The game is only
+        changed while holding its lock.
+        """
+        game_id = inegleit.game_id
+        async with self.lock(game_id):
+            for _ in range(self.retries):
+                if not await self.refresh(inegleit):
+                    return {"requestValid": False, "message": "game not found"}
+
+                start = inegleit.count_moves()
+                if self.events is not None:
+                    before = self.events.before(inegleit)
+                try:
+                    response = getattr(inegleit, command)(*args)
+                except Exception:
+                    await self.rollback(inegleit)
+                    raise
+                if await self.call_store(self.store.append_moves, game_id, start,
+                                         inegleit.moves_since(start),
+                                         inegleit.get_info()):
+                    if self.events is not None:
+                        self.events.record(inegleit, start, command, args,
+                                           response, before)
+                    if (inegleit.count_moves() - self.snapshots.get(game_id, 0)
+                            >= self.snapshot_interval):
+                        moves, data = self.pack_snapshot(inegleit)
+                        await self.call_store(self.store.save_snapshot,
+                                              game_id, moves, data)
+                        self.snapshots[game_id] = moves
+                    return response
+
+                logger.info("Game %s was changed by another process, running %s again",
+                            game_id, command)
+                self.restore(inegleit, *await self.call_store(self.fetch_game, game_id))
+
+            return {"requestValid": False, "message": "game is busy, try again"}
+
+    async def rollback(self, inegleit):
+        # The command raised after changing the game maybe, the game is
+        # restored in place from the store since e.g. the checkpointer
+        # still refers to it.  A game that cannot be restored is
+        # dropped and loaded again by the next request.
+        game_id = inegleit.game_id
+        try:
+            snapshot, moves = await self.call_store(self.fetch_game, game_id)
+            self.restore(inegleit, snapshot, moves)
+        except Exception:
+            logger.exception("Could not restore game %s", game_id)
+            self.games.pop(game_id, None)
+            if self.checkpointer is not None:
+                self.checkpointer.dirty.pop(game_id, None)
+
+    async def close_game(self, game_id):
+        """
+        Removes the game with id game_id together with all its players.
+        """
+        async with self.lock(game_id):
+            inegleit = await self.get_game_unlocked(game_id)
+            if (inegleit is None
+                    or not await self.call_store(self.store.delete_game, game_id)):
+                logger.debug("game %s not found", game_id)
+                return {"requestValid": False, "message": "game not found"}
+            response = self.discard(inegleit)
+        self.locks.pop(game_id, None)
+        return response
+
+    async def export_game(self, game_id):
+        """
+        Returns everything needed to move the game to another process,
+        see import_game():
+            {"requestValid": True, "name": (str), "moves": (int),
+             "snapshot": (str, base64 encoded checkpoint),
+             "messages": [message]}
+        """
+        async with self.lock(game_id):
+            inegleit = await self.get_game_unlocked(game_id)
+            if inegleit is None:
+                return {"requestValid": False, "message": "game not found"}
+            history = await self.call_store(self.get_history, game_id)
+            return self.export(inegleit, history)
+
+    async def get_game_unlocked(self, game_id):
+        # get_game() for callers already holding the lock
+        inegleit = self.games.get(game_id)
+        if inegleit is None:
+            return self.add_loaded(
+                game_id, *await self.call_store(self.fetch_game, game_id))
+        if not await self.refresh(inegleit):
+            return None
+        return inegleit
+
+    def add_message(self, game_id, sender, text):
+        return self.get_chat(game_id).add_message(sender, text)
+
+    def get_history(self, game_id, before_id=None, limit=None):
+        # without limit the whole chat of the game
+        chat = self.get_chat(game_id)
+        return chat.get_history(before_id, chat.size if limit is None else limit)
+
+    def save_snapshot(self, inegleit):
+        moves, data = self.pack_snapshot(inegleit)
+        self.store.save_snapshot(inegleit.game_id, moves, data)
+        self.snapshots[inegleit.game_id] = moves
+
+    def pack_snapshot(self, inegleit):
+        moves = inegleit.count_moves()
+        return moves, pack(inegleit.to_json(), moves)
+
+    def get_chat(self, game_id):
+        return self.store.get_chat(game_id)
+
+    def list_games(self):
+        return self.store.list_games()
+
+    async def join_game(self, game_id, player_name):
+        """
+        Adds a player to the game with id game_id.
+        """
+        inegleit = await self.get_game(game_id)
+        if inegleit is None:
+            logger.debug("game %s not found", game_id)
+            return {"requestValid": False, "message": "game not found"}
+
+        return await self.execute(inegleit, "add_player", player_name)
+
+    def discard(self, inegleit):
+        # forgets the game deleted from the store
+        game_id = inegleit.game_id
+        self.games.pop(game_id, None)
+        self.snapshots.pop(game_id, None)
+        if self.checkpointer is not None:
+            self.checkpointer.discard(game_id)
+        if self.event_log is not None:
+            self.event_log.remove(game_id)
+        if self.events is not None:
+            self.events.discard(game_id)
+
+        message = "Closed game: {} [{}]".format(inegleit.name, game_id)
+        logger.info(message)
+
+        return {"requestValid": True, "message": message}
+
+    def save_game(self, inegleit):
+        # The checkpointer appends the new commands of the game to the
+        # event log in the background, without one they are appended
+        # right away. The game forgets the commands in the snapshot of
+        # the store that are logged.
+        game_id = inegleit.game_id
+        stored = self.snapshots.get(game_id, 0)
+        if self.checkpointer is not None:
+            self.checkpointer.mark(inegleit)
+        elif self.event_log is not None:
+            self.event_log.sync(inegleit)
+        if self.event_log is not None:
+            stored = min(stored, self.event_log.get_logged(inegleit))
+        inegleit.forget_moves(stored)
+
+    async def get_move_log(self, inegleit):
+        """
+        Returns the move log of the game (see Inegleit.get_move_log()),
+        the commands the game forgot are read from the event log or the
+        store.  Their logs start later for games moved from another
+        process, then the move log is incomplete.
+        """
+        if not inegleit.moves_offset:
+            return inegleit.get_move_log()
+        if self.event_log is None:
+            return self.fill_move_log(
+                inegleit, await self.call_store(self.store.get_moves, inegleit.game_id))
+
+        # the log is read in a thread once all commands of the game are
+        # logged, no command runs in the meantime
+        async with self.lock(inegleit.game_id):
+            if self.checkpointer is not None:
+                await self.checkpointer.flush()
+            loop = asyncio.get_event_loop()
+            moves = await loop.run_in_executor(None, functools.partial(
+                self.event_log.read_log, inegleit.game_id, repair=False))
+        return self.fill_move_log(inegleit, moves)
+
+    def fill_move_log(self, inegleit, moves):
+        # moves are the logged commands, they may include later ones
+        n = inegleit.count_moves()
+        if moves is None or len(moves) < n:
+            return inegleit.get_move_log()
+        return inegleit.get_move_log(moves[:n])
+
+    def restore_games(self):
+        """
+        Restores the games stored in the event log e.g. after a restart.
+        The chats are not stored, the restored games start a new one.
+        """
+        if self.event_log is None:
+            return 0
+
+        restored = self.event_log.load_all()
+        for inegleit in restored:
+            self.add_game(inegleit)
+            self.get_chat(inegleit.game_id).add_message("server", "Das Spiel wurde wiederhergestellt.")
+
+        logger.info("Restored %s games", len(restored))
+        return len(restored)
+
+    def add_game(self, inegleit):
+        # registers a game created elsewhere in the store
+        game_id = inegleit.game_id
+        self.store.create_game(game_id, inegleit.moves_offset)
+        self.store.append_moves(game_id, inegleit.moves_offset, inegleit.moves,
+                                inegleit.get_info())
+        self.save_snapshot(inegleit)
+        self.games[game_id] = inegleit
+
+    def store_imported(self, inegleit, messages):
+        self.add_game(inegleit)
+        chat = self.get_chat(inegleit.game_id)
+        for sender, text in messages:
+            chat.add_message(sender, text)
+
+    def export(self, inegleit, history):
+        moves, data = self.pack_snapshot(inegleit)
+        return {"requestValid": True, "name": inegleit.name, "moves": moves,
+                "snapshot": base64.b64encode(data).decode(),
+                "messages": history["messages"]}
+
+    async def import_game(self, game_id, game):
+        """
+        Adds a game exported by export_game() of another process with
+        the same id, the game is restored from its snapshot.
+        """
+        try:
+            state, moves = unpack(base64.b64decode(game["snapshot"]))
+            state.update(gameId=game_id, name=game["name"])
+            inegleit = Inegleit.from_json(state, moves_offset=moves)
+            messages = [(message["sender"], message["text"])
+                        for message in game["messages"]]
+        except (KeyError, TypeError, ValueError, struct.error):
+            logger.warning("Invalid export of game %s", game_id, exc_info=True)
+            return {"requestValid": False, "message": "invalid game"}
+
+        async with self.create_lock():
+            if await self.call_store(self.store.has_game, game_id):
+                return {"requestValid": False, "message": "game already exists"}
+            await self.call_store(self.store_imported, inegleit, messages)
+        self.save_game(inegleit)
+
+        logger.info("Imported game: %s [%s]", inegleit.name, game_id)
+        return {"requestValid": True, "game": inegleit.get_info()}
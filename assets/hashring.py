@@ -0,0 +1,43 @@
+import bisect
+import hashlib
+
+def hash_key(key):
+    # stable across processes and restarts, unlike hash()
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], "big")
+
+class HashRing():
+    """
+    Consistent hashing of game ids to workers.  Every worker is placed
+    on the ring replicas times, a game belongs to the next worker on the
+    ring after the hash of its id.  Adding a worker only moves the games
+    the new worker takes over, about 1/n of them.
+    """
+
+    def __init__(self, workers=(), replicas=64):
+        self.replicas = replicas
+        self.keys = []      # sorted hashes of the points on the ring
+        self.points = {}    # dictionary of {hash: worker}
+        for worker in workers:
+            self.add(worker)
+
+    def add(self, worker):
+        for i in range(self.replicas):
+            key = hash_key("{}#{}".format(worker, i))
+            self.points[key] = worker
+            bisect.insort(self.keys, key)
+
+    def remove(self, worker):
+        for i in range(self.replicas):
+            key = hash_key("{}#{}".format(worker, i))
+            del self.points[key]
+            self.keys.remove(key)
+
+    def get(self, game_id):
+        # returns the worker owning the game
+        if not self.keys:
+            return None
+        index = bisect.bisect(self.keys, hash_key(game_id)) % len(self.keys)
+        return self.points[self.keys[index]]
+
+    def workers(self):
+        return sorted(set(self.points.values()))
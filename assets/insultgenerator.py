@@ -1,24 +1,187 @@
 #!/usr/bin/env python3
 
 
-import requests
-from random import random
+import asyncio
+import json
+import logging
+from collections import deque
+from random import random, choice
 
+import aiohttp
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger("backend")
 
-def insultgenerator(sender, receiver):
+ADJECTIVE_API = 'https://insult.mattbas.org/api/adjective'
+NOUN_API = 'http://api.datamuse.com/words?max=1&rel_jja='
+INSULT_API = 'https://www.rappad.co/api/battles/random_insult'
+MOCKERY_API = 'https://www.kassoon.com/dnd/vicious-mockery-insult-generator/'
+
+# Offline corpus used whenever an API is too slow or not reachable
+ADJECTIVES = (
+	'clumsy', 'dim-witted', 'slimy', 'pompous', 'sluggish', 'soggy',
+	'half-baked', 'cross-eyed', 'lumpy', 'witless', 'smelly', 'spineless',
+	'moldy', 'gormless', 'feeble', 'scruffy', 'whiny', 'dull',
+	'crusty', 'rancid', 'bumbling', 'sniveling', 'lazy', 'tactless',
+)
+NOUNS = (
+	'goblin', 'potato', 'toad', 'turnip', 'buffoon', 'muppet',
+	'sock', 'donkey', 'walnut', 'nincompoop', 'weasel', 'mushroom',
+	'dumpling', 'troll', 'pigeon', 'clown', 'sloth', 'noodle',
+)
+INSULTS = (
+	'You play cards like a blindfolded pigeon.',
+	'I have seen smarter moves from a shuffled deck.',
+	'Your strategy has the depth of a puddle.',
+	'Even the +4 cards feel sorry for you.',
+	'You could not find the right color in a paint shop.',
+	'Your hand is as hopeless as your jokes.',
+)
+MOCKERIES = (
+	'I would call you a tool, but tools are useful.',
+	'Your mother was a hamster and your father smelt of elderberries!',
+	'You fight like a dairy farmer.',
+	'I have met trolls with better manners.',
+	'If brains were gold, you would be poorer than a goblin.',
+	'Is your face always like that, or are you just playing cards?',
+)
+
+
+class InsultGenerator():
+	"""
+	Fetches the words for the insults from the APIs without blocking the
+	event loop.  All requests share one aiohttp session with at most
+	max_connections connections, the three adjectives are fetched
+	concurrently.  Every request is cut off after timeout seconds and
+	replaced by a word from the offline corpus.  The session is created
+	by the first request and closed by close().
+	The API urls can be replaced e.g. by a local stub server for testing.
+	"""
+
+	def __init__(self, adjective_api=ADJECTIVE_API, noun_api=NOUN_API,
+			insult_api=INSULT_API, mockery_api=MOCKERY_API,
+			timeout=1.0, max_connections=8):
+		self.adjective_api = adjective_api
+		self.noun_api = noun_api
+		self.insult_api = insult_api
+		self.mockery_api = mockery_api
+		self.timeout = timeout
+		self.max_connections = max_connections
+
+		# shared pooled HTTP client, created on the running event loop
+		self.session = None
+
+	def get_session(self):
+		if self.session is None or self.session.closed:
+			self.session = aiohttp.ClientSession(
+				connector=aiohttp.TCPConnector(limit=self.max_connections),
+				timeout=aiohttp.ClientTimeout(total=self.timeout))
+		return self.session
+
+	async def close(self):
+		if self.session is not None:
+			await self.session.close()
+			self.session = None
+
+	async def fetch(self, url, parse, fallback=None):
+		"""
+		Returns parse(text) of the body of a GET request to url, or a
+		random element of fallback if the request fails or takes too long.
+		Without fallback the error is raised.
+		"""
+		try:
+			async with self.get_session().get(url) as response:
+				response.raise_for_status()
+				return parse(await response.text())
+		except Exception:
+			if fallback is None:
+				raise
+			return choice(fallback)
+
+	async def get_words(self, offline=True):
+		"""
+		Returns three adjectives and a noun related to the third one.
+		With offline=False a failing request raises an error instead of
+		using the offline corpus.
+		"""
+		# waits for all three requests, such that a failing one does not
+		# leave the others running with their errors never retrieved
+		adjectives = await asyncio.gather(*[
+			self.fetch(self.adjective_api, parse_text,
+			           ADJECTIVES if offline else None)
+			for _ in range(3)], return_exceptions=True)
+		for adjective in adjectives:
+			if isinstance(adjective, Exception):
+				raise adjective
+		adj1, adj2, adj3 = adjectives
+		noun = await self.fetch(self.noun_api + adj3, parse_noun,
+		                        NOUNS if offline else None)
+		return adj1, adj2, adj3, noun
+
+	async def get_insult(self, offline=True):
+		return await self.fetch(self.insult_api, parse_insult,
+		                        INSULTS if offline else None)
+
+	async def get_mockery(self, offline=True):
+		return await self.fetch(self.mockery_api, parse_mockery,
+		                        MOCKERIES if offline else None)
+
+	async def generate(self, sender, receiver):
+		rnd = random()
+
+		words = insult = mockery = None
+		if needs_words(sender, rnd):
+			words = await self.get_words()
+		elif needs_insult(sender, rnd):
+			insult = await self.get_insult()
+		elif needs_mockery(sender, rnd):
+			mockery = await self.get_mockery()
+
+		return compose(sender, receiver, rnd, words, insult, mockery)
+
+
+def parse_text(text):
+	return text.strip()
+
+def parse_noun(text):
+	return json.loads(text)[0]['word']
+
+def parse_insult(text):
+	return json.loads(text)["insult"]
+
+def parse_mockery(text):
+	soup = BeautifulSoup(text, 'html.parser')
+	return soup.body.find_all('p')[3].contents[0]
+
+# Which words compose() needs for a given random number
+
+def finished_message(sender, rnd):
+	return sender['finished'] and rnd < 0.7
+
+def needs_words(sender, rnd):
+	return not finished_message(sender, rnd) and 0.2 <= rnd < 0.7
+
+def needs_insult(sender, rnd):
+	return not finished_message(sender, rnd) and 0.7 <= rnd < 0.8
+
+def needs_mockery(sender, rnd):
+	return not finished_message(sender, rnd) and rnd >= 0.8
+
+
+def compose(sender, receiver, rnd, words=None, insult=None, mockery=None):
+	"""
+	Composes the insult for the random number rnd.  words is a tuple of
+	three adjectives and a noun, insult and mockery are complete lines,
+	only the one needed for rnd has to be given.
+	"""
 
 	# Name of the player sending an insult
 	sname = sender['name']
 	# Name of the insult's victim
 	rname = receiver['name']
 
-	# Get a random number to randomize behaviour of insult button
-	rnd = random()
-
 	# If the insulting player is done, this message might be displayed
-	if sender['finished'] and rnd < 0.7:
+	if finished_message(sender, rnd):
 		insulttext = 'Why don\'t you shut up, %s, you have no reason to complain!' % (sname)
 	# There is a 20% chance that no random words are included in the message
 	elif rnd < 0.2:
@@ -27,15 +190,9 @@ def insultgenerator(sender, receiver):
 		else:
 			insulttext = '%s is fuming about this!' % (sname)
 	elif rnd <  0.7:
-		# Get adjectives and nouns from APIs, use one adjetive to search for a related noun
-		adjectives_api = 'https://insult.mattbas.org/api/adjective'
-		adj1 = requests.get(adjectives_api).text
-		adj2 = requests.get(adjectives_api).text
-		adj3 = requests.get(adjectives_api).text
-
-		noun_api = 'http://api.datamuse.com/words?max=1&rel_jja=' + adj3 
-		noun = requests.get(noun_api).json()[0]['word']
-		
+		# Adjectives and nouns from APIs, the noun is related to the third adjective
+		adj1, adj2, adj3, noun = words
+
 		# Further special cases for not having cards yet, having received a penalty for late UNO, or being the king
 		if not sender['has_received_initial_cards'] and rnd < 0.6:
 			insulttext = 'Even before his game has started, %s feels the need to call %s a %s, %s, %s...' % (sname, rname, adj2, adj3, noun)
@@ -47,16 +204,138 @@ def insultgenerator(sender, receiver):
 			# Standard insult
 			insulttext = '%s just called %s a %s, %s %s!' % (sname, rname, adj1, adj2, noun)
 	elif rnd < 0.8:
-		insult_api = 'https://www.rappad.co/api/battles/random_insult'
-		insult = requests.get(insult_api).json()
-		
-		insulttext = '%s yells at %s: %s' % (sname, rname, insult["insult"])
-	
+		insulttext = '%s yells at %s: %s' % (sname, rname, insult)
+
 	else:
-		insult_api = 'https://www.kassoon.com/dnd/vicious-mockery-insult-generator/'
-		insult = requests.get(insult_api).text
-		soup = BeautifulSoup(insult, 'html.parser')
+		insulttext = mockery
+
+	return insulttext
+
+
+class InsultPool():
+	"""
+	Keeps bounded pools of prefetched word tuples, insults and mockeries
+	filled in the background, such that an insult is composed without
+	waiting for the APIs.  At most concurrency fetches run at the same
+	time, after a failed fetch the refilling of that pool backs off
+	exponentially up to max_backoff seconds.  If a pool is empty, the
+	offline corpus is used and counted as a miss.
+	"""
+
+	def __init__(self, generator, size=16, concurrency=2, max_backoff=60):
+		self.generator = generator
+		self.size = size
+		self.concurrency = concurrency
+		self.max_backoff = max_backoff
+
+		# {kind: (fetch coroutine function, offline version)}
+		self.sources = {
+			"words": (lambda: generator.get_words(offline=False),
+			          lambda: (choice(ADJECTIVES), choice(ADJECTIVES),
+			                   choice(ADJECTIVES), choice(NOUNS))),
+			"insults": (lambda: generator.get_insult(offline=False),
+			            lambda: choice(INSULTS)),
+			"mockeries": (lambda: generator.get_mockery(offline=False),
+			              lambda: choice(MOCKERIES)),
+		}
+		self.pools = {kind: deque(maxlen=size) for kind in self.sources}
+		self.hits = {kind: 0 for kind in self.sources}
+		self.misses = {kind: 0 for kind in self.sources}
+		self.failures = {kind: 0 for kind in self.sources}
+
+		# created in start() on the running event loop
+		self.semaphore = None
+		self.refill = None
+		self.tasks = []
+
+	def start(self):
+		self.semaphore = asyncio.Semaphore(self.concurrency)
+		self.refill = {kind: asyncio.Event() for kind in self.sources}
+		self.tasks = [asyncio.ensure_future(self.keep_filled(kind))
+		              for kind in self.sources]
+
+	def stop(self):
+		for task in self.tasks:
+			task.cancel()
+		self.tasks = []
 
-		insulttext = soup.body.find_all('p')[3].contents[0]
+	async def fetch(self, kind):
+		async with self.semaphore:
+			return await self.sources[kind][0]()
 
-	return insulttext
\ No newline at end of file
+	async def keep_filled(self, kind):
+		pool = self.pools[kind]
+		backoff = 0
+		while True:
+			missing = self.size - len(pool)
+			if not missing:
+				# wait until something is taken from the pool
+				self.refill[kind].clear()
+				await self.refill[kind].wait()
+				continue
+
+			results = await asyncio.gather(
+				*[self.fetch(kind) for _ in range(missing)],
+				return_exceptions=True)
+
+			failed = 0
+			for result in results:
+				if isinstance(result, Exception):
+					failed += 1
+				else:
+					pool.append(result)
+
+			if failed:
+				self.failures[kind] += failed
+				backoff = min(self.max_backoff, 2 * backoff or 1)
+				logger.warning("Fetching %s failed %s times, retry in %ss",
+				               kind, failed, backoff)
+				await asyncio.sleep(backoff)
+			else:
+				backoff = 0
+
+	def take(self, kind):
+		"""
+		Returns a prefetched item, or one of the offline corpus.
+		"""
+		if self.refill is not None:
+			self.refill[kind].set()
+		try:
+			item = self.pools[kind].popleft()
+		except IndexError:
+			self.misses[kind] += 1
+			return self.sources[kind][1]()
+		self.hits[kind] += 1
+		return item
+
+	def generate(self, sender, receiver):
+		rnd = random()
+
+		words = insult = mockery = None
+		if needs_words(sender, rnd):
+			words = self.take("words")
+		elif needs_insult(sender, rnd):
+			insult = self.take("insults")
+		elif needs_mockery(sender, rnd):
+			mockery = self.take("mockeries")
+
+		return compose(sender, receiver, rnd, words, insult, mockery)
+
+	def get_stats(self):
+		return {
+			kind: {
+				"pooled": len(self.pools[kind]),
+				"hits": self.hits[kind],
+				"misses": self.misses[kind],
+				"failures": self.failures[kind],
+			}
+			for kind in self.sources
+		}
+
+
+# shared by all games, the pool is started with the app (see main.py)
+generator = InsultGenerator()
+pool = InsultPool(generator)
+
+def insultgenerator(sender, receiver):
+	return pool.generate(sender, receiver)
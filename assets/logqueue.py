@@ -0,0 +1,57 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+FORMAT = "%(asctime)s %(levelname)s - %(message)s"
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the records on the queue as they are.  QueueHandler.prepare()
+    would format the message in the logging thread, here the listener
+    thread formats it when writing.  Thus the arguments of a record must
+    not be changed after logging it.
+    """
+
+    def prepare(self, record):
+        return record
+
+class Listener(logging.handlers.QueueListener):
+    # can be stopped again, e.g. at exit after a test stopped it
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+def setup_logging(logger, filename="inegleit.log", level="INFO",
+                  max_bytes=10 * 2**20, backup_count=5, when=None,
+                  formatter=None):
+    """
+    Writes the records of the logger to a rotating file in a background
+    thread, logging a record only puts it on a queue.  The file is
+    rotated at max_bytes or, if when is given (e.g. "midnight"), at that
+    time, and backup_count old files are kept (with when, 0 keeps all
+    of them).  Returns the started QueueListener, it is stopped at exit
+    after writing the queued records.
+
+    Every process rotates its own file, processes sharing a file should
+    log to different files instead.
+    """
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count)
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count)
+    handler.setFormatter(formatter or logging.Formatter(FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = Listener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.addHandler(LazyQueueHandler(records))
+    # handlers of the root logger would format the records right away
+    logger.propagate = False
+    return listener
@@ -1,3 +1,90 @@
+def card_ids(bits):
+    """
+    Returns the ids of a bitset of cards in ascending order.
+    """
+    ids = []
+    while bits:
+        lowest = bits & -bits
+        ids.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return ids
+
+
+class Hand():
+    """
+    Cards on the hand of a player.  Behaves like the list of cards it
+    replaces (iteration in the order the cards were added, len, in,
+    extend, remove) but keeps the cards indexed by id:
+
+    cards           : {card_id: Card}
+    bits            : bitset of the ids of all cards
+    colors          : {color: bitset of the ids of the cards of the color}
+    numbers         : {number: bitset of the ids of the cards of the number}
+
+    All operations on single cards are O(1), the queries for playable
+    cards use the compatibility tables of the cards (see deck.py).
+    """
+    def __init__(self, cards=()):
+        self.cards = {}
+        self.bits = 0
+        self.colors = {}
+        self.numbers = {}
+        self.extend(cards)
+
+    def add(self, card):
+        color, number = card.attr["color"], card.attr["number"]
+        self.cards[card.attr["id"]] = card
+        self.bits |= card.bit
+        self.colors[color] = self.colors.get(color, 0) | card.bit
+        self.numbers[number] = self.numbers.get(number, 0) | card.bit
+
+    def extend(self, cards):
+        for card in cards:
+            self.add(card)
+
+    def remove(self, card):
+        # raises a KeyError like list.remove() raises a ValueError
+        del self.cards[card.attr["id"]]
+        self.bits &= ~card.bit
+        self.colors[card.attr["color"]] &= ~card.bit
+        self.numbers[card.attr["number"]] &= ~card.bit
+
+    def __contains__(self, card):
+        return card.attr["id"] in self.cards
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards.values())
+
+    def with_color(self, color):
+        return card_ids(self.colors.get(color, 0))
+
+    def with_number(self, number):
+        return card_ids(self.numbers.get(number, 0))
+
+    def legal_moves(self, top_card, chosen_color="", penalty=0):
+        """
+        Returns the ids of the cards the active player can play on
+        top_card, following the rules of Inegleit.validate_move():
+        with a penalty only cards raising it, on a black card only black
+        cards and cards of the chosen color.
+        """
+        if penalty:
+            return card_ids(self.bits & top_card.raising_cards)
+        if top_card.attr["color"] == "black":
+            return card_ids(self.colors.get(chosen_color, 0)
+                            | self.colors.get("black", 0))
+        return card_ids(self.bits & top_card.playable_cards)
+
+    def inegleit_moves(self, top_card):
+        """
+        Returns the ids of the cards that can be inegleit on top_card.
+        """
+        return card_ids(self.bits & top_card.inegleitable_cards)
+
+
 class Player():
     """ 
     Class members:
@@ -14,31 +101,113 @@ class Player():
         self.attr = {
             "name": name,
             "id": uid,
-            "hand": [],
+            "hand": Hand(),
             "said_uno": False,      # bool
             "penalty": 0,           # int, punishment for not saying uno
             "has_received_initial_cards": False,
             "king": king,
             "has_received_initial_cards": False,
-            "hand": [],         # list of cards
             "said_uno": False,      
             "penalty": 0,       # punishment for not saying uno
             "finished": False, 
             "rank": 0,
         }
+
+        # ids of the cards added to and removed from the hand since the
+        # last push to the player. The hand version is the number of
+        # changes of the hand at the last push, such that every process
+        # replaying the game agrees on the hand of a version.
+        self.added_cards = []
+        self.removed_cards = []
+        self.hand_changes = 0
+        self.hand_version = 0
         
     def add_cards(self, cards):
+        self.hand_changes += 1
         self.attr["hand"].extend(cards)
+        for card in cards:
+            card_id = card.attr["id"]
+            if card_id in self.removed_cards:
+                self.removed_cards.remove(card_id)
+            else:
+                self.added_cards.append(card_id)
 
     def has_card(self, card):
         return card in self.attr["hand"]
         
     def remove_card(self, card):
+        self.hand_changes += 1
         self.attr["hand"].remove(card)
+        card_id = card.attr["id"]
+        if card_id in self.added_cards:
+            self.added_cards.remove(card_id)
+        else:
+            self.removed_cards.append(card_id)
+
+    def pop_hand_delta(self):
+        """
+        Returns the ids of the cards added to and removed from the hand
+        since the last call, or None if the hand did not change:
+            {"version": (int), "since": (int), "added": [card_id],
+             "removed": [card_id]}
+        """
+        if not self.added_cards and not self.removed_cards:
+            return None
+
+        delta = {
+            "version": self.hand_changes,
+            "since": self.hand_version,
+            "added": self.added_cards,
+            "removed": self.removed_cards,
+        }
+        self.hand_version = self.hand_changes
+        self.added_cards = []
+        self.removed_cards = []
+        return delta
+
+    def get_hand_snapshot(self):
+        return {
+            "version": self.hand_version,
+            "cards": [card.attr for card in self.attr["hand"]],
+        }
 
     def __str__(self):
         return "{} [{}]".format(self.attr["name"], self.attr["id"])
 
+    def get_attr(self):
+        # copy of the attributes with the hand as a list of card attributes
+        attr = dict(self.attr)
+        attr["hand"] = [card.attr for card in self.attr["hand"]]
+        return attr
+
+    def dump(self):
+        """
+        Returns the whole player including the ids of the cards on the
+        hand, unlike to_json() which is the view of the other players.
+        """
+        attr = dict(self.attr)
+        attr["hand"] = [card.attr["id"] for card in self.attr["hand"]]
+        return {
+            "attr": attr,
+            "added": self.added_cards,
+            "removed": self.removed_cards,
+            "handChanges": self.hand_changes,
+            "handVersion": self.hand_version,
+        }
+
+    @classmethod
+    def load(cls, player, deck):
+        # restores a player stored by dump(), the cards are taken from deck
+        attr = player["attr"]
+        self = cls(attr["name"], attr["id"], attr["king"])
+        self.attr.update(attr)
+        self.attr["hand"] = Hand(deck.get_card(i) for i in attr["hand"])
+        self.added_cards = list(player["added"])
+        self.removed_cards = list(player["removed"])
+        self.hand_changes = player["handChanges"]
+        self.hand_version = player["handVersion"]
+        return self
+
     def to_json(self):
         return {
             "name": self.attr["name"], 
@@ -0,0 +1,279 @@
+import datetime
+import json
+import sqlite3
+import threading
+
+from .chat import Chat
+
+class MemoryStore():
+    """
+    Store of the games of a single server process.  A store keeps what
+    is needed to load a game in any process:
+
+    info            : the description of the game, see Inegleit.get_info(),
+                      set by the first append_moves()
+    moves           : the recorded commands of the game, appended by
+                      append_moves() only if no other process appended
+                      commands in the meantime
+    snapshot        : a checkpoint of the game (see checkpoint.py) and the
+                      number of commands it contains, the game is loaded
+                      from its snapshot and the commands after it.  The
+                      MemoryStore only keeps these commands.
+    chat            : the chat of the game, see Chat
+
+    Every method taking a game_id returns None (or False) if there is no
+    game with that id.
+    """
+
+    blocking = False    # whether the calls may wait e.g. for other processes
+
+    def __init__(self, chat_size=200):
+        self.chat_size = chat_size
+        self.unique_id = 1  # counts up from 1 to assign unique game ids
+        self.games = {}     # dictionary of {game_id: dict}
+
+    def create_game(self, game_id=None, moves=0):
+        """
+        Returns the id of the new game, a new one if game_id is None.
+        The commands of the game start after the first moves ones, which
+        its first snapshot contains.
+        """
+        if game_id is None:
+            game_id = self.unique_id
+        self.unique_id = max(self.unique_id, game_id + 1)
+        self.games[game_id] = {"info": None, "offset": moves, "moves": [],
+                               "snapshot": None, "chat": Chat(self.chat_size)}
+        return game_id
+
+    def has_game(self, game_id):
+        return game_id in self.games
+
+    def delete_game(self, game_id):
+        return self.games.pop(game_id, None) is not None
+
+    def list_games(self):
+        # games without info are still being created
+        return [game["info"] for game in self.games.values() if game["info"]]
+
+    def append_moves(self, game_id, start, moves, info):
+        """
+        Appends the commands if the game has exactly start commands so
+        far and updates the info of the game.  Returns False otherwise.
+        """
+        game = self.games.get(game_id)
+        if game is None or game["offset"] + len(game["moves"]) != start:
+            return False
+        game["moves"].extend(moves)
+        game["info"] = info
+        return True
+
+    def get_moves(self, game_id, start=0):
+        # the kept commands from the command with index start on
+        game = self.games.get(game_id)
+        if game is None:
+            return None
+        return game["moves"][max(start - game["offset"], 0):]
+
+    def save_snapshot(self, game_id, moves, data):
+        # keeps the snapshot containing the most commands and the
+        # commands after it
+        game = self.games.get(game_id)
+        if game is not None and (game["snapshot"] is None
+                                 or game["snapshot"][0] <= moves):
+            game["snapshot"] = (moves, data)
+            if moves > game["offset"]:
+                del game["moves"][:moves - game["offset"]]
+                game["offset"] = moves
+
+    def load_snapshot(self, game_id):
+        # returns (moves, data)
+        game = self.games.get(game_id)
+        return None if game is None else game["snapshot"]
+
+    def get_chat(self, game_id):
+        game = self.games.get(game_id)
+        return None if game is None else game["chat"]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    info TEXT,
+    moves INTEGER NOT NULL DEFAULT 0,
+    snapshot_moves INTEGER,
+    snapshot BLOB
+);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    move TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    game_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    text TEXT NOT NULL,
+    time TEXT NOT NULL,
+    PRIMARY KEY (game_id, id)
+);
+"""
+
+class SQLiteStore():
+    """
+    Store in a SQLite database shared by all worker processes of the
+    server, see MemoryStore for the methods.  Every thread gets its own
+    connection, writes are serialized by SQLite.
+    """
+
+    blocking = True
+
+    def __init__(self, path, chat_size=200, timeout=10.0):
+        self.path = path
+        self.chat_size = chat_size
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connect(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            # autocommit mode, transactions are started explicitly
+            db = sqlite3.connect(self.path, timeout=self.timeout,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # the database is created by the first connection
+            db.executescript(SCHEMA)
+            self.local.db = db
+        return db
+
+    def transaction(self):
+        return Transaction(self.connect())
+
+    def create_game(self, game_id=None, moves=0):
+        with self.transaction() as db:
+            cursor = db.execute("INSERT INTO games (id, moves) VALUES (?, ?)",
+                                (game_id, moves))
+            return cursor.lastrowid
+
+    def has_game(self, game_id):
+        return self.connect().execute("SELECT 1 FROM games WHERE id = ?",
+                                      (game_id,)).fetchone() is not None
+
+    def delete_game(self, game_id):
+        with self.transaction() as db:
+            cursor = db.execute("DELETE FROM games WHERE id = ?", (game_id,))
+            db.execute("DELETE FROM moves WHERE game_id = ?", (game_id,))
+            db.execute("DELETE FROM messages WHERE game_id = ?", (game_id,))
+            return cursor.rowcount > 0
+
+    def list_games(self):
+        rows = self.connect().execute(
+            "SELECT info FROM games WHERE info IS NOT NULL ORDER BY id")
+        return [json.loads(info) for info, in rows]
+
+    def append_moves(self, game_id, start, moves, info):
+        with self.transaction() as db:
+            # the moves counter of the game is the lock of the append
+            cursor = db.execute(
+                "UPDATE games SET moves = ?, info = ? WHERE id = ? AND moves = ?",
+                (start + len(moves), json.dumps(info), game_id, start))
+            if not cursor.rowcount:
+                return False
+            db.executemany(
+                "INSERT INTO moves (game_id, seq, move) VALUES (?, ?, ?)",
+                [(game_id, start + i, json.dumps(move, separators=(",", ":")))
+                 for i, move in enumerate(moves)])
+            return True
+
+    def get_moves(self, game_id, start=0):
+        db = self.connect()
+        if db.execute("SELECT 1 FROM games WHERE id = ?",
+                      (game_id,)).fetchone() is None:
+            return None
+        rows = db.execute(
+            "SELECT move FROM moves WHERE game_id = ? AND seq >= ? ORDER BY seq",
+            (game_id, start))
+        return [json.loads(move) for move, in rows]
+
+    def save_snapshot(self, game_id, moves, data):
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE games SET snapshot_moves = ?, snapshot = ? "
+                "WHERE id = ? AND (snapshot_moves IS NULL OR snapshot_moves <= ?)",
+                (moves, data, game_id, moves))
+            # the snapshot contains the first moves commands
+            db.execute("DELETE FROM moves WHERE game_id = ? AND seq < ?",
+                       (game_id, moves))
+
+    def load_snapshot(self, game_id):
+        row = self.connect().execute(
+            "SELECT snapshot_moves, snapshot FROM games WHERE id = ?",
+            (game_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0], bytes(row[1])
+
+    def get_chat(self, game_id):
+        if self.connect().execute("SELECT 1 FROM games WHERE id = ?",
+                                  (game_id,)).fetchone() is None:
+            return None
+        return SQLiteChat(self, game_id, self.chat_size)
+
+class Transaction():
+    # takes the write lock of the database right away, such that the
+    # reads of the transaction are not outdated by other processes
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+class SQLiteChat():
+    """
+    Chat of a game stored in a SQLiteStore, with the methods of Chat.
+    """
+
+    def __init__(self, store, game_id, size=200):
+        self.store = store
+        self.game_id = game_id
+        self.size = size
+
+    def add_message(self, sender, text):
+        with self.store.transaction() as db:
+            message_id, = db.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM messages WHERE game_id = ?",
+                (self.game_id,)).fetchone()
+            message = {
+                "id": message_id,
+                "sender": sender,
+                "text": text,
+                "time": datetime.datetime.now().strftime("%H:%M:%S")
+            }
+            db.execute("INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                       (self.game_id, message_id, sender, text,
+                        message["time"]))
+            # only the last size messages are kept
+            db.execute("DELETE FROM messages WHERE game_id = ? AND id <= ?",
+                       (self.game_id, message_id - self.size))
+        return message
+
+    def get_history(self, before_id=None, limit=50):
+        # see Chat.get_history()
+        db = self.store.connect()
+        if before_id is None:
+            before_id = float("inf")
+        rows = db.execute(
+            "SELECT id, sender, text, time FROM messages "
+            "WHERE game_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (self.game_id, before_id, limit + 1)).fetchall()
+        messages = [{"id": message_id, "sender": sender, "text": text,
+                     "time": time}
+                    for message_id, sender, text, time in reversed(rows[:limit])]
+        return {"messages": messages, "hasMore": len(rows) > limit}
@@ -0,0 +1,127 @@
+"""
+Micro-benchmark of the card rules: the attribute comparisons against the
+precomputed compatibility tables used by the Card methods.
+
+    python -m benchmarks.cards
+    python -m benchmarks.cards --number 50 --repeat 9
+
+Both versions run in turn in every repetition, the fastest repetition of
+each is reported as in benchmarks/suite.py.
+"""
+import argparse
+import random
+import time
+
+from assets.deck import (Card, create_cards, check_playable,
+                         check_inegleitable, check_raise_penalty)
+from assets.game import Inegleit
+
+
+def rule_pairs(n=10000, seed=1):
+    cards = create_cards()
+    rng = random.Random(seed)
+    return [(rng.choice(cards), rng.choice(cards)) for _ in range(n)]
+
+def by_attributes(pairs):
+    for card, top_card in pairs:
+        check_playable(card, top_card)
+        check_inegleitable(card, top_card)
+        check_raise_penalty(card, top_card)
+
+def by_tables(pairs):
+    for card, top_card in pairs:
+        card.playable(top_card)
+        card.inegleitable(top_card)
+        card.able_to_raise_penalty(top_card)
+
+def validation_game(n_players=4, seed=1):
+    # a started game in which every player holds seven cards
+    inegleit = Inegleit(seed=seed)
+    for i in range(n_players):
+        inegleit.add_player("player {}".format(i))
+        inegleit.deal_cards(i + 1, 7)
+    inegleit.start_game()
+    return inegleit
+
+def validate_hands(inegleit):
+    # what a bot does before every move: check every card of every hand
+    top_card = inegleit.deck.top_card()
+    penalty = dict(inegleit.penalty)
+    for player in inegleit.players.values():
+        # a player without the said UNO flag is punished for a single card
+        for card in list(player.attr["hand"]):
+            inegleit.validate_move(player, card, top_card)
+            inegleit.penalty.update(penalty)
+            inegleit.chosen_color = ""
+
+
+def repeated(run):
+    # number calls of run()
+    def run_number(number):
+        for _ in range(number):
+            run()
+    return run_number
+
+def by_attribute_methods(run):
+    # run(number) with the Card methods as they were before the tables
+    def run_by_attributes(number):
+        methods = Card.playable, Card.inegleitable, Card.able_to_raise_penalty
+        Card.playable = check_playable
+        Card.inegleitable = check_inegleitable
+        Card.able_to_raise_penalty = check_raise_penalty
+        try:
+            run(number)
+        finally:
+            Card.playable, Card.inegleitable, Card.able_to_raise_penalty = methods
+    return run_by_attributes
+
+
+def measure(first, second, number, repeat):
+    """
+    Returns the fastest of repeat runs of first(number) and of
+    second(number), in seconds.  They run in turn in every repetition,
+    such that both see the same load of the machine.
+    """
+    best = [None, None]
+    for _ in range(repeat):
+        for i, run in enumerate((first, second)):
+            start = time.perf_counter()
+            run(number)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=20,
+                        help="runs over all pairs per repetition")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    pairs = rule_pairs()
+    attributes, tables = measure(repeated(lambda: by_attributes(pairs)),
+                                 repeated(lambda: by_tables(pairs)),
+                                 args.number, args.repeat)
+    calls = 3 * len(pairs) * args.number
+
+    print("card rules, {} calls".format(calls))
+    print("  attributes : {:8.1f} ns/call".format(attributes / calls * 1e9))
+    print("  tables     : {:8.1f} ns/call".format(tables / calls * 1e9))
+    print("  speedup    : {:8.2f}x".format(attributes / tables))
+
+    inegleit = validation_game()
+    number = args.number * 50
+    moves = sum(len(p.attr["hand"]) for p in inegleit.players.values())
+    moves *= number
+    run = repeated(lambda: validate_hands(inegleit))
+    attributes, tables = measure(by_attribute_methods(run), run,
+                                 number, args.repeat)
+
+    print("validate_move, {} moves".format(moves))
+    print("  attributes : {:8.1f} ns/move".format(attributes / moves * 1e9))
+    print("  tables     : {:8.1f} ns/move".format(tables / moves * 1e9))
+    print("  speedup    : {:8.2f}x".format(attributes / tables))
+
+if __name__ == "__main__":
+    main()
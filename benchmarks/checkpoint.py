@@ -0,0 +1,83 @@
+"""
+Benchmark of the checkpoints: size and encoding time of the binary
+format against JSON, and the time a Checkpointer round blocks the event
+loop for a fixed number of changed games while the number of running
+games grows.
+
+    python -m benchmarks.checkpoint
+"""
+import asyncio
+import json
+import tempfile
+import time
+
+from assets.checkpoint import Checkpointer, pack
+from assets.eventlog import EventLog
+from assets.gamemanager import GameManager
+from simulation.bots import make_bots
+from simulation.engine import play_game
+
+
+def encoding(n=2000):
+    bots = make_bots(["lowest"] * 4, 1)
+    inegleit, _ = play_game(bots, seed=1, max_moves=50)
+    moves = inegleit.count_moves()
+
+    start = time.perf_counter()
+    for _ in range(n):
+        data = json.dumps(inegleit.to_json()).encode()
+    json_time = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        data_binary = pack(inegleit.to_json(), moves)
+    binary_time = (time.perf_counter() - start) / n
+
+    print("{:8} {:>8} {:>10}".format("format", "bytes", "us/game"))
+    print("{:8} {:8d} {:10.1f}".format("json", len(data), json_time * 1e6))
+    print("{:8} {:8d} {:10.1f}".format("binary", len(data_binary),
+                                       binary_time * 1e6))
+
+def rounds(sizes=(10, 100, 1000, 5000), changed=10, repeat=20):
+    print("\n{:>8} {:>8} {:>12} {:>12}".format(
+        "games", "changed", "loop ms", "round ms"))
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            event_log = EventLog(directory, snapshot_interval=0)
+            checkpointer = Checkpointer(event_log)
+            games = GameManager(event_log=event_log, checkpointer=checkpointer)
+            for _ in range(size):
+                inegleit = games.games[asyncio.run(games.create_game())["game"]["id"]]
+                for name in ("bene", "lara", "tom"):
+                    inegleit.add_player(name)
+                games.save_game(inegleit)
+
+            async def measure():
+                await checkpointer.flush()
+                blocked = total = 0.0
+                for i in range(repeat):
+                    for game_id in range(1, changed + 1):
+                        inegleit = games.games[(game_id * 7 + i) % size + 1]
+                        inegleit.deal_cards(1, 1)
+                        games.save_game(inegleit)
+
+                    # the round blocks the loop only until the executor
+                    # takes over the writes
+                    start = time.perf_counter()
+                    flush = asyncio.ensure_future(checkpointer.flush())
+                    await asyncio.sleep(0)
+                    blocked += time.perf_counter() - start
+                    await flush
+                    total += time.perf_counter() - start
+                return blocked / repeat, total / repeat
+
+            blocked, total = asyncio.run(measure())
+            print("{:8d} {:8d} {:12.2f} {:12.2f}".format(
+                size, changed, blocked * 1e3, total * 1e3))
+
+def main():
+    encoding()
+    rounds()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of drawing cards under constant reshuffling: the array-backed
+Deck against the list implementation it replaced.
+
+    python -m benchmarks.deck
+"""
+import random
+import time
+
+from assets.deck import Deck
+
+
+class ListDeck(Deck):
+    # the former list based draw pile, with the result of the recursion
+    # returned instead of dropped
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.current_cards = [self.allcards[i] for i in self.draw]
+
+    def deal_cards(self, n):
+        if n < len(self.current_cards):
+            cards = [self.current_cards.pop() for i in range(n)]
+            return cards
+        else:
+            topcard = self.pile.pop()
+            self.current_cards.extend(self.pile)
+            self.pile = [topcard]
+            random.shuffle(self.current_cards)
+            return self.deal_cards(n)
+
+
+def draw_and_play(deck, draws, hand_size=12, batch=2):
+    """
+    Draws batch cards at a time and plays the oldest cards of a hand of
+    hand_size cards, such that the pile is reshuffled into the deck
+    every ~100 draws.
+    """
+    hand = deck.deal_cards(hand_size)
+    deck.place_starting_card()
+
+    start = time.perf_counter()
+    for _ in range(draws // batch):
+        hand.extend(deck.deal_cards(batch))
+        for card in hand[:batch]:
+            deck.play_card(card)
+        del hand[:batch]
+    return time.perf_counter() - start
+
+
+def main(draws=1000000, repeat=5):
+    print("{} draws".format(draws))
+    for batch in (1, 4, 12):
+        # the runs alternate, such that both decks see the same noise of
+        # the machine, and the fastest run counts
+        old, new = [], []
+        for _ in range(repeat):
+            old.append(draw_and_play(ListDeck(seed=1), draws, batch=batch))
+            new.append(draw_and_play(Deck(seed=1), draws, batch=batch))
+        old, new = min(old), min(new)
+
+        print("  {} card(s) per draw".format(batch))
+        print("    list     : {:8.1f} ns/card".format(old / draws * 1e9))
+        print("    array    : {:8.1f} ns/card".format(new / draws * 1e9))
+        print("    speedup  : {:8.2f}x".format(old / new))
+
+if __name__ == "__main__":
+    main()
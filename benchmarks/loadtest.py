@@ -0,0 +1,324 @@
+"""
+End-to-end load test of one uvicorn worker.  Starts the app of main.py
+in a subprocess, connects a Socket.IO client per player (and optional
+spectators) and plays games through the /game/* routes, the tables are
+played concurrently.  For every number of tables it reports the request
+latency, the socket messages and bytes pushed per move and the lag of
+the server's event loop.
+
+    python -m benchmarks.loadtest --tables 1 10 50 --players 4
+
+With --dispatcher N the games are played through the dispatcher of
+dispatcher.py sharding them over N workers instead, the lag is the one
+of the dispatcher's event loop.
+
+    python -m benchmarks.loadtest --tables 10 50 --dispatcher 4
+
+Requires aiohttp for the HTTP and Socket.IO clients.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import socketio
+
+from assets.deck import create_cards
+
+EVENTS = ("state-delta", "state-snapshot", "hand-delta", "hand-snapshot",
+          "legal-moves", "message", "notification", "playerstate",
+          "inegleit")
+
+BLACK_CARDS = {card.attr["id"] for card in create_cards()
+               if card.attr["color"] == "black"}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+# server side
+
+def serve(port, workers=0, transport="websocket"):
+    """
+    Runs the app of main.py, or the dispatcher with workers on the ports
+    after port, with a monitor of the event loop lag, which is read and
+    reset by GET /loadtest/lag.
+    """
+    import uvicorn
+    if workers:
+        import dispatcher
+        app = dispatcher.create_app(workers, port + 1, "", transport)
+    else:
+        import main
+        app = main.app
+
+    lags = []
+
+    async def monitor(interval=0.01):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lags.append(loop.time() - start - interval)
+
+    @app.on_event("startup")
+    async def start_monitor():
+        asyncio.ensure_future(monitor())
+
+    @app.get("/loadtest/lag")
+    def lag():
+        values = list(lags)
+        lags.clear()
+        return {"p50": percentile(values, 50), "p99": percentile(values, 99),
+                "max": max(values, default=0.0)}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# client side
+
+class Client():
+    """
+    Socket.IO client counting the received messages and their size.
+    """
+
+    def __init__(self, url, transport="websocket"):
+        self.url = url
+        self.transport = transport
+        self.sio = socketio.AsyncClient()
+        self.messages = 0
+        self.bytes = 0
+        for event in EVENTS:
+            self.sio.on(event, self.receive)
+
+    async def receive(self, data=None):
+        self.messages += 1
+        self.bytes += len(json.dumps(data))
+
+    async def join(self, game_id, player_id=None):
+        await self.sio.connect(self.url, transports=[self.transport])
+        await self.sio.call("join-game", {"gameId": game_id,
+                                          "playerId": player_id})
+
+    async def close(self):
+        await self.sio.disconnect()
+        # the polling transport leaves its HTTP session open, also after
+        # the last poll returned
+        await self.sio.wait()
+        if self.sio.eio.http is not None:
+            await self.sio.eio.http.close()
+
+
+class LoadTest():
+
+    def __init__(self, url, players=4, spectators=0, think=0.0,
+                 max_moves=300, transport="websocket"):
+        self.url = url
+        self.transport = transport
+        self.players = players
+        self.spectators = spectators
+        self.think = think
+        self.max_moves = max_moves
+
+        self.latencies = {}     # {route: [seconds]}
+        self.moves = 0
+
+    async def request(self, session, method, route, **params):
+        start = time.perf_counter()
+        async with session.request(method, self.url + "/game/" + route,
+                                   params=params) as response:
+            data = await response.json()
+        self.latencies.setdefault(route, []).append(
+            time.perf_counter() - start)
+        return data
+
+    async def play_table(self, session, clients):
+        post = lambda route, **p: self.request(session, "POST", route, **p)
+        get = lambda route, **p: self.request(session, "GET", route, **p)
+
+        game_id = (await post("create_game"))["game"]["id"]
+        player_ids = []
+        for i in range(self.players):
+            response = await post("add_player", game_id=game_id,
+                                  player_name="player {}".format(i))
+            player_ids.append(response["player"]["id"])
+            await post("deal_cards", game_id=game_id,
+                       player_id=player_ids[-1], n_cards=7)
+
+        sockets = [Client(self.url, self.transport)
+                   for _ in range(self.players + self.spectators)]
+        clients.extend(sockets)
+        await asyncio.gather(*[
+            client.join(game_id, player_ids[i] if i < self.players else None)
+            for i, client in enumerate(sockets)])
+        await post("start_game", game_id=game_id)
+
+        finished = 0
+        for _ in range(self.max_moves):
+            if finished >= self.players - 1:
+                break
+            player_id = (await get("active_player", game_id=game_id))["id"]
+            moves = await get("legal_moves", game_id=game_id,
+                              player_id=player_id)
+
+            if moves["chooseColor"]:
+                response = await post("choose_color", game_id=game_id,
+                                      player_id=player_id, color="red")
+            elif moves["play"]:
+                card_id = min(moves["play"])
+                route = ("play_black_card" if card_id in BLACK_CARDS
+                         else "play_card")
+                response = await post(route, game_id=game_id,
+                                      player_id=player_id, card_id=card_id)
+            elif moves["sayUnoFirst"]:
+                response = await post("say_uno", game_id=game_id,
+                                      player_id=player_id)
+            elif moves["canPickUp"]:
+                response = await post("pickup_card", game_id=game_id,
+                                      player_id=player_id)
+            else:
+                response = await post("cant_play", game_id=game_id,
+                                      player_id=player_id)
+
+            self.moves += 1
+            if "playerFinished" in response:
+                finished += 1
+            if self.think:
+                await asyncio.sleep(self.think)
+
+        return game_id
+
+    async def run(self, tables):
+        clients = []
+        async with aiohttp.ClientSession() as session:
+            # resets the lag of the previous run
+            async with session.get(self.url + "/loadtest/lag"):
+                pass
+
+            start = time.perf_counter()
+            game_ids = await asyncio.gather(*[
+                self.play_table(session, clients) for _ in range(tables)])
+            elapsed = time.perf_counter() - start
+
+            # the pushes of the last moves are still on their way
+            await asyncio.sleep(0.5)
+            async with session.get(self.url + "/loadtest/lag") as response:
+                lag = await response.json()
+
+            for game_id in game_ids:
+                await self.request(session, "POST", "close_game",
+                                   game_id=game_id)
+
+        await asyncio.gather(*[client.close() for client in clients])
+
+        latencies = [value for values in self.latencies.values()
+                     for value in values]
+        moves = self.moves or 1
+        return {
+            "tables": tables,
+            "clients": len(clients),
+            "moves": self.moves,
+            "movesPerSecond": self.moves / elapsed,
+            "requests": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "messagesPerMove": sum(c.messages for c in clients) / moves,
+            "bytesPerMove": sum(c.bytes for c in clients) / moves,
+            "lagP99": lag["p99"],
+            "lagMax": lag["max"],
+        }
+
+
+def start_server(port, workers=0, transport="websocket"):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.loadtest", "--serve", str(port),
+         "--dispatcher", str(workers), "--transport", transport],
+        env=dict(os.environ, PYTHONUNBUFFERED="1"),
+        stdout=subprocess.DEVNULL)
+
+    # waits until the app answers
+    async def ready(url):
+        async with aiohttp.ClientSession() as session:
+            for _ in range(300):
+                try:
+                    async with session.get(url + "/game/list_games"):
+                        return
+                except aiohttp.ClientError:
+                    await asyncio.sleep(0.1)
+        raise RuntimeError("server did not start")
+
+    try:
+        asyncio.get_event_loop().run_until_complete(
+            ready("http://127.0.0.1:{}".format(port)))
+    except Exception:
+        server.kill()
+        raise
+    return server
+
+def print_table(rows):
+    print("{:>6} {:>7} {:>7} {:>8} {:>8} {:>8} {:>8} {:>9} {:>9} {:>8} {:>8}"
+          .format("tables", "clients", "moves", "moves/s", "p50 ms",
+                  "p95 ms", "p99 ms", "msg/move", "B/move", "lag p99",
+                  "lag max"))
+    for row in rows:
+        print("{tables:6d} {clients:7d} {moves:7d} {movesPerSecond:8.1f} "
+              "{p50:8.2f} {p95:8.2f} {p99:8.2f} {messagesPerMove:9.1f} "
+              "{bytesPerMove:9.0f} {lagP99:8.2f} {lagMax:8.2f}".format(
+                  **dict(row, p50=row["p50"] * 1e3, p95=row["p95"] * 1e3,
+                         p99=row["p99"] * 1e3, lagP99=row["lagP99"] * 1e3,
+                         lagMax=row["lagMax"] * 1e3)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tables", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--spectators", type=int, default=0,
+                        help="sockets per table watching without a player")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="seconds between the moves of a table")
+    parser.add_argument("--max-moves", type=int, default=300,
+                        help="moves per table")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--transport", choices=["websocket", "polling"],
+                        default="websocket")
+    parser.add_argument("--dispatcher", type=int, default=0, metavar="N",
+                        help="serve through the dispatcher with N workers")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.dispatcher, args.transport)
+        return
+
+    url = "http://127.0.0.1:{}".format(args.port)
+    server = start_server(args.port, args.dispatcher, args.transport)
+    try:
+        rows = []
+        for tables in args.tables:
+            test = LoadTest(url, args.players, args.spectators, args.think,
+                            args.max_moves, args.transport)
+            rows.append(asyncio.get_event_loop().run_until_complete(
+                test.run(tables)))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the logging overhead per move.  Games of bots are played
+with the backend logger writing to the file right away (the setup of
+main.py before the queue), through the queue of assets/logqueue.py at
+several levels, and without logging.  "us/move" is the time of the
+playing thread, "drained" includes writing the queued records.
+
+    python -m benchmarks.logs
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from assets.logqueue import FORMAT, setup_logging
+from simulation.bots import make_bots
+from simulation.engine import play_game
+
+SETUPS = (("off", None), ("file", "DEBUG"), ("queue", "DEBUG"),
+          ("queue", "INFO"), ("queue", "WARNING"))
+
+
+def configure(logger, setup, level, path):
+    # returns a function waiting for the records to be written
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+
+    if setup == "off":
+        logger.setLevel(logging.CRITICAL + 1)
+        return lambda: None
+    if setup == "file":
+        handler = logging.FileHandler(path, mode="a")
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        return handler.close
+    return setup_logging(logger, path, level).stop
+
+def run(setup, level, n_games, players):
+    logger = logging.getLogger("backend")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "inegleit.log")
+        stop = configure(logger, setup, level, path)
+
+        moves = 0
+        start = time.perf_counter()
+        for seed in range(1, n_games + 1):
+            bots = make_bots(["random"] * players, seed)
+            _, summary = play_game(bots, seed=seed, max_moves=500)
+            moves += summary["moves"]
+        elapsed = time.perf_counter() - start
+        stop()
+        drained = time.perf_counter() - start
+
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        configure(logger, "off", None, path)
+    return {"setup": setup, "level": level or "-", "moves": moves,
+            "perMove": elapsed / moves, "drainedPerMove": drained / moves,
+            "bytesPerMove": size / moves}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:6} {:8} {:>8} {:>9} {:>9} {:>9} {:>8}".format(
+        "setup", "level", "moves", "us/move", "overhead", "drained",
+        "B/move"))
+    base = None
+    for setup, level in SETUPS:
+        # the fastest of the repetitions
+        row = min((run(setup, level, args.games, args.players)
+                   for _ in range(args.repeat)),
+                  key=lambda row: row["perMove"])
+        if base is None:
+            base = row["perMove"]
+        print("{:6} {:8} {:8d} {:9.1f} {:9.1f} {:9.1f} {:8.0f}".format(
+            setup, row["level"], row["moves"], row["perMove"] * 1e6,
+            (row["perMove"] - base) * 1e6, row["drainedPerMove"] * 1e6,
+            row["bytesPerMove"]))
+
+if __name__ == "__main__":
+    main()
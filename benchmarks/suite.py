@@ -0,0 +1,238 @@
+"""
+Micro-benchmarks of the hot paths of the game core at several table
+sizes, with machine readable results and a comparison to a baseline.
+
+    python -m benchmarks.suite                          # print results
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+
+With --compare the exit code is 1 if a benchmark got slower than the
+baseline by more than --threshold.  The baseline has to be recorded on
+the same machine to be meaningful.
+"""
+import argparse
+import json
+import pickle
+import platform
+import sys
+import time
+
+from assets.deck import Deck
+from assets.game import Inegleit
+from simulation.bots import make_bots
+
+TABLE_SIZES = (2, 4, 8)
+
+
+def find_states(n_players, condition, n=20, max_games=200):
+    """
+    Plays games with LowestCardBots and returns up to n pickled games
+    in which condition(inegleit, player_id) holds for the active player,
+    at most one per game and turn.
+    """
+    states = []
+    for seed in range(1, max_games + 1):
+        bots = make_bots(["lowest"] * n_players, seed)
+        inegleit = Inegleit(seed=seed)
+        for seat in range(n_players):
+            inegleit.add_player("player {}".format(seat))
+            inegleit.deal_cards(seat + 1, 7)
+        inegleit.start_game()
+
+        for _ in range(300):
+            if len(inegleit.winners) >= n_players - 1:
+                break
+            player_id = inegleit.get_active_player_id()
+            if condition(inegleit, player_id):
+                states.append(pickle.dumps(inegleit))
+                break
+            moves = inegleit.get_legal_moves(player_id)
+            name, args = bots[player_id - 1].turn(inegleit, player_id, moves)
+            getattr(inegleit, name)(*args)
+
+        if len(states) == n:
+            break
+    return states
+
+def playable(inegleit, player_id, black):
+    # the first legal card of the active player of the given color
+    for card_id in inegleit.get_legal_moves(player_id)["play"]:
+        card = inegleit.deck.get_card(card_id)
+        if (card.attr["color"] == "black") == black:
+            return card_id
+    return None
+
+
+# Every benchmark returns (prepare, run).  prepare() builds the arguments
+# of one call outside of the timing, run(*args) is timed.
+
+def bench_validate_move(n_players):
+    states = find_states(n_players, lambda g, p: g.players[p].attr["hand"])
+    def prepare(i):
+        inegleit = pickle.loads(states[i % len(states)])
+        player = inegleit.get_active_player()
+        card = next(iter(player.attr["hand"]))
+        return inegleit, player, card, inegleit.deck.top_card()
+    def run(inegleit, player, card, top_card):
+        inegleit.validate_move(player, card, top_card)
+    return prepare, run
+
+def bench_play_card(n_players, black=False):
+    def condition(inegleit, player_id):
+        return (len(inegleit.players[player_id].attr["hand"]) > 1
+                and playable(inegleit, player_id, black) is not None)
+    states = find_states(n_players, condition)
+    def prepare(i):
+        inegleit = pickle.loads(states[i % len(states)])
+        player_id = inegleit.get_active_player_id()
+        return inegleit, player_id, playable(inegleit, player_id, black)
+    def run(inegleit, player_id, card_id):
+        if black:
+            inegleit.play_black_card(player_id, card_id)
+        else:
+            inegleit.play_card(player_id, card_id)
+    return prepare, run
+
+def bench_play_black_card(n_players):
+    return bench_play_card(n_players, black=True)
+
+def bench_event_pickup_card(n_players):
+    states = find_states(
+        n_players, lambda g, p: g.get_legal_moves(p)["canPickUp"])
+    def prepare(i):
+        inegleit = pickle.loads(states[i % len(states)])
+        return inegleit, inegleit.get_active_player_id()
+    def run(inegleit, player_id):
+        inegleit.event_pickup_card(player_id)
+    return prepare, run
+
+def bench_next_player(n_players):
+    inegleit = pickle.loads(find_states(n_players, lambda g, p: True, 1)[0])
+    def prepare(i):
+        return (inegleit,)
+    def run(inegleit):
+        inegleit.next_player()
+    return prepare, run
+
+def bench_get_all_players(n_players):
+    inegleit = pickle.loads(find_states(n_players, lambda g, p: True, 1)[0])
+    def prepare(i):
+        return (inegleit,)
+    def run(inegleit):
+        inegleit.get_all_players()
+    return prepare, run
+
+def bench_get_cards(n_players):
+    inegleit = pickle.loads(find_states(n_players, lambda g, p: True, 1)[0])
+    def prepare(i):
+        return inegleit, (i % n_players) + 1
+    def run(inegleit, player_id):
+        inegleit.get_cards(player_id)
+    return prepare, run
+
+def bench_deal_cards(n_cards):
+    # dealt cards are played right away, the pile is reshuffled regularly
+    deck = Deck(seed=1)
+    deck.place_starting_card()
+    def prepare(i):
+        return (deck,)
+    def run(deck):
+        deck.add_to_pile(deck.deal_cards(n_cards))
+    return prepare, run
+
+
+BENCHMARKS = {
+    "validate_move": (bench_validate_move, TABLE_SIZES),
+    "play_card": (bench_play_card, TABLE_SIZES),
+    "play_black_card": (bench_play_black_card, TABLE_SIZES),
+    "event_pickup_card": (bench_event_pickup_card, TABLE_SIZES),
+    "next_player": (bench_next_player, TABLE_SIZES),
+    "get_all_players": (bench_get_all_players, TABLE_SIZES),
+    "get_cards": (bench_get_cards, TABLE_SIZES),
+    "Deck.deal_cards": (bench_deal_cards, (1, 4)),
+}
+
+
+def measure(prepare, run, number, repeat):
+    # the fastest of repeat runs, in nanoseconds per call
+    best = None
+    for _ in range(repeat):
+        calls = [prepare(i) for i in range(number)]
+        start = time.perf_counter()
+        for args in calls:
+            run(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number * 1e9
+
+def run_suite(number=300, repeat=5, only=None):
+    results = {}
+    for name, (bench, sizes) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for size in sizes:
+            prepare, run = bench(size)
+            key = "{}[{}]".format(name, size)
+            results[key] = round(measure(prepare, run, number, repeat), 1)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "unit": "ns/call",
+        "results": results,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Prints the results next to the baseline and returns the names of the
+    benchmarks slower than threshold times the baseline.
+    """
+    regressions = []
+    print("{:28} {:>12} {:>12} {:>8}".format(
+        "benchmark", "ns/call", "baseline", "ratio"))
+    for key, value in results["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            print("{:28} {:12.1f} {:>12} {:>8}".format(key, value, "-", "-"))
+            continue
+        ratio = value / base
+        flag = ""
+        if ratio > threshold:
+            regressions.append(key)
+            flag = "  slower"
+        print("{:28} {:12.1f} {:12.1f} {:8.2f}{}".format(
+            key, value, base, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=300,
+                        help="calls per repetition")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--save", metavar="PATH",
+                        help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="compare with a baseline written by --save")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio to the baseline counted as regression")
+    args = parser.parse_args()
+
+    results = run_suite(args.number, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("slower than the baseline: {}".format(", ".join(regressions)))
+            sys.exit(1)
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
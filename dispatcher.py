@@ -0,0 +1,409 @@
+"""
+Front process sharding the games over worker processes by game id, as
+an alternative to a store shared by the workers (see assets/store.py).
+
+    python -m dispatcher --workers 4 --port 8000
+
+The dispatcher starts the workers, each serving the app of main.py on a
+port of the loopback interface and keeping its games in memory.  A game belongs to the
+worker the consistent hash of its id points to (see assets/hashring.py):
+the /game/* requests are forwarded to the worker owning the game, and
+every socket joining a game gets a connection to the owner whose pushes
+are relayed to it.  POST /dispatcher/add_worker starts another worker and
+moves the games it takes over.
+
+The workers only accept the routes moving games from the dispatcher,
+which sends its secret DISPATCHER_SECRET (a random one if not set) in
+the header X-Dispatcher-Secret.  POST /dispatcher/add_worker requires
+the header as well, so it is disabled without DISPATCHER_SECRET.
+"""
+import argparse
+import asyncio
+import collections
+import logging
+import os
+import secrets
+import sys
+
+import aiohttp
+import socketio
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from assets.hashring import HashRing
+
+logger = logging.getLogger("backend")
+
+# events pushed by the workers to the sockets
+EVENTS = ("state-delta", "state-snapshot", "hand-delta", "hand-snapshot",
+          "legal-moves", "message", "notification", "playerstate",
+          "inegleit")
+
+
+class Worker():
+    """
+    Worker process serving the app of main.py on the port of the
+    loopback interface.  (uvicorn 0.11 fails on the connections to a unix
+    socket, see uvicorn.protocols.utils.get_local_addr.)
+    """
+
+    def __init__(self, name, port, env):
+        self.name = name
+        self.url = "http://127.0.0.1:{}".format(port)
+        self.port = port
+        self.env = env
+        # sent with the requests of the dispatcher, not the forwarded ones
+        self.headers = {"X-Dispatcher-Secret": env["DISPATCHER_SECRET"]}
+        self.process = None
+        self.http = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+            "--port", str(self.port), "--log-level", "warning", env=self.env)
+        self.http = aiohttp.ClientSession()
+
+        # waits until the app answers
+        for _ in range(100):
+            try:
+                await self.request("GET", "list_games")
+                return
+            except (aiohttp.ClientError, OSError):
+                await asyncio.sleep(0.1)
+        raise RuntimeError("worker {} did not start".format(self.name))
+
+    async def stop(self):
+        # the workers write their checkpoints on SIGTERM
+        await self.http.close()
+        self.process.terminate()
+        await self.process.wait()
+
+    async def request(self, method, route, params=None, json=None):
+        async with self.http.request(method, self.url + "/game/" + route,
+                                     params=params, json=json,
+                                     headers=self.headers) as response:
+            return await response.json()
+
+    async def forward(self, request, params):
+        # passes the HTTP request on and returns the answer of the worker
+        async with self.http.request(request.method,
+                                     self.url + request.url.path,
+                                     params=params,
+                                     data=await request.body(),
+                                     headers=request.headers) as response:
+            return Response(await response.read(), status_code=response.status,
+                            media_type=response.content_type)
+
+
+class Upstream():
+    """
+    Connection of a client socket to the worker owning its game, the
+    pushes of the worker are relayed to the socket.
+    """
+
+    def __init__(self, sio, sid, worker, transport="websocket"):
+        self.sio = sio
+        self.sid = sid
+        self.worker = worker
+        self.transport = transport
+        self.joined = None  # data of the last 'join-game' event
+
+        self.client = socketio.AsyncClient()
+        for event in EVENTS:
+            self.client.on(event, self.relay(event))
+
+    def relay(self, event):
+        async def handler(data=None):
+            await self.sio.emit(event, data, room=self.sid)
+        return handler
+
+    async def connect(self):
+        await self.client.connect(self.worker.url, transports=[self.transport])
+
+    async def call(self, event, data=None):
+        return await self.client.call(event, data)
+
+    async def close(self):
+        await self.client.disconnect()
+        await self.client.wait()
+
+
+class Dispatcher():
+    """
+    Keeps the workers and forwards the requests and socket events of a
+    game to its owner.  While a game moves to another worker, its
+    requests wait until the move is finished.
+    """
+
+    def __init__(self, worker_port=9000, event_log_dir="eventlog",
+                 transport="websocket", replicas=64, secret=None):
+        self.worker_port = worker_port  # of the first worker, counting up
+        self.event_log_dir = event_log_dir
+        self.transport = transport
+        self.secret = secret or secrets.token_hex(16)
+
+        self.workers = {}   # dictionary of {name: Worker}
+        self.ring = HashRing(replicas=replicas)
+        self.unique_id = 1  # counts up from 1 to assign unique game ids
+
+        self.moving = {}    # {game_id: asyncio.Event} set after the move
+        self.requests = collections.Counter()   # forwarded, per game id
+        self.sockets = {}   # dictionary of {sid: Upstream}
+
+        self.sio = socketio.AsyncServer(async_mode='asgi',
+                                        cors_allowed_origins='*',
+                                        logger=False)
+        self.sio.on('join-game', self.join_game)
+        self.sio.on('request-snapshot', self.request_snapshot)
+        self.sio.on('leave-game', self.leave_game)
+        self.sio.on('disconnect', self.disconnect)
+
+    async def start(self, n_workers):
+        for i in range(n_workers):
+            worker = await self.start_worker()
+            self.ring.add(worker.name)
+
+        # the workers restored the games stored by their event logs, e.g.
+        # with a different number of workers before the restart
+        for worker in self.workers.values():
+            for game in await worker.request("GET", "list_games"):
+                self.unique_id = max(self.unique_id, game["id"] + 1)
+        await self.rebalance(self.ring)
+
+    async def stop(self):
+        for upstream in list(self.sockets.values()):
+            await upstream.close()
+        for worker in self.workers.values():
+            await worker.stop()
+
+    async def start_worker(self):
+        name = "worker-{}".format(len(self.workers))
+        # every worker rotates its own log file
+        root, ext = os.path.splitext(os.environ.get("LOG_FILE", "inegleit.log"))
+        env = dict(os.environ, GAME_STORE="memory",
+                   EVENT_LOG_DIR=(os.path.join(self.event_log_dir, name)
+                                  if self.event_log_dir else ""),
+                   LOG_FILE="{}-{}{}".format(root, name, ext),
+                   DISPATCHER_SECRET=self.secret)
+        worker = Worker(name, self.worker_port + len(self.workers), env)
+        await worker.start()
+        self.workers[name] = worker
+        logger.info("Started %s", name)
+        return worker
+
+    async def owner(self, game_id):
+        while game_id in self.moving:
+            await self.moving[game_id].wait()
+        return self.workers[self.ring.get(game_id)]
+
+    # HTTP
+
+    async def forward(self, route, request):
+        params = list(request.query_params.multi_items())
+        if route == "create_game":
+            params.append(("game_id", str(self.unique_id)))
+            self.unique_id += 1
+
+        try:
+            game_id = int(dict(params)["game_id"])
+        except (KeyError, ValueError):
+            game_id = None
+
+        if game_id is not None:
+            worker = await self.owner(game_id)
+            self.requests[game_id] += 1
+            try:
+                return await worker.forward(request, params)
+            finally:
+                self.requests[game_id] -= 1
+                if not self.requests[game_id]:
+                    del self.requests[game_id]
+
+        if route == "list_games":
+            games = []
+            for worker in self.workers.values():
+                games.extend(await worker.request("GET", "list_games"))
+            return sorted(games, key=lambda game: game["id"])
+
+        # e.g. the statistics of every worker
+        return {name: await worker.request(request.method, route, params)
+                for name, worker in self.workers.items()}
+
+    # Socket.IO
+
+    async def join_game(self, sid, data):
+        try:
+            worker = await self.owner(int(data.get("gameId")))
+        except (TypeError, ValueError):
+            return {"requestValid": False, "message": "game not found"}
+
+        upstream = self.sockets.get(sid)
+        if upstream is None or upstream.worker is not worker:
+            if upstream is not None:
+                await upstream.close()
+            upstream = Upstream(self.sio, sid, worker, self.transport)
+            self.sockets[sid] = upstream
+            await upstream.connect()
+
+        upstream.joined = data
+        return await upstream.call('join-game', data)
+
+    async def request_snapshot(self, sid, data=None):
+        if sid not in self.sockets:
+            return {"requestValid": False, "message": "not in a game"}
+        return await self.sockets[sid].call('request-snapshot', data)
+
+    async def leave_game(self, sid, data=None):
+        if sid not in self.sockets:
+            return {"requestValid": False, "message": "not in a game"}
+        upstream = self.sockets.pop(sid)
+        await upstream.close()
+        return {"requestValid": True}
+
+    async def disconnect(self, sid):
+        upstream = self.sockets.pop(sid, None)
+        if upstream is not None:
+            await upstream.close()
+
+    # rebalancing
+
+    def check_secret(self, secret):
+        return secrets.compare_digest(secret.encode(), self.secret.encode())
+
+    async def add_worker(self):
+        """
+        Starts another worker and moves the games it takes over.
+        """
+        worker = await self.start_worker()
+        ring = HashRing(self.workers, self.ring.replicas)
+        moved = await self.rebalance(ring)
+        return {"requestValid": True, "worker": worker.name, "moved": moved}
+
+    async def rebalance(self, ring):
+        """
+        Switches to ring and moves the games whose owner changed.
+        Returns the number of moved games.
+        """
+        moved = 0
+        for _ in range(3):
+            moves = []
+            for name, worker in self.workers.items():
+                for game in await worker.request("GET", "list_games"):
+                    owner = ring.get(game["id"])
+                    if owner != name:
+                        moves.append((game["id"], worker, self.workers[owner]))
+
+            # the requests of the moving games wait from the switch on
+            for game_id, source, target in moves:
+                self.moving[game_id] = asyncio.Event()
+            self.ring = ring
+            if not moves:
+                break
+
+            for game_id, source, target in moves:
+                await self.move_game(game_id, source, target)
+            moved += len(moves)
+
+        return moved
+
+    async def move_game(self, game_id, source, target):
+        # waits for the forwarded requests of the game to finish
+        try:
+            while self.requests[game_id]:
+                await asyncio.sleep(0.01)
+            game = await source.request("GET", "export_game",
+                                        {"game_id": game_id})
+            if game["requestValid"]:
+                await target.request("POST", "import_game",
+                                     {"game_id": game_id}, json=game)
+                await source.request("POST", "close_game",
+                                     {"game_id": game_id})
+                logger.info("Moved game %s from %s to %s",
+                            game_id, source.name, target.name)
+        finally:
+            self.moving.pop(game_id).set()
+
+        # the sockets of the game join it again on the new owner
+        for sid, upstream in list(self.sockets.items()):
+            if upstream.joined and upstream.joined.get("gameId") == game_id:
+                await self.join_game(sid, upstream.joined)
+
+    def get_workers(self):
+        return {
+            "workers": self.ring.workers(),
+            "sockets": len(self.sockets),
+            "nextGameId": self.unique_id,
+        }
+
+
+def create_app(n_workers=2, worker_port=9000, event_log_dir="eventlog",
+               transport="websocket", secret=None):
+    # without a secret add_worker cannot be called
+    admin_secret = secret or os.environ.get("DISPATCHER_SECRET", "")
+    dispatcher = Dispatcher(worker_port, event_log_dir, transport,
+                            secret=admin_secret)
+
+    app = FastAPI()
+    app.dispatcher = dispatcher
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["*"],
+    )
+
+    @app.on_event("startup")
+    async def startup():
+        await dispatcher.start(n_workers)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await dispatcher.stop()
+
+    @app.api_route("/game/{route}", methods=["GET", "POST"])
+    async def game(route: str, request: Request):
+        return await dispatcher.forward(route, request)
+
+    @app.post("/dispatcher/add_worker")
+    async def add_worker(x_dispatcher_secret: str = Header("")):
+        if not admin_secret or not dispatcher.check_secret(x_dispatcher_secret):
+            raise HTTPException(status_code=403, detail="secret required")
+        return await dispatcher.add_worker()
+
+    @app.get("/dispatcher/workers")
+    def workers():
+        return dispatcher.get_workers()
+
+    sio_asgi_app = socketio.ASGIApp(socketio_server=dispatcher.sio,
+                                    other_asgi_app=app)
+    app.add_route("/socket.io/", route=sio_asgi_app)
+    app.add_websocket_route("/socket.io/", sio_asgi_app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WORKERS", os.cpu_count())))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int,
+                        default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--worker-port", type=int, default=9000,
+                        help="port of the first worker, counting up")
+    parser.add_argument("--event-log-dir",
+                        default=os.environ.get("EVENT_LOG_DIR", "eventlog"))
+    parser.add_argument("--transport", choices=["websocket", "polling"],
+                        default="websocket",
+                        help="transport of the sockets to the workers")
+    args = parser.parse_args()
+
+    app = create_app(args.workers, args.worker_port, args.event_log_dir,
+                     args.transport)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
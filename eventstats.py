@@ -0,0 +1,265 @@
+"""
+Statistics of the played games from the JSON lines written by the event
+export (see assets/gameevents.py).  The files are read line by line and
+reduced right away, such that months of events need no more memory than
+the statistics of the players themselves.
+
+    python -m eventstats events/
+    python -m eventstats events/ --since 2026-01-01 --json
+
+Directories are searched for *.jsonl files including the rotated ones,
+also compressed with gzip.
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+
+PLAYER_FIELDS = ("games", "wins", "finished", "ranks", "moves", "denied",
+                 "plays", "inegleits", "raises", "stacks", "penaltyCards",
+                 "missedUno")
+
+
+class EventStats():
+    """
+    Counters of the events per player and per kind of card (the rules
+    of the +2, +4, reverse, skip and wild cards), filled by add().  Two
+    EventStats e.g. of different months are combined with merge().
+    """
+
+    def __init__(self):
+        self.events = 0
+        self.skipped = 0    # lines that are not events e.g. torn ones
+        self.games = 0
+        self.moves = 0
+        self.first = None   # time of the first and last event
+        self.last = None
+
+        self.players = defaultdict(Counter)     # {name: Counter}
+        self.rules = defaultdict(Counter)       # {card kind: Counter}
+        self.stacks = Counter()     # {penalty stack size: count}
+
+        # the move of the latest command, the other events of a command
+        # follow its move in the same file
+        self.move = None
+
+    def add(self, event):
+        self.events += 1
+        time = event.get("time")
+        if time is not None:
+            self.first = time if self.first is None else min(self.first, time)
+            self.last = time if self.last is None else max(self.last, time)
+
+        kind = event["event"]
+        player = self.players[event.get("player")]
+        if kind == "move":
+            self.move = event
+            self.moves += 1
+            player["moves"] += 1
+            if not event["valid"]:
+                player["denied"] += 1
+            elif "card" in event:
+                player["plays"] += 1
+                self.rules[event["card"]]["plays"] += 1
+            return
+
+        # the card of the command, if any
+        move = self.move
+        card = None
+        if (move is not None and move["game"] == event["game"]
+                and move["seq"] == event["seq"]):
+            card = move.get("card")
+
+        if kind == "start":
+            self.games += 1
+            for name in event["players"]:
+                self.players[name]["games"] += 1
+        elif kind == "inegleit":
+            player["inegleits"] += 1
+            if card:
+                self.rules[card]["inegleits"] += 1
+        elif kind == "raise":
+            player["raises"] += 1
+            if card:
+                self.rules[card]["raises"] += 1
+        elif kind == "stack":
+            player["stacks"] += 1
+            player["penaltyCards"] += event["penalty"]
+            self.stacks[event["penalty"]] += 1
+        elif kind == "missedUno":
+            player["missedUno"] += 1
+        elif kind == "finish":
+            player["finished"] += 1
+            player["ranks"] += event["rank"]
+            if event["rank"] == 1:
+                player["wins"] += 1
+
+    def merge(self, other):
+        self.events += other.events
+        self.skipped += other.skipped
+        self.games += other.games
+        self.moves += other.moves
+        for time in (other.first, other.last):
+            if time is not None:
+                self.first = time if self.first is None else min(self.first, time)
+                self.last = time if self.last is None else max(self.last, time)
+        for name, counts in other.players.items():
+            self.players[name].update(counts)
+        for kind, counts in other.rules.items():
+            self.rules[kind].update(counts)
+        self.stacks.update(other.stacks)
+
+    def get_report(self):
+        players = {}
+        for name, counts in self.players.items():
+            if name is None:
+                continue
+            report = {field: counts[field] for field in PLAYER_FIELDS
+                      if field != "ranks"}
+            report["winRate"] = ratio(counts["wins"], counts["games"])
+            report["meanRank"] = ratio(counts["ranks"], counts["finished"])
+            report["inegleitRate"] = ratio(counts["inegleits"], counts["plays"])
+            report["meanStack"] = ratio(counts["penaltyCards"], counts["stacks"])
+            players[name] = report
+
+        rules = {}
+        for kind, counts in sorted(self.rules.items()):
+            rules[kind] = {
+                "plays": counts["plays"],
+                "inegleits": counts["inegleits"],
+                "inegleitRate": ratio(counts["inegleits"], counts["plays"]),
+                "raises": counts["raises"],
+                "raiseRate": ratio(counts["raises"], counts["plays"]),
+            }
+
+        n_stacks = sum(self.stacks.values())
+        return {
+            "events": self.events,
+            "skipped": self.skipped,
+            "games": self.games,
+            "moves": self.moves,
+            "first": self.first,
+            "last": self.last,
+            "players": players,
+            "rules": rules,
+            "stacks": {
+                "count": n_stacks,
+                "mean": ratio(sum(size * n for size, n in self.stacks.items()),
+                              n_stacks),
+                "max": max(self.stacks, default=0),
+                "histogram": dict(sorted(self.stacks.items())),
+            },
+            "missedUno": sum(counts["missedUno"]
+                             for counts in self.players.values()),
+        }
+
+def ratio(a, b):
+    return a / b if b else None
+
+
+def find_files(paths):
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, _, names in sorted(os.walk(path)):
+            for name in sorted(names):
+                if ".jsonl" in name:
+                    yield os.path.join(directory, name)
+
+def read_events(files, stats, since=None, until=None):
+    """
+    Adds the events of the files in the time range [since, until) to
+    stats, one line at a time.
+    """
+    for path in files:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as infile:
+            for line in infile:
+                try:
+                    event = json.loads(line)
+                    event["event"]
+                except (ValueError, KeyError, TypeError):
+                    stats.skipped += 1
+                    continue
+                time = event.get("time", 0)
+                if ((since is not None and time < since)
+                        or (until is not None and time >= until)):
+                    continue
+                stats.add(event)
+    return stats
+
+
+def timestamp(date):
+    return datetime.datetime.strptime(date, "%Y-%m-%d").timestamp()
+
+def print_report(report, top):
+    def date(time):
+        if time is None:
+            return "-"
+        return datetime.datetime.fromtimestamp(time).strftime("%Y-%m-%d %H:%M")
+
+    def percent(value):
+        return "{:6.1%}".format(value) if value is not None else "     -"
+
+    def mean(value):
+        return "{:6.2f}".format(value) if value is not None else "     -"
+
+    print("{} events ({} skipped) from {} to {}".format(
+        report["events"], report["skipped"], date(report["first"]),
+        date(report["last"])))
+    print("{} games, {} moves, {} missed UNOs".format(
+        report["games"], report["moves"], report["missedUno"]))
+    stacks = report["stacks"]
+    print("penalty stacks: {} picked up, mean {}, max {}".format(
+        stacks["count"], mean(stacks["mean"]).strip(), stacks["max"]))
+
+    print("\n{:8} {:>8} {:>9} {:>8}".format("card", "plays", "inegleit",
+                                           "raise"))
+    for kind, rule in report["rules"].items():
+        print("{:8} {:8d} {} {}".format(
+            kind, rule["plays"], percent(rule["inegleitRate"]).rjust(9),
+            percent(rule["raiseRate"]).rjust(8)))
+
+    players = sorted(report["players"].items(),
+                     key=lambda item: (-item[1]["games"], item[0]))
+    print("\n{:20} {:>6} {:>7} {:>6} {:>7} {:>9} {:>6} {:>6}".format(
+        "player", "games", "wins", "rank", "moves", "inegleit", "stack",
+        "noUno"))
+    for name, player in players[:top]:
+        print("{:20} {:6d} {} {} {:7d} {} {} {:6d}".format(
+            name[:20], player["games"], percent(player["winRate"]).rjust(7),
+            mean(player["meanRank"]), player["moves"],
+            percent(player["inegleitRate"]).rjust(9),
+            mean(player["meanStack"]), player["missedUno"]))
+    if len(players) > top:
+        print("... {} more players".format(len(players) - top))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="+",
+                        help="event files or directories containing them")
+    parser.add_argument("--since", type=timestamp, metavar="YYYY-MM-DD")
+    parser.add_argument("--until", type=timestamp, metavar="YYYY-MM-DD",
+                        help="first day not counted")
+    parser.add_argument("--top", type=int, default=20,
+                        help="players shown, the ones with the most games")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    stats = read_events(find_files(args.paths), EventStats(),
+                        args.since, args.until)
+    report = stats.get_report()
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report, args.top)
+
+if __name__ == "__main__":
+    main()
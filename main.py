@@ -1,5 +1,5 @@
-import datetime
 import logging
+import os
 
 from starlette.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
@@ -7,18 +7,30 @@ from fastapi import FastAPI
 import uvicorn
 import socketio
 
+from assets.logqueue import setup_logging
 from routers import game
 
-inegleit = game.inegleit
+games = game.games
 sio = game.sio
 
+# the log is written by a background thread and rotated, LOG_LEVEL=DEBUG
+# also logs every request and move. Like the event export it is started
+# on the startup of the app, importing the app creates no files.
 logger = logging.getLogger("backend")
-logfilename = "inegleit.log"
-logger.setLevel(logging.DEBUG)
-fh = logging.FileHandler(logfilename, mode="a")
-fh.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
-logger.addHandler(fh)
-logger.info("[{}] Logging started in {}".format(datetime.datetime.now().strftime("%H:%M:%S"), logfilename))
+logfilename = os.environ.get("LOG_FILE", "inegleit.log")
+listeners = []
+
+def start_logging():
+    if listeners:
+        return
+    listeners.append(setup_logging(
+        logger, logfilename,
+        level=os.environ.get("LOG_LEVEL", "INFO"),
+        max_bytes=int(os.environ.get("LOG_MAX_BYTES", 10 * 2**20)),
+        backup_count=int(os.environ.get("LOG_BACKUP_COUNT", 5)),
+        when=os.environ.get("LOG_ROTATE_WHEN")))
+    listeners.append(game.start_event_export())
+    logger.info("Logging started in %s", logfilename)
 
 origins = [
     "*",
@@ -43,88 +55,102 @@ app.include_router(
     game.router,
     prefix='/game')
 
+@app.on_event("startup")
+async def startup():
+    start_logging()
+    # games stored before the last shutdown
+    games.restore_games()
+    if game.checkpointer is not None:
+        game.checkpointer.start()
+    # prefetches the words for the insults in the background
+    game.insult_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # also on SIGTERM e.g. when the dyno restarts, uvicorn finishes the
+    # open requests and runs the shutdown handlers before exiting
+    if game.checkpointer is not None:
+        await game.checkpointer.stop()
+    game.insult_pool.stop()
+    await game.insult_pool.generator.close()
+
 # mount the socket coming from the routers/game.py file
 sio_asgi_app = socketio.ASGIApp(socketio_server=sio, other_asgi_app=app)
 
 app.add_route("/socket.io/", route=sio_asgi_app)
 app.add_websocket_route("/socket.io/", sio_asgi_app)
 
-message_id = 1
-messages = []
-message_queue = [
-    {
-        "id": 1,
-        "sender": "server", 
-        "text": "Viel Spass mit Inegleit Online!",
-        "time": datetime.datetime.now().strftime("%H:%M:%S")
-    }
-]
-
-@app.post('/lobby/send_message')
-async def send_message(player_name, client_message):
-    global message_id
-    message_id += 1
-    message_queue.append(
-        {            
-            "id": message_id, 
-            "sender": player_name, 
-            "text": client_message,
-            "time": datetime.datetime.now().strftime("%H:%M:%S")
-        }
-    )
-
-@app.middleware('http')
-async def trigger_sio_event(request, call_next):
-    response = await call_next(request)
-
-    await sio.emit('top-card', 
-        {
-            'topCard': inegleit.get_top_card(),
-        }
-    )
-
-    await sio.emit('gamestate',
-        {
-            'penalty': inegleit.penalty["own"] 
-                       + inegleit.get_active_player().attr["penalty"],
-            'colorChosen': inegleit.chosen_color != "",
-            'chosenColor': inegleit.chosen_color,
-            'activePlayerName': inegleit.get_active_player().attr["name"],
-            'forward': inegleit.forward, 
-        }
-        )
-
-    await sio.emit('player-list', 
-        {
-            'playerList': inegleit.get_all_players(),
-            'turn': inegleit.get_active_player_id(),
-        }
-    )
-
-    while message_queue:
-        message = message_queue.pop(0)
-        messages.append(message)
-        await sio.emit('message', 
-        {
-            'message': message
-        }
-    )
-
-    return response
-
 @sio.on('connect')
 async def test_connect(sid, environ):
-    logger.debug(f"Socket id {sid} connected")
+    logger.debug("Socket id %s connected", sid)
     print('connect', sid)
 
+@sio.on('join-game')
+async def join_game(sid, data):
+    """
+    Subscribes the socket to the room of the game {"gameId": (int)} and,
+    if {"playerId": (int)} is given, to the private room of the player.
+    A socket is only subscribed to one game at a time.
+    """
+    inegleit = await games.get_game(data.get("gameId"))
+    if inegleit is None:
+        return {"requestValid": False, "message": "game not found"}
+
+    player_id = data.get("playerId")
+    if player_id is not None and player_id not in inegleit.players:
+        return {"requestValid": False, "message": "player not found"}
+
+    await leave_game(sid)
+    await sio.save_session(sid, {"gameId": inegleit.game_id,
+                                 "playerId": player_id})
+
+    # the socket missed all previous pushes, deltas are sent to the
+    # rooms only after the snapshot
+    await game.emit_snapshot(inegleit, sid, player_id)
+
+    sio.enter_room(sid, game.game_room(inegleit.game_id))
+    if player_id is not None:
+        sio.enter_room(sid, game.player_room(inegleit.game_id, player_id))
+
+    logger.debug("Socket id %s joined game %s", sid, inegleit.game_id)
+    return {"requestValid": True}
+
+@sio.on('request-snapshot')
+async def request_snapshot(sid, data=None):
+    """
+    Sent by clients that missed a state or hand delta i.e. whose version
+    does not match the "since" version of the latest delta.
+    """
+    session = await sio.get_session(sid)
+    inegleit = await games.get_game(session.get("gameId"))
+    if inegleit is None:
+        return {"requestValid": False, "message": "not in a game"}
+
+    await game.emit_snapshot(inegleit, sid, session.get("playerId"))
+    return {"requestValid": True}
+
+@sio.on('leave-game')
+async def leave_game(sid, data=None):
+    session = await sio.get_session(sid)
+    if not session.get("gameId"):
+        return {"requestValid": False, "message": "not in a game"}
+
+    sio.leave_room(sid, game.game_room(session["gameId"]))
+    if session["playerId"] is not None:
+        sio.leave_room(sid, game.player_room(session["gameId"],
+                                             session["playerId"]))
+    await sio.save_session(sid, {})
+
+    return {"requestValid": True}
+
 @sio.on('disconnect request')
 async def disconnect_request(sid):
-    logger.debug(f"Socket id {sid} disconnected")
+    logger.debug("Socket id %s disconnected", sid)
     await sio.disconnect(sid)
 
 @sio.on('disconnect')
 def test_disconnect(sid):
-    logger.debug(f"Client socket id {sid} disconnected")
+    logger.debug("Client socket id %s disconnected", sid)
     print('Client disconnected')
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("backend")
+
+class Broadcaster():
+    """
+    Coalesces the state pushes of a game.  Instead of pushing after
+    every change, a game is scheduled and pushed once after the window
+    (in seconds) passed, such that all changes of e.g. one turn (play a
+    +4, choose a color) end up in a single socket message.  With a
+    window of 0 the changes are pushed on the next tick of the event
+    loop.
+
+    push    : coroutine function pushing the pending changes of a game,
+              returns the number of emitted socket messages
+    """
+
+    def __init__(self, push, window=0.0):
+        self.push = push
+        self.window = window
+
+        self.scheduled = set()  # ids of the games waiting to be pushed
+
+        # metrics
+        self.requested = 0  # number of pushes requested by the routes
+        self.saved = 0      # requests sent with a push already scheduled
+        self.flushes = 0    # number of actual pushes, also the direct ones
+        self.emitted = 0    # number of socket messages sent by the pushes
+
+    def schedule(self, inegleit):
+        """
+        Requests a push of the changes of the game.  Changes requested
+        while the game is already scheduled are sent with the same push.
+        """
+        self.requested += 1
+        if inegleit.game_id in self.scheduled:
+            self.saved += 1
+            return
+
+        self.scheduled.add(inegleit.game_id)
+        asyncio.ensure_future(self.flush_later(inegleit))
+
+    async def flush_later(self, inegleit):
+        await asyncio.sleep(self.window)
+        self.scheduled.discard(inegleit.game_id)
+        await self.flush(inegleit)
+
+    async def flush(self, inegleit):
+        # pushes the game right away e.g. before sending a snapshot
+        self.flushes += 1
+        try:
+            self.emitted += await self.push(inegleit)
+        except Exception:
+            logger.exception("Push of game %s failed", inegleit.game_id)
+
+    def get_stats(self):
+        return {
+            "window": self.window,
+            "requested": self.requested,
+            "flushes": self.flushes,
+            "emitted": self.emitted,
+            "saved": self.saved,
+            "scheduled": len(self.scheduled),
+        }
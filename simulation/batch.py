@@ -0,0 +1,411 @@
+"""
+Batch simulation keeping many games in lockstep as NumPy arrays.  In
+every step each running game applies one command, the rules of Inegleit
+and Card are applied to all games at once as boolean masks over the 108
+card ids.  Requires numpy, which the server does not need.
+
+    python -m simulation.batch --games 5000 --players 4 --check 50
+
+The games are played by LowestCardBot (see bots.py) and reproduce
+play_game() exactly, down to the shuffles of the decks.  --check replays
+sampled games with the reference Inegleit implementation and compares
+the summaries.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from assets.deck import (create_cards, PLAYABLE, INEGLEITABLE,
+                         RAISES_PENALTY)
+from .bots import COLORS, make_bots
+from .engine import play_game, print_report
+from .stats import Stats
+
+CARDS = create_cards()
+N_CARDS = len(CARDS)
+BLACK = len(COLORS)     # color index of the black cards
+
+CARD_COLOR = np.array([COLORS.index(card.attr["color"])
+                       if card.attr["color"] != "black" else BLACK
+                       for card in CARDS])
+CARD_NUMBER = np.array([card.attr["number"] for card in CARDS])
+
+
+def table(rows):
+    # the bitset rows of the deck as a boolean matrix [top card, card]
+    return np.array([[row >> i & 1 for i in range(N_CARDS)] for row in rows],
+                    dtype=bool)
+
+PLAYABLE_T = table(PLAYABLE)
+INEGLEITABLE_T = table(INEGLEITABLE)
+RAISES_PENALTY_T = table(RAISES_PENALTY)
+
+# cards that can be played on a black card per chosen color, the row
+# BLACK is used before the color was chosen (only black cards)
+CHOSEN_T = np.array([(CARD_COLOR == color) | (CARD_COLOR == BLACK)
+                     for color in range(BLACK + 1)])
+
+# commands, in the order LowestCardBot prefers them
+INEGLEIT, CHOOSE, PLAY, UNO, PICKUP, PASS = range(6)
+
+
+class BatchSimulation():
+    """
+    K games with the same number of players P, one per seed.
+
+    hands       : bool [K, P, 108], hands[k, p, card_id]
+    active      : seat of the active player, the seats still in the
+                  rotation (Inegleit.order) are marked in in_order
+    draw, pile  : card ids of the draw pile and the pile per game, the
+                  top of each is at index n_draw-1 and n_pile-1
+    can_choose  : seat allowed to choose a color or -1
+    chosen      : index of the chosen color in COLORS or BLACK for ""
+    """
+
+    def __init__(self, seeds, n_players=4, max_moves=5000):
+        K = len(seeds)
+        P = n_players
+        self.seeds = list(seeds)
+        self.K, self.P = K, P
+        self.max_moves = max_moves
+        self.games = np.arange(K)
+
+        # the generators shuffle exactly like Deck
+        self.rngs = [random.Random(seed) for seed in self.seeds]
+        self.draw = np.array(
+            [sorted(range(N_CARDS), key=lambda i, rand=rng.random: rand())
+             for rng in self.rngs], dtype=np.int16).reshape(K, N_CARDS)
+        self.n_draw = np.full(K, N_CARDS)
+        self.pile = np.zeros((K, N_CARDS), dtype=np.int16)
+        self.n_pile = np.zeros(K, dtype=int)
+
+        self.hands = np.zeros((K, P, N_CARDS), dtype=bool)
+        self.size = np.zeros((K, P), dtype=int)
+        self.said_uno = np.zeros((K, P), dtype=bool)
+        self.punishment = np.zeros((K, P), dtype=int)  # Player penalty
+        self.finished = np.zeros((K, P), dtype=bool)
+        self.in_order = np.ones((K, P), dtype=bool)
+
+        self.active = np.zeros(K, dtype=int)
+        self.direction = np.ones(K, dtype=int)
+        self.own = np.zeros(K, dtype=int)
+        self.next = np.zeros(K, dtype=int)
+        self.picked = np.zeros(K, dtype=bool)
+        self.can_choose = np.full(K, -1)
+        self.chosen = np.full(K, BLACK)
+
+        self.moves = np.zeros(K, dtype=int)
+        self.inegleits = np.zeros(K, dtype=int)
+        self.denied = np.zeros(K, dtype=int)
+        self.unfinished = np.full(K, P)
+        self.stack = np.zeros(K, dtype=int)
+        self.stacks = [[] for _ in range(K)]
+        self.winners = [[] for _ in range(K)]
+
+        # seven cards for every player, then the starting card
+        for seat in range(P):
+            stop = N_CARDS - 7 * seat
+            cards = self.draw[:, stop - 7:stop]
+            self.hands[self.games[:, None], seat, cards] = True
+        self.size[:] = 7
+        self.n_draw -= 7 * P
+        self.place_starting_card(self.games)
+
+    def top(self, g):
+        # the top cards of the piles of the games g
+        return self.pile[g, self.n_pile[g] - 1]
+
+    def place_starting_card(self, g):
+        while len(g):
+            cards = self.deal(g)
+            self.pile[g, self.n_pile[g]] = cards
+            self.n_pile[g] += 1
+            g = g[CARD_COLOR[cards] == BLACK]
+
+    def reshuffle(self, k):
+        # Deck.reshuffle_pile() of game k
+        n = self.n_pile[k] - 1
+        if n <= 0:
+            return
+        n_draw = self.n_draw[k]
+        draw = self.draw[k]
+
+        draw[n:n + n_draw] = draw[:n_draw].copy()
+        rand = self.rngs[k].random
+        keys = [rand() for _ in range(n)]
+        draw[:n] = self.pile[k, :n][sorted(range(n), key=keys.__getitem__)]
+
+        self.pile[k, 0] = self.pile[k, n]
+        self.n_pile[k] = 1
+        self.n_draw[k] = n_draw + n
+
+    def deal(self, g):
+        # the top card of the draw pile of every game in g, -1 if none is left
+        for k in g[self.n_draw[g] == 0]:
+            self.reshuffle(k)
+        left = self.n_draw[g] > 0
+        cards = np.full(len(g), -1)
+        cards[left] = self.draw[g[left], self.n_draw[g[left]] - 1]
+        self.n_draw[g[left]] -= 1
+        return cards
+
+    def next_player(self, g):
+        self.picked[g] = False
+        self.own[g] = self.next[g]
+        self.next[g] = 0
+
+        # a finished player leaves the rotation once his turn is over
+        active = self.active[g]
+        leaving = self.finished[g, active]
+        self.in_order[g[leaving], active[leaving]] = False
+
+        # the next seat in the rotation in playing direction
+        steps = np.arange(1, self.P + 1)
+        seats = (active[:, None] + self.direction[g, None] * steps) % self.P
+        in_order = self.in_order[g[:, None], seats]
+        first = in_order.argmax(1)
+        self.active[g] = np.where(in_order.any(1),
+                                  seats[np.arange(len(g)), first], active)
+
+    def play(self, g, seats, cards, inegleit):
+        """
+        play_card() and play_black_card() after validate_move() for the
+        games g, where the player at seats plays cards.
+        """
+        if inegleit.any():
+            # an inegleit removes a finished active player right away
+            gi = g[inegleit]
+            active = self.active[gi]
+            leaving = self.finished[gi, active]
+            self.in_order[gi[leaving], active[leaving]] = False
+            self.active[gi] = seats[inegleit]
+
+        black = CARD_COLOR[cards] == BLACK
+        number = CARD_NUMBER[cards]
+        top_black = CARD_COLOR[self.top(g)] == BLACK
+
+        # playing the chosen color resets the choice
+        reset = ~inegleit & ~black & top_black
+        self.chosen[g[reset]] = BLACK
+
+        # +2 and +4 raise the penalty for the next player
+        plus_two = ~black & (number == 12)
+        plus_four = black & (number == 1)
+        raising = (plus_two | plus_four) & (self.own[g] > 0)
+        self.next[g[raising]] = self.own[g[raising]]
+        self.own[g[raising]] = 0
+        self.next[g[plus_two]] += 2
+        self.next[g[plus_four]] += 4
+
+        self.direction[g[~black & (number == 10)]] *= -1
+        self.next_player(g[~black & (number == 11)])
+
+        self.can_choose[g[black]] = seats[black]
+
+        self.pile[g, self.n_pile[g]] = cards
+        self.n_pile[g] += 1
+        self.hands[g, seats, cards] = False
+        self.size[g, seats] -= 1
+
+        done = self.size[g, seats] == 0
+        for k, seat in zip(g[done], seats[done]):
+            self.winners[k].append(int(seat))
+        self.finished[g[done], seats[done]] = True
+        self.unfinished[g[done]] -= 1
+        self.inegleits[g[inegleit & ~done]] += 1
+
+        # a black card is followed by the choice of the color
+        self.next_player(g[~black & (~done | (self.can_choose[g] < 0))])
+
+    def pickup(self, g):
+        # event_pickup_card()
+        active = self.active[g]
+        own = self.own[g] > 0
+        punished = ~own & (self.punishment[g, active] > 0)
+        rest = ~own & ~punished
+        missed_uno = rest & (self.size[g, active] == 1) \
+            & ~self.said_uno[g, active]
+        rest &= ~missed_uno
+        again = rest & self.picked[g]
+
+        self.own[g[own]] -= 1
+        self.punishment[g[punished], active[punished]] -= 1
+        self.punishment[g[missed_uno], active[missed_uno]] = 1
+        self.picked[g[rest]] = True
+
+        self.next_player(g[again])
+        self.denied[g[again]] += 1
+
+        g, active = g[~again], active[~again]
+        cards = self.deal(g)
+        empty = cards < 0
+        self.next_player(g[empty])
+        self.denied[g[empty]] += 1
+
+        g, active, cards = g[~empty], active[~empty], cards[~empty]
+        self.hands[g, active, cards] = True
+        self.size[g, active] += 1
+        self.said_uno[g, active] = False
+
+    def step(self, g):
+        """
+        Applies the command LowestCardBot chooses in every game of g.
+        """
+        n = len(g)
+        rows = np.arange(n)
+        top = self.top(g)
+        hands = self.hands[g]
+        active = self.active[g]
+
+        # the other players inegleit first, in seat order
+        inegleitable = hands & INEGLEITABLE_T[top][:, None, :]
+        can_inegleit = inegleitable.any(2)
+        can_inegleit[rows, active] = False
+        inegleiter = can_inegleit.argmax(1)
+        inegleit_card = inegleitable[rows, inegleiter].argmax(1)
+
+        # Inegleit.get_legal_moves() of the active player
+        hand = hands[rows, active]
+        finished = self.finished[g, active]
+        own = self.own[g] > 0
+        punished = self.punishment[g, active] > 0
+        missed_uno = (self.size[g, active] == 1) & ~self.said_uno[g, active]
+
+        legal = hand & np.where((CARD_COLOR[top] == BLACK)[:, None],
+                                CHOSEN_T[self.chosen[g]], PLAYABLE_T[top])
+        playable = np.where(own[:, None], hand & RAISES_PENALTY_T[top],
+                            legal & ~(punished | missed_uno)[:, None])
+        playable &= ~finished[:, None]
+        can_play = playable.any(1)
+        say_uno = ~finished & ~own & ~punished & missed_uno & legal.any(1)
+        can_pickup = ~finished & (own | punished | missed_uno
+                                  | ~self.picked[g])
+        choose = self.can_choose[g] == active
+
+        command = np.select(
+            [can_inegleit.any(1), choose, can_play, say_uno, can_pickup],
+            [INEGLEIT, CHOOSE, PLAY, UNO, PICKUP], PASS)
+
+        # the engine counts the penalty stacks before the pickup
+        count = (command == PICKUP) & (self.stack[g] == 0)
+        self.stack[g[count]] = self.own[g[count]]
+        for k in g[count & (self.own[g] > 0)]:
+            self.stacks[k].append(int(self.own[k]))
+
+        self.moves[g] += 1
+
+        is_ = command == INEGLEIT
+        play = is_ | (command == PLAY)
+        if play.any():
+            seats = np.where(is_, inegleiter, active)[play]
+            cards = np.where(is_, inegleit_card, playable.argmax(1))[play]
+            self.play(g[play], seats, cards, is_[play])
+
+        is_ = command == CHOOSE
+        if is_.any():
+            # the favourite color of the hand, red for an empty hand
+            colors = np.stack([(hand[is_] & (CARD_COLOR == color)).sum(1)
+                               for color in range(BLACK)], axis=1)
+            self.chosen[g[is_]] = colors.argmax(1)
+            self.can_choose[g[is_]] = -1
+            self.next_player(g[is_])
+
+        is_ = command == UNO
+        self.said_uno[g[is_], active[is_]] = True
+
+        is_ = command == PICKUP
+        if is_.any():
+            self.pickup(g[is_])
+
+        self.next_player(g[command == PASS])
+
+        self.stack[g[self.own[g] == 0]] = 0
+
+    def run(self):
+        """
+        Plays all games to the end and returns their summaries in the
+        format of play_game().
+        """
+        while True:
+            running = (self.unfinished > 1) & (self.moves < self.max_moves)
+            g = self.games[running]
+            if not len(g):
+                break
+            self.step(g)
+
+        return [{
+            "seed": self.seeds[k],
+            "players": self.P,
+            "moves": int(self.moves[k]),
+            "inegleits": int(self.inegleits[k]),
+            "denied": int(self.denied[k]),
+            "penaltyStacks": self.stacks[k],
+            "winners": self.winners[k],
+            "finished": bool(self.unfinished[k] <= 1),
+        } for k in range(self.K)]
+
+
+def cross_check(results, n_players, max_moves=5000):
+    """
+    Plays the games of the results with Inegleit and LowestCardBots and
+    returns the seeds of the games with a different summary.
+    """
+    mismatches = []
+    for result in results:
+        bots = make_bots(["lowest"] * n_players, result["seed"])
+        _, reference = play_game(bots, result["seed"], max_moves)
+        if reference != result:
+            mismatches.append(result["seed"])
+    return mismatches
+
+
+def simulate_batch(n_games, n_players=4, seed=None, batch_size=2000,
+                   max_moves=5000):
+    """
+    Returns the Stats and the summaries of n_games games played in
+    batches of batch_size games.
+    """
+    rng = random.Random(seed)
+    stats = Stats()
+    results = []
+
+    start = time.perf_counter()
+    for offset in range(0, n_games, batch_size):
+        seeds = [rng.getrandbits(32)
+                 for _ in range(min(batch_size, n_games - offset))]
+        batch = BatchSimulation(seeds, n_players, max_moves).run()
+        for result in batch:
+            stats.add(result)
+        results.extend(batch)
+    stats.seconds = time.perf_counter() - start
+
+    return stats, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--max-moves", type=int, default=5000)
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="compare N sampled games with Inegleit")
+    args = parser.parse_args()
+
+    stats, results = simulate_batch(args.games, args.players, args.seed,
+                                    args.batch_size, args.max_moves)
+
+    print_report(stats, stats.seconds)
+
+    if args.check:
+        sample = random.Random(args.seed).sample(
+            results, min(args.check, len(results)))
+        mismatches = cross_check(sample, args.players, args.max_moves)
+        print("  checked   : {} games, {} mismatches {}".format(
+            len(sample), len(mismatches), mismatches))
+
+if __name__ == "__main__":
+    main()
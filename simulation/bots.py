@@ -0,0 +1,120 @@
+"""
+Bot policies for the headless simulation.  A bot looks at the legal
+moves of its player (see Inegleit.get_legal_moves()) and returns the
+command to apply to the game as [command, [args]], the format of the
+move log.
+"""
+import abc
+import random
+
+COLORS = ["red", "green", "blue", "yellow"]
+
+
+def play_command(inegleit, player_id, card_id):
+    # black cards are played with their own command
+    if inegleit.deck.get_card(card_id).attr["color"] == "black":
+        return ["play_black_card", [player_id, card_id]]
+    return ["play_card", [player_id, card_id]]
+
+def favourite_color(hand):
+    # the color of which the hand holds the most cards
+    return max(COLORS, key=lambda color: len(hand.with_color(color)))
+
+
+class Bot(abc.ABC):
+    """
+    Base class of the policies, every policy implements turn().
+
+    turn(inegleit, player_id, moves)     : the command of the active player
+    inegleit(inegleit, player_id, moves) : the command to inegleit a card
+                                           while it is not the player's
+                                           turn, or None
+    """
+    name = "bot"
+
+    @abc.abstractmethod
+    def turn(self, inegleit, player_id, moves):
+        pass
+
+    def inegleit(self, inegleit, player_id, moves):
+        return None
+
+
+class LowestCardBot(Bot):
+    """
+    Deterministic policy: plays and inegleits the card with the lowest
+    id, chooses its favourite color and never forgets to say UNO.
+    """
+    name = "lowest"
+
+    def turn(self, inegleit, player_id, moves):
+        if moves["chooseColor"]:
+            hand = inegleit.players[player_id].attr["hand"]
+            return ["event_choose_color", [player_id, favourite_color(hand)]]
+        if moves["play"]:
+            return play_command(inegleit, player_id, min(moves["play"]))
+        if moves["sayUnoFirst"]:
+            return ["event_uno", [player_id]]
+        if moves["canPickUp"]:
+            return ["event_pickup_card", [player_id]]
+        return ["event_cant_play", [player_id]]
+
+    def inegleit(self, inegleit, player_id, moves):
+        if moves["inegleit"]:
+            return play_command(inegleit, player_id, min(moves["inegleit"]))
+        return None
+
+
+class RandomBot(Bot):
+    """
+    Plays a random legal card, inegleits with probability p_inegleit and
+    forgets to say UNO with probability p_forget_uno, which covers the
+    punishments as well.
+    """
+    name = "random"
+
+    def __init__(self, seed=None, p_inegleit=0.5, p_forget_uno=0.1):
+        self.rng = random.Random(seed)
+        self.p_inegleit = p_inegleit
+        self.p_forget_uno = p_forget_uno
+
+    def turn(self, inegleit, player_id, moves):
+        rng = self.rng
+        hand = inegleit.players[player_id].attr["hand"]
+
+        if moves["chooseColor"]:
+            return ["event_choose_color", [player_id, rng.choice(COLORS)]]
+        if moves["play"]:
+            return play_command(inegleit, player_id, rng.choice(moves["play"]))
+        if moves["sayUnoFirst"]:
+            if rng.random() < self.p_forget_uno:
+                # plays the last card anyway and gets punished
+                card_id = next(iter(hand)).attr["id"]
+                return play_command(inegleit, player_id, card_id)
+            return ["event_uno", [player_id]]
+        if moves["canPickUp"]:
+            return ["event_pickup_card", [player_id]]
+        return ["event_cant_play", [player_id]]
+
+    def inegleit(self, inegleit, player_id, moves):
+        if moves["inegleit"] and self.rng.random() < self.p_inegleit:
+            card_id = self.rng.choice(moves["inegleit"])
+            return play_command(inegleit, player_id, card_id)
+        return None
+
+
+BOTS = {"lowest": LowestCardBot, "random": RandomBot}
+
+def make_bots(policies, seed=None):
+    """
+    Creates one bot per policy name, the random bots are seeded from
+    seed such that a game can be repeated.
+    """
+    rng = random.Random(seed)
+    bots = []
+    for policy in policies:
+        if policy == "random":
+            bots.append(RandomBot(rng.getrandbits(32)))
+        else:
+            bots.append(BOTS[policy]())
+    return bots
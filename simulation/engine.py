@@ -0,0 +1,152 @@
+"""
+Headless simulation running complete games directly against Inegleit,
+without HTTP or sockets.  The players are driven by bots (see bots.py).
+
+    python -m simulation.engine --games 1000 --bots lowest random random
+
+Every game is created from a seed derived from the master seed, a game
+that raised an error is reported with its seed and can be repeated with
+Inegleit.replay() from its move log.
+"""
+import argparse
+import random
+import time
+
+from assets.game import Inegleit
+from .bots import BOTS, make_bots
+from .stats import Stats
+
+
+def play_game(bots, seed=None, max_moves=5000):
+    """
+    Plays one game with a player per bot until only one player is left
+    or max_moves commands were applied.  Before every turn the other
+    players get the chance to inegleit, in seat order.
+
+    Returns the game and a summary
+        {"seed": (int), "players": (int), "moves": (int),
+         "inegleits": (int), "denied": (int), "penaltyStacks": [(int)],
+         "winners": [seat], "finished": (bool)}
+    where penaltyStacks are the sizes of the +2/+4 penalties players had
+    to pick up.
+    """
+    inegleit = Inegleit(seed=seed)
+    for seat, bot in enumerate(bots):
+        response = inegleit.add_player("{} {}".format(bot.name, seat))
+        inegleit.deal_cards(response["player"]["id"], 7)
+    inegleit.start_game()
+
+    seats = {player_id: seat
+             for seat, player_id in enumerate(inegleit.players)}
+
+    moves = inegleits = denied = 0
+    unfinished = len(bots)
+    stacks = []
+    stack = 0   # penalty the active player is picking up
+
+    while unfinished > 1 and moves < max_moves:
+        command = None
+
+        active_id = inegleit.get_active_player_id()
+        for player_id in inegleit.players:
+            if player_id != active_id:
+                bot = bots[seats[player_id]]
+                command = bot.inegleit(
+                    inegleit, player_id, inegleit.get_legal_moves(player_id))
+                if command:
+                    break
+
+        if not command:
+            bot = bots[seats[active_id]]
+            command = bot.turn(
+                inegleit, active_id, inegleit.get_legal_moves(active_id))
+
+        name, args = command
+        if name == "event_pickup_card" and not stack:
+            stack = inegleit.penalty["own"]
+            if stack:
+                stacks.append(stack)
+
+        response = getattr(inegleit, name)(*args)
+        moves += 1
+
+        if not inegleit.penalty["own"]:
+            stack = 0
+
+        if not response["requestValid"]:
+            denied += 1
+        if response.get("inegleit"):
+            inegleits += 1
+        if "playerFinished" in response:
+            unfinished -= 1
+
+    return inegleit, {
+        "seed": inegleit.seed,
+        "players": len(bots),
+        "moves": moves,
+        "inegleits": inegleits,
+        "denied": denied,
+        "penaltyStacks": stacks,
+        "winners": [seats[player_id] for player_id in inegleit.winners],
+        "finished": unfinished <= 1,
+    }
+
+
+def simulate(n_games, policies, seed=None, max_moves=5000):
+    """
+    Plays n_games games with bots of the given policies and returns their
+    Stats.  The seeds of the games are derived from seed.
+    """
+    rng = random.Random(seed)
+    stats = Stats()
+
+    start = time.perf_counter()
+    for _ in range(n_games):
+        game_seed = rng.getrandbits(32)
+        bots = make_bots(policies, game_seed)
+        try:
+            _, result = play_game(bots, game_seed, max_moves)
+        except Exception as e:
+            stats.add_error(game_seed, e)
+            continue
+        stats.add(result)
+    stats.seconds = time.perf_counter() - start
+
+    return stats
+
+
+def print_report(stats, seconds):
+    report = stats.get_report()
+
+    print("{} games, {} moves in {:.2f}s".format(
+        report["games"], report["moves"], seconds))
+    print("  games/sec : {:10.1f}".format(report["games"] / seconds))
+    print("  moves/sec : {:10.1f}".format(report["moves"] / seconds))
+    print("  length    : {:10.1f} moves (min {}, max {})".format(
+        report["meanLength"], report["shortest"], report["longest"]))
+    print("  inegleits : {:10.2f} per game".format(report["inegleitsPerGame"]))
+    print("  stacks    : {}".format(report["penaltyStacks"]))
+    print("  win rate  : {}".format(", ".join(
+        "seat {} {:.1%}".format(seat, rate)
+        for seat, rate in report["winRateBySeat"].items())))
+    print("  unfinished: {:10d} games {}".format(
+        report["unfinishedCount"], report["unfinished"]))
+    print("  errors    : {:10d} games".format(report["errorCount"]))
+    for error in report["errors"]:
+        print("  error in game with seed {seed}: {error}".format(**error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--bots", nargs="+", choices=sorted(BOTS),
+                        default=["lowest", "random", "random", "random"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-moves", type=int, default=5000)
+    args = parser.parse_args()
+
+    stats = simulate(args.games, args.bots, args.seed, args.max_moves)
+    print_report(stats, stats.seconds)
+
+if __name__ == "__main__":
+    main()
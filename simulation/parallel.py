@@ -0,0 +1,73 @@
+"""
+Plays simulated games on all cores.  The games are split into chunks
+played by a process pool, every chunk gets a seed derived from the
+master seed, so the result does not depend on the number of workers.
+The Stats of the chunks are merged as they arrive.
+
+    python -m simulation.parallel --games 1000000 --workers 8
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .bots import BOTS
+from .engine import simulate, print_report
+from .stats import Stats
+
+
+def chunk_seeds(n_games, chunk_size, seed):
+    # [(number of games, seed)] of the chunks
+    rng = random.Random(seed)
+    chunks = []
+    for start in range(0, n_games, chunk_size):
+        chunks.append((min(chunk_size, n_games - start), rng.getrandbits(32)))
+    return chunks
+
+
+def simulate_parallel(n_games, policies, seed=None, workers=None,
+                      chunk_size=200, max_moves=5000):
+    """
+    Returns the merged Stats of n_games games played by workers processes
+    (all cores by default).
+    """
+    stats = Stats()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(simulate, n, policies, chunk_seed, max_moves)
+                   for n, chunk_seed in chunk_seeds(n_games, chunk_size, seed)]
+        for future in as_completed(futures):
+            stats.merge(future.result())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--bots", nargs="+", choices=sorted(BOTS),
+                        default=["lowest", "random", "random", "random"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--max-moves", type=int, default=5000)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = simulate_parallel(args.games, args.bots, args.seed, args.workers,
+                              args.chunk_size, args.max_moves)
+    seconds = time.perf_counter() - start
+
+    if args.json:
+        report = stats.get_report()
+        report["seconds"] = seconds
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(stats, seconds)
+        print("  workers   : {:10d} (speedup {:.1f}x)".format(
+            args.workers, stats.seconds / seconds))
+
+if __name__ == "__main__":
+    main()
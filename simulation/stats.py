@@ -0,0 +1,107 @@
+"""
+Statistics of simulated games, reduced while the games are played such
+that millions of games need no more memory than one.
+"""
+from collections import Counter
+
+# number of seeds of failed games kept for debugging
+MAX_SEEDS = 100
+
+
+class Stats():
+    """
+    Sums and histograms of the summaries returned by play_game().  Two
+    Stats objects e.g. of different worker processes are combined with
+    merge().
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.inegleits = 0
+        self.denied = 0
+        self.seconds = 0.0  # time spent playing, summed over the workers
+
+        self.lengths = Counter()    # {moves rounded to 10: games}
+        self.shortest = None
+        self.longest = 0
+        self.stacks = Counter()     # {penalty stack size: count}
+        self.wins = Counter()       # {seat: games won}
+        self.seats = Counter()      # {seat: games played}
+
+        # the first MAX_SEEDS of the games that raised or were stopped at
+        # max_moves, the counts include all of them
+        self.error_count = 0
+        self.errors = []        # [{"seed", "error"}] of games that raised
+        self.unfinished_count = 0
+        self.unfinished = []    # seeds of the games stopped at max_moves
+
+    def add(self, result):
+        moves = result["moves"]
+        self.games += 1
+        self.moves += moves
+        self.inegleits += result["inegleits"]
+        self.denied += result["denied"]
+
+        self.lengths[moves // 10 * 10] += 1
+        self.longest = max(self.longest, moves)
+        if self.shortest is None or moves < self.shortest:
+            self.shortest = moves
+
+        self.stacks.update(result["penaltyStacks"])
+        self.seats.update(range(result["players"]))
+        if result["winners"]:
+            self.wins[result["winners"][0]] += 1
+
+        if not result["finished"]:
+            self.unfinished_count += 1
+            if len(self.unfinished) < MAX_SEEDS:
+                self.unfinished.append(result["seed"])
+
+    def add_error(self, seed, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_SEEDS:
+            self.errors.append({"seed": seed, "error": repr(error)})
+
+    def merge(self, other):
+        self.games += other.games
+        self.moves += other.moves
+        self.inegleits += other.inegleits
+        self.denied += other.denied
+        self.seconds += other.seconds
+
+        self.lengths.update(other.lengths)
+        self.longest = max(self.longest, other.longest)
+        if self.shortest is None or (other.shortest is not None
+                                     and other.shortest < self.shortest):
+            self.shortest = other.shortest
+        self.stacks.update(other.stacks)
+        self.wins.update(other.wins)
+        self.seats.update(other.seats)
+
+        self.error_count += other.error_count
+        self.errors.extend(other.errors[:MAX_SEEDS - len(self.errors)])
+        self.unfinished_count += other.unfinished_count
+        self.unfinished.extend(
+            other.unfinished[:MAX_SEEDS - len(self.unfinished)])
+        return self
+
+    def get_report(self):
+        games = self.games or 1
+        return {
+            "games": self.games,
+            "moves": self.moves,
+            "meanLength": self.moves / games,
+            "shortest": self.shortest,
+            "longest": self.longest,
+            "lengths": dict(sorted(self.lengths.items())),
+            "inegleitsPerGame": self.inegleits / games,
+            "deniedPerGame": self.denied / games,
+            "penaltyStacks": dict(sorted(self.stacks.items())),
+            "winRateBySeat": {seat: self.wins[seat] / self.seats[seat]
+                              for seat in sorted(self.seats)},
+            "errorCount": self.error_count,
+            "errors": self.errors,
+            "unfinishedCount": self.unfinished_count,
+            "unfinished": self.unfinished,
+        }
@@ -3,17 +3,18 @@ import sys
 from fastapi.testclient import TestClient
 
 sys.path.append("../")
-from main import app, inegleit
+from main import app, games
 from assets.deck import Card
 
 client = TestClient(app)
 
 def test_play():
-    client.get('game/initialize_game')
+    game_id = client.post('game/create_game').json()['game']['id']
+    inegleit = games.games[game_id]
     
     # add two players
-    client.post('game/add_player?player_name=player1')
-    client.post('game/add_player?player_name=player2')
+    client.post(f'game/add_player?game_id={game_id}&player_name=player1')
+    client.post(f'game/add_player?game_id={game_id}&player_name=player2')
     
     # make both of them have one black ? card
     card1 = inegleit.deck.get_card(100)
@@ -25,10 +26,10 @@ def test_play():
 
     inegleit.players[1].attr['said_uno'] = True
 
-    response = client.post('game/play_black_card?player_id=1&card_id=100')
+    response = client.post(f'game/play_black_card?game_id={game_id}&player_id=1&card_id=100')
     print(response._content)
     print(inegleit.get_active_player_id())
-    response = client.post('game/play_black_card?player_id=2&card_id=101')
+    response = client.post(f'game/play_black_card?game_id={game_id}&player_id=2&card_id=101')
     print(inegleit.n_players)
     print(response._content)
 
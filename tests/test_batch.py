@@ -0,0 +1,26 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simulation.batch import BatchSimulation, cross_check, simulate_batch
+
+
+@pytest.mark.parametrize("n_players", [2, 3, 4, 6])
+def test_batch_matches_inegleit(n_players):
+    results = BatchSimulation(range(1, 41), n_players).run()
+
+    assert all(result["finished"] for result in results)
+    assert cross_check(results, n_players) == []
+
+def test_cross_check_finds_differences():
+    results = BatchSimulation([1, 2], 3).run()
+    results[1]["winners"].reverse()
+
+    assert cross_check(results, 3) == [2]
+
+def test_batches_do_not_change_the_games():
+    stats, results = simulate_batch(30, 3, seed=1, batch_size=30)
+    _, split = simulate_batch(30, 3, seed=1, batch_size=7)
+
+    assert results == split
+    assert stats.games == 30
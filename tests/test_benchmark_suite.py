@@ -0,0 +1,17 @@
+from benchmarks.suite import run_suite, compare
+
+
+def test_suite_runs_every_table_size():
+    results = run_suite(number=3, repeat=1,
+                        only=["play_card", "Deck.deal_cards"])
+
+    assert sorted(results["results"]) == [
+        "Deck.deal_cards[1]", "Deck.deal_cards[4]",
+        "play_card[2]", "play_card[4]", "play_card[8]"]
+    assert all(value > 0 for value in results["results"].values())
+
+def test_compare_reports_regressions():
+    baseline = {"results": {"a[2]": 100.0, "b[2]": 100.0}}
+    results = {"results": {"a[2]": 130.0, "b[2]": 110.0, "c[2]": 5.0}}
+
+    assert compare(results, baseline, threshold=1.25) == ["a[2]"]
@@ -0,0 +1,57 @@
+import asyncio
+
+from assets.game import Inegleit
+from routers.broadcast import Broadcaster
+
+
+def test_changes_within_window_are_pushed_once():
+    deltas = []
+
+    async def push(inegleit):
+        delta = inegleit.pop_delta()
+        if delta is None:
+            return 0
+        deltas.append(delta)
+        return 1
+
+    async def play():
+        broadcaster = Broadcaster(push, window=0.01)
+        inegleit = Inegleit(seed=1, game_id=1)
+        for name in ["bene", "lara", "thilo"]:
+            inegleit.add_player(name)
+            broadcaster.schedule(inegleit)
+        await asyncio.sleep(0.05)
+        return broadcaster.get_stats()
+
+    stats = asyncio.run(play())
+
+    assert len(deltas) == 1
+    assert len(deltas[0]["players"]) == 3
+    assert stats["requested"] == 3
+    assert stats["flushes"] == 1
+    assert stats["emitted"] == 1
+    assert stats["saved"] == 2
+
+def test_saved_counts_coalesced_requests():
+    async def push(inegleit):
+        # a state delta and a hand delta per player
+        return 1 + len(inegleit.players)
+
+    async def play():
+        broadcaster = Broadcaster(push, window=0.01)
+        inegleit = Inegleit(seed=1, game_id=1)
+        for name in ["bene", "lara", "thilo"]:
+            inegleit.add_player(name)
+        for _ in range(2):
+            broadcaster.schedule(inegleit)
+            broadcaster.schedule(inegleit)
+            await asyncio.sleep(0.05)
+        await broadcaster.flush(inegleit)
+        return broadcaster.get_stats()
+
+    stats = asyncio.run(play())
+
+    assert stats["requested"] == 4
+    assert stats["flushes"] == 3
+    assert stats["emitted"] == 12
+    assert stats["saved"] == 2
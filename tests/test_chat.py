@@ -0,0 +1,39 @@
+from assets.chat import Chat
+
+
+def test_ring_buffer_keeps_latest_messages():
+    chat = Chat(size=3)
+    for i in range(5):
+        chat.add_message("bene", str(i))
+
+    history = chat.get_history()
+
+    assert [m["id"] for m in history["messages"]] == [3, 4, 5]
+    assert not history["hasMore"]
+
+def test_paging_by_id():
+    chat = Chat(size=100)
+    for i in range(10):
+        chat.add_message("lara", str(i))
+
+    page = chat.get_history(limit=4)
+    assert [m["id"] for m in page["messages"]] == [7, 8, 9, 10]
+    assert page["hasMore"]
+
+    page = chat.get_history(before_id=7, limit=4)
+    assert [m["id"] for m in page["messages"]] == [3, 4, 5, 6]
+
+    page = chat.get_history(before_id=3, limit=4)
+    assert [m["id"] for m in page["messages"]] == [1, 2]
+    assert not page["hasMore"]
+
+def test_paging_past_dropped_messages():
+    chat = Chat(size=2)
+    for i in range(5):
+        chat.add_message("thilo", str(i))
+
+    assert chat.get_history(before_id=2) == {"messages": [], "hasMore": False}
+    assert chat.get_history(before_id=5)["messages"][0]["id"] == 4
+
+def test_empty_chat():
+    assert Chat().get_history() == {"messages": [], "hasMore": False}
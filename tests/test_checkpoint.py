@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+
+from assets.checkpoint import Checkpointer, pack, unpack
+from assets.eventlog import EventLog
+from assets.game import Inegleit
+from assets.gamemanager import GameManager
+from simulation.engine import play_game
+from simulation.bots import make_bots
+
+
+def test_pack_unpack_roundtrip():
+    for seed in range(20):
+        bots = make_bots(["lowest", "random", "random", "random"], seed)
+        inegleit, _ = play_game(bots, seed=seed, max_moves=seed * 10)
+        game = inegleit.to_json()
+
+        data = pack(game, len(inegleit.moves))
+        restored, moves = unpack(data)
+
+        assert moves == len(inegleit.moves)
+        assert restored == json.loads(json.dumps(game))
+        assert len(data) < len(json.dumps(game)) / 2
+
+        restored = Inegleit.from_json(restored, inegleit.moves)
+        assert restored.get_state() == inegleit.get_state()
+        assert restored.deck.rng.random() == inegleit.deck.rng.random()
+
+def test_only_dirty_games_are_written(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    checkpointer = Checkpointer(event_log)
+    games = GameManager(event_log=event_log, checkpointer=checkpointer)
+
+    for _ in range(3):
+        asyncio.run(games.create_game())
+    asyncio.run(checkpointer.flush())
+    assert checkpointer.written == 3
+
+    inegleit = games.games[2]
+    inegleit.add_player("bene")
+    games.save_game(inegleit)
+    asyncio.run(checkpointer.flush())
+    assert checkpointer.written == 4
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    restored.restore_games()
+    _, moves = unpack((tmp_path / "2.snapshot").read_bytes())
+    assert moves == 1
+    assert asyncio.run(restored.get_game(2)).players[1].attr["name"] == "bene"
+
+def test_stop_writes_pending_games(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    checkpointer = Checkpointer(event_log, interval=60)
+    games = GameManager(event_log=event_log, checkpointer=checkpointer)
+
+    async def serve():
+        checkpointer.start()
+        inegleit = await games.get_game((await games.create_game())["game"]["id"])
+        inegleit.add_player("lara")
+        games.save_game(inegleit)
+        await games.close_game((await games.create_game())["game"]["id"])
+        await checkpointer.stop()
+
+    asyncio.run(serve())
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["1.log", "1.snapshot"]
+    _, moves = unpack((tmp_path / "1.snapshot").read_bytes())
+    assert moves == 1
+
+def test_checkpoint_covers_only_logged_commands(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    checkpointer = Checkpointer(event_log)
+    games = GameManager(event_log=event_log, checkpointer=checkpointer)
+    inegleit = games.games[asyncio.run(games.create_game())["game"]["id"]]
+
+    # the route is still waiting for its emits when the round starts
+    checkpointer.mark(inegleit)
+    inegleit.add_player("bene")
+    asyncio.run(checkpointer.flush())
+
+    # crash
+    restored = EventLog(str(tmp_path)).load(1)
+    assert restored.count_moves() == inegleit.count_moves() == 1
+    assert restored.get_state() == inegleit.get_state()
+
+def test_log_shorter_than_snapshot(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    games = GameManager(event_log=event_log)
+    inegleit = games.games[asyncio.run(games.create_game())["game"]["id"]]
+    for name in ("bene", "lara"):
+        inegleit.add_player(name)
+    games.save_game(inegleit)
+    event_log.write_snapshot(inegleit)
+    # the log lost its last line
+    lines = (tmp_path / "1.log").read_text().splitlines(True)
+    (tmp_path / "1.log").write_text("".join(lines[:-1]))
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    assert restored.restore_games() == 1
+    game = asyncio.run(restored.get_game(1))
+    assert game.get_state() == inegleit.get_state()
+    game.add_player("tom")
+    restored.save_game(game)
+    assert EventLog(str(tmp_path)).load(1).get_state() == game.get_state()
+
+def test_raising_command_is_not_logged(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    checkpointer = Checkpointer(event_log)
+    games = GameManager(event_log=event_log, checkpointer=checkpointer)
+    inegleit = games.games[asyncio.run(games.create_game())["game"]["id"]]
+
+    async def requests():
+        await games.execute(inegleit, "add_player", "bene")
+        games.save_game(inegleit)
+        # without the rollback of execute()
+        with pytest.raises(KeyError):
+            inegleit.play_card(99, 3)
+        checkpointer.mark(inegleit)
+        await checkpointer.flush()
+    asyncio.run(requests())
+
+    # restart, the next command is logged after the first one
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    restored.restore_games()
+    game = asyncio.run(restored.get_game(1))
+    game.add_player("lara")
+    restored.save_game(game)
+
+    assert len((tmp_path / "1.log").read_text().splitlines()) == 2
+    assert EventLog(str(tmp_path)).load(1).get_state() == game.get_state()
+
+def test_commands_are_logged_by_the_checkpointer(tmp_path):
+    event_log = EventLog(str(tmp_path), snapshot_interval=0)
+    checkpointer = Checkpointer(event_log)
+    games = GameManager(event_log=event_log, checkpointer=checkpointer,
+                        snapshot_interval=5)
+    inegleit = games.games[asyncio.run(games.create_game(seed=2))["game"]["id"]]
+    commands = [["add_player", [name]] for name in ("bene", "lara", "tom")]
+    commands += [["deal_cards", [player_id, 7]] for player_id in (1, 2, 3)]
+
+    async def requests():
+        for command, args in commands:
+            await games.execute(inegleit, command, *args)
+            games.save_game(inegleit)
+        # nothing is written while handling the requests, the game keeps
+        # the commands of the snapshot in the store until they are logged
+        assert list(tmp_path.iterdir()) == []
+        assert games.snapshots[1] == 5
+        assert inegleit.moves_offset == 0
+
+        await checkpointer.flush()
+        games.save_game(inegleit)
+        assert inegleit.moves_offset == 5
+        return await games.get_move_log(inegleit)
+    log = asyncio.run(requests())
+
+    assert log["moves"] == commands
+    assert EventLog(str(tmp_path)).load(1).get_state() == inegleit.get_state()
@@ -0,0 +1,76 @@
+from assets.deck import Deck
+from assets.game import Inegleit
+
+
+def all_ids(deck, hands):
+    ids = list(deck.draw[:deck.n_draw])
+    ids += [card.attr["id"] for card in deck.pile]
+    ids += [card.attr["id"] for hand in hands for card in hand]
+    return sorted(ids)
+
+def test_deal_from_the_top():
+    deck = Deck(seed=1)
+    top = list(deck.draw[deck.n_draw - 3:deck.n_draw])
+
+    cards = deck.deal_cards(3)
+
+    assert [card.attr["id"] for card in cards] == top
+    assert deck.n_draw == deck.N - 3
+
+def test_reshuffle_keeps_every_card_once():
+    deck = Deck(seed=2)
+    hands = [deck.deal_cards(7) for _ in range(4)]
+    deck.place_starting_card()
+
+    # play most of the cards and deal again until the pile is reused
+    for _ in range(500):
+        cards = deck.deal_cards(4)
+        assert len(cards) == 4
+        for card in cards[:3]:
+            deck.play_card(card)
+        hands.append(cards[3:])
+        if len(hands) > 10:
+            for card in hands.pop(4):
+                deck.play_card(card)
+
+        assert all_ids(deck, hands) == list(range(deck.N))
+
+def test_reshuffle_keeps_top_card_and_draw_order():
+    deck = Deck(seed=3)
+    for card in deck.deal_cards(100):
+        deck.play_card(card)
+    top_card = deck.top_card()
+    remaining = list(deck.draw[:deck.n_draw])
+
+    cards = deck.deal_cards(20)
+
+    assert deck.top_card() is top_card
+    assert deck.pile == [top_card]
+    # the cards that were left are dealt before the reshuffled ones
+    assert [card.attr["id"] for card in cards[-8:]] == remaining
+
+def test_not_enough_cards():
+    deck = Deck(seed=4)
+    hand = deck.deal_cards(deck.N - 1)
+    deck.place_starting_card()
+
+    assert len(hand) == deck.N - 1
+    assert deck.deal_cards(5) == []
+
+def test_testcase_cards_on_top():
+    deck = Deck(seed=5, testcase=1)
+    cards = deck.deal_cards(12)
+
+    assert [card.attr["id"] for card in cards] == [
+        104, 105, 11, 12, 13, 14, 15, 16, 17, 106, 107, 77]
+    assert sorted(deck.draw) == list(range(deck.N))
+
+def test_deal_at_least_one_card():
+    inegleit = Inegleit(seed=1)
+    inegleit.add_player("bene")
+    n_draw = inegleit.deck.n_draw
+
+    for n in (0, -1):
+        assert not inegleit.deal_cards(1, n)["requestValid"]
+    assert inegleit.deck.n_draw == n_draw
+    assert inegleit.get_cards(1) == []
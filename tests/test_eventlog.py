@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from assets.checkpoint import log_position, unpack
+from assets.eventlog import EventLog
+from assets.game import Inegleit
+from assets.gamemanager import GameManager
+from simulation.bots import make_bots
+
+
+def play(games, inegleit, bots, n):
+    # lets the bots play n moves, saving the game after each one
+    for _ in range(n):
+        player_id = inegleit.get_active_player_id()
+        moves = inegleit.get_legal_moves(player_id)
+        command, args = bots[player_id - 1].turn(inegleit, player_id, moves)
+        getattr(inegleit, command)(*args)
+        games.save_game(inegleit)
+
+def new_game(games, seed=3):
+    inegleit = games.games[asyncio.run(games.create_game(seed=seed))["game"]["id"]]
+    for name in ("bene", "lara", "tom"):
+        inegleit.add_player(name)
+    for player_id in inegleit.players:
+        inegleit.deal_cards(player_id, 7)
+    inegleit.start_game()
+    games.save_game(inegleit)
+    return inegleit
+
+def dump(inegleit):
+    return json.dumps(inegleit.to_json(), sort_keys=True)
+
+
+def test_restore_from_snapshot_and_tail(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path), snapshot_interval=10))
+    inegleit = new_game(games)
+    play(games, inegleit, make_bots(["lowest", "random", "random"], 3), 25)
+
+    game, moves = unpack((tmp_path / "1.snapshot").read_bytes())
+    assert moves < inegleit.count_moves()
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    assert restored.restore_games() == 1
+    game = asyncio.run(restored.get_game(1))
+    assert dump(game) == dump(inegleit)
+    assert game.count_moves() == inegleit.count_moves()
+    assert asyncio.run(restored.create_game())["game"]["id"] == 2
+
+def test_restored_game_continues_like_the_original(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path), snapshot_interval=7))
+    inegleit = new_game(games, seed=8)
+    play(games, inegleit, make_bots(["random"] * 3, 8), 20)
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    restored.restore_games()
+    game = asyncio.run(restored.get_game(1))
+
+    play(games, inegleit, make_bots(["lowest"] * 3, 1), 20)
+    play(restored, game, make_bots(["lowest"] * 3, 1), 20)
+    assert dump(game) == dump(inegleit)
+
+def test_torn_line_is_cut_off(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path)))
+    inegleit = new_game(games)
+    with open(str(tmp_path / "1.log"), "a") as logfile:
+        logfile.write('["event_pickup_card",[')
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    restored.restore_games()
+    assert dump(asyncio.run(restored.get_game(1))) == dump(inegleit)
+    assert (tmp_path / "1.log").read_text().endswith("]]\n")
+
+def test_closed_game_is_removed(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path)))
+    new_game(games)
+    asyncio.run(games.close_game(1))
+
+    assert list(tmp_path.iterdir()) == []
+    assert GameManager(event_log=EventLog(str(tmp_path))).restore_games() == 0
+
+def test_restore_reads_only_the_tail(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path), snapshot_interval=10))
+    inegleit = new_game(games)
+    play(games, inegleit, make_bots(["random"] * 3, 3), 25)
+
+    # the commands in the snapshot are not read again
+    _, offset = log_position((tmp_path / "1.snapshot").read_bytes())
+    log = (tmp_path / "1.log").read_bytes()
+    (tmp_path / "1.log").write_bytes(b"x" * offset + log[offset:])
+
+    restored = GameManager(event_log=EventLog(str(tmp_path)))
+    assert restored.restore_games() == 1
+    assert dump(asyncio.run(restored.get_game(1))) == dump(inegleit)
+
+def test_games_forget_stored_commands(tmp_path):
+    games = GameManager(event_log=EventLog(str(tmp_path)), snapshot_interval=10)
+    inegleit = games.games[asyncio.run(games.create_game(seed=4))["game"]["id"]]
+    bots = make_bots(["random"] * 3, 4)
+
+    async def requests():
+        for name in ("bene", "lara", "tom"):
+            await games.execute(inegleit, "add_player", name)
+        for player_id in list(inegleit.players):
+            await games.execute(inegleit, "deal_cards", player_id, 7)
+        await games.execute(inegleit, "start_game")
+        for _ in range(45):
+            player_id = inegleit.get_active_player_id()
+            command, args = bots[player_id - 1].turn(
+                inegleit, player_id, inegleit.get_legal_moves(player_id))
+            await games.execute(inegleit, command, *args)
+            games.save_game(inegleit)
+    asyncio.run(requests())
+
+    assert inegleit.count_moves() > 45
+    assert len(inegleit.moves) < 10
+    assert len(games.store.get_moves(1, inegleit.moves_offset)) == len(inegleit.moves)
+    assert not inegleit.get_move_log()["requestValid"]
+
+    # the full move log is read from the event log
+    log = asyncio.run(games.get_move_log(inegleit))
+    replayed = Inegleit.replay(log["seed"], log["moves"], testcase=log["testcase"],
+                               game_id=1, name=inegleit.name)
+    assert dump(replayed) == dump(inegleit)
+
+def test_directory_is_created_by_the_first_write(tmp_path):
+    directory = tmp_path / "eventlog"
+    games = GameManager(event_log=EventLog(str(directory)))
+    assert not directory.exists()
+    assert games.restore_games() == 0
+
+    new_game(games)
+    assert (directory / "1.log").exists()
@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import json
+import logging
+
+from assets.gameevents import EventExport, JSONFormatter
+from assets.gamemanager import GameManager
+from assets.logqueue import setup_logging
+from eventstats import EventStats, find_files, read_events
+from simulation.bots import make_bots
+from simulation.engine import play_game
+
+
+class Events(logging.Handler):
+    # keeps the exported events
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def emit(self, record):
+        self.events.append(record.msg)
+
+def exporter(name):
+    logger = logging.getLogger("test_gameevents." + name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = Events()
+    logger.addHandler(handler)
+    return EventExport(logger), handler.events
+
+def replay(games, seed, moves):
+    # runs the commands of a simulated game through the manager
+    inegleit = games.games[asyncio.run(games.create_game(seed=seed))["game"]["id"]]
+
+    async def requests():
+        for command, args in moves:
+            await games.execute(inegleit, command, *args)
+    asyncio.run(requests())
+    return inegleit
+
+
+def test_events_of_a_simulated_game():
+    simulated, summary = play_game(make_bots(["random"] * 4, 7), seed=7)
+    export, events = exporter("simulated")
+    inegleit = replay(GameManager(events=export), 7, simulated.moves)
+
+    kinds = [event["event"] for event in events]
+    assert kinds.count("move") == len(inegleit.moves)
+    assert kinds.count("start") == 1
+    assert kinds.count("inegleit") == summary["inegleits"]
+    # the stacks are counted like the simulation does
+    assert [event["penalty"] for event in events
+            if event["event"] == "stack"] == summary["penaltyStacks"]
+    assert [event["rank"] for event in events
+            if event["event"] == "finish"] == [1, 2, 3]
+    assert all(event["game"] == inegleit.game_id for event in events)
+
+def test_replayed_commands_are_not_exported():
+    simulated, _ = play_game(make_bots(["lowest"] * 3, 2), seed=2)
+    export, events = exporter("replayed")
+    games = GameManager(events=export)
+    game_id = replay(games, 2, simulated.moves[:40]).game_id
+    exported = len(events)
+
+    other = GameManager(events=export)
+    game = asyncio.run(games.export_game(game_id))
+    asyncio.run(other.import_game(game_id, game))
+    assert len(events) == exported
+
+def test_statistics_of_the_files(tmp_path):
+    logger = logging.getLogger("test_gameevents.files")
+    listener = setup_logging(logger, str(tmp_path / "events-1.jsonl"),
+                             when="midnight", backup_count=0,
+                             formatter=JSONFormatter())
+    games = GameManager(events=EventExport(logger))
+    stacks = []
+    for seed in range(1, 4):
+        simulated, summary = play_game(make_bots(["random"] * 3, seed), seed)
+        replay(games, seed, simulated.moves)
+        stacks += summary["penaltyStacks"]
+    listener.stop()
+
+    # a rotated and compressed file, and a line torn by a crash
+    lines = (tmp_path / "events-1.jsonl").read_text().splitlines(True)
+    with gzip.open(str(tmp_path / "events-1.jsonl.2026-01-01.gz"), "wt") as outfile:
+        outfile.writelines(lines[:len(lines) // 2])
+    with open(str(tmp_path / "events-1.jsonl"), "w") as outfile:
+        outfile.writelines(lines[len(lines) // 2:])
+        outfile.write('{"event": "mo')
+
+    report = read_events(find_files([str(tmp_path)]), EventStats()).get_report()
+    assert report["games"] == 3
+    assert report["events"] == len(lines)
+    assert report["skipped"] == 1
+    assert report["stacks"]["count"] == len(stacks)
+    assert report["stacks"]["mean"] == sum(stacks) / len(stacks)
+    assert sum(player["wins"] for player in report["players"].values()) == 3
+    assert sum(rule["plays"] for rule in report["rules"].values()) == sum(
+        player["plays"] for player in report["players"].values())
+
+    # the statistics of parts of the files add up
+    first, second = EventStats(), EventStats()
+    for event in map(json.loads, lines[:100]):
+        first.add(event)
+    for event in map(json.loads, lines[100:]):
+        second.add(event)
+    first.merge(second)
+    assert dict(first.get_report(), skipped=1) == report
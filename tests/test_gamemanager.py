@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from assets.gamemanager import GameManager
+
+
+def test_create_and_list_games():
+    games = GameManager()
+    first = asyncio.run(games.create_game("first"))["game"]
+    second = asyncio.run(games.create_game())["game"]
+
+    assert first["id"] != second["id"]
+    assert second["name"] == "Game {}".format(second["id"])
+    assert [game["id"] for game in games.list_games()] == [first["id"], second["id"]]
+
+def test_games_are_independent():
+    games = GameManager()
+    id1 = asyncio.run(games.create_game())["game"]["id"]
+    id2 = asyncio.run(games.create_game())["game"]["id"]
+
+    async def join():
+        assert (await games.join_game(id1, "bene"))["requestValid"]
+        # the same name can be used in another game
+        assert (await games.join_game(id2, "bene"))["requestValid"]
+        assert (await games.join_game(id1, "lara"))["requestValid"]
+
+        assert (await games.get_game(id1)).get_info()["numberOfPlayers"] == 2
+        assert (await games.get_game(id2)).get_info()["numberOfPlayers"] == 1
+    asyncio.run(join())
+
+def test_close_game():
+    games = GameManager()
+    game_id = asyncio.run(games.create_game())["game"]["id"]
+
+    async def close():
+        assert (await games.close_game(game_id))["requestValid"]
+        assert await games.get_game(game_id) is None
+        assert not (await games.close_game(game_id))["requestValid"]
+        assert not (await games.join_game(game_id, "bene"))["requestValid"]
+    asyncio.run(close())
+
+def test_reset_keeps_game_id():
+    games = GameManager()
+    game_id = asyncio.run(games.create_game("table"))["game"]["id"]
+    inegleit = games.games[game_id]
+    asyncio.run(games.join_game(game_id, "bene"))
+
+    inegleit.reset_game(1)
+
+    assert inegleit.get_info() == {"id": game_id, "name": "table",
+                                   "numberOfPlayers": 0, "started": False}
+
+def test_move_game_to_another_manager():
+    source, target = GameManager(), GameManager()
+    game_id = asyncio.run(source.create_game("table", seed=3, game_id=7))["game"]["id"]
+
+    async def move():
+        for name in ("bene", "lara"):
+            await source.join_game(game_id, name)
+        inegleit = await source.get_game(game_id)
+        for player_id in list(inegleit.players):
+            await source.execute(inegleit, "deal_cards", player_id, 7)
+        await source.execute(inegleit, "start_game")
+        source.get_chat(game_id).add_message("bene", "hallo")
+
+        assert not (await source.create_game(game_id=7))["requestValid"]
+        game = await source.export_game(game_id)
+        assert (await target.import_game(game_id, game))["requestValid"]
+        moved = await target.get_game(game_id)
+        assert moved.to_json() == inegleit.to_json()
+        assert moved.count_moves() == inegleit.count_moves()
+        assert target.get_chat(game_id).get_history()["messages"][-1]["text"] == "hallo"
+        assert not (await target.import_game(game_id, game))["requestValid"]
+    asyncio.run(move())
+
+def test_import_rejects_invalid_games():
+    games = GameManager()
+    game = {"name": "table", "messages": [], "moves": 1,
+            "snapshot": "bm90IGEgY2hlY2twb2ludA=="}
+
+    assert not asyncio.run(games.import_game(3, game))["requestValid"]
+    assert asyncio.run(games.get_game(3)) is None
+
+def test_raising_command_leaves_the_stored_game():
+    games = GameManager()
+    game_id = asyncio.run(games.create_game(seed=3))["game"]["id"]
+
+    async def execute():
+        inegleit = await games.get_game(game_id)
+        await games.execute(inegleit, "add_player", "bene")
+        # a command changing the game before it fails
+        del inegleit.players[1]
+        with pytest.raises(KeyError):
+            await games.execute(inegleit, "play_card", 99, 3)
+
+        assert inegleit.get_info()["numberOfPlayers"] == 1
+        assert (await games.execute(inegleit, "add_player", "lara"))["requestValid"]
+        return inegleit
+    inegleit = asyncio.run(execute())
+
+    stored = asyncio.run(GameManager(store=games.store).get_game(game_id))
+    assert stored.to_json() == inegleit.to_json()
@@ -0,0 +1,51 @@
+import random
+
+from assets.deck import create_cards, PLACEHOLDER
+from assets.player import Hand
+
+
+CARDS = create_cards()
+
+def random_hand(rng, n):
+    return Hand(rng.sample(CARDS, n))
+
+def test_list_behaviour():
+    hand = Hand(CARDS[:3])
+    hand.extend([CARDS[10]])
+    hand.remove(CARDS[1])
+
+    assert [card.attr["id"] for card in hand] == [0, 2, 10]
+    assert len(hand) == 3
+    assert CARDS[2] in hand and CARDS[1] not in hand
+    assert not Hand()
+
+def test_buckets():
+    # red 0, red 1, red 1, green 0
+    hand = Hand([CARDS[0], CARDS[1], CARDS[2], CARDS[25]])
+    hand.remove(CARDS[2])
+
+    assert hand.with_color("red") == [0, 1]
+    assert hand.with_number(0) == [0, 25]
+    assert hand.with_color("black") == []
+
+def test_legal_moves_match_card_rules():
+    rng = random.Random(1)
+    for _ in range(200):
+        hand = random_hand(rng, rng.randint(1, 20))
+        top_card = rng.choice(CARDS + [PLACEHOLDER])
+        chosen_color = rng.choice(["red", "green", "blue", "yellow"])
+
+        if top_card.attr["color"] == "black":
+            expected = [card.attr["id"] for card in hand
+                        if card.attr["color"] in ("black", chosen_color)]
+        else:
+            expected = [card.attr["id"] for card in hand
+                        if card.playable(top_card)]
+        raising = [card.attr["id"] for card in hand
+                   if card.able_to_raise_penalty(top_card)]
+        inegleit = [card.attr["id"] for card in hand
+                    if card.inegleitable(top_card)]
+
+        assert hand.legal_moves(top_card, chosen_color) == sorted(expected)
+        assert hand.legal_moves(top_card, chosen_color, penalty=2) == sorted(raising)
+        assert hand.inegleit_moves(top_card) == sorted(inegleit)
@@ -0,0 +1,28 @@
+from assets.game import Inegleit
+
+
+def test_hand_deltas_after_dealing_and_playing():
+    inegleit = Inegleit(seed=1)
+    inegleit.add_player("bene")
+    inegleit.add_player("lara")
+    inegleit.deal_cards(1, 7)
+
+    deltas = inegleit.pop_hand_deltas()
+    dealt = [card["id"] for card in inegleit.get_cards(1)]
+
+    assert list(deltas) == [1]
+    assert deltas[1] == {"version": 1, "since": 0,
+                         "added": dealt, "removed": []}
+    assert inegleit.pop_hand_deltas() == {}
+
+def test_cancelling_changes():
+    inegleit = Inegleit(seed=1)
+    inegleit.add_player("bene")
+    player = inegleit.players[1]
+    card = inegleit.deck.get_card(5)
+
+    player.add_cards([card])
+    player.remove_card(card)
+
+    assert player.pop_hand_delta() is None
+    assert player.get_hand_snapshot() == {"version": 0, "cards": []}
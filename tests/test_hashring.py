@@ -0,0 +1,26 @@
+from assets.hashring import HashRing
+
+
+def test_mapping_is_stable():
+    ring = HashRing(["worker-0", "worker-1", "worker-2"])
+    owners = [ring.get(game_id) for game_id in range(1, 1001)]
+
+    # the order of adding the workers does not matter
+    again = HashRing(["worker-2", "worker-0", "worker-1"])
+    assert [again.get(game_id) for game_id in range(1, 1001)] == owners
+    assert set(owners) == set(ring.workers())
+    assert HashRing().get(1) is None
+
+def test_added_worker_takes_over_a_share():
+    ring = HashRing(["worker-0", "worker-1", "worker-2"])
+    before = {game_id: ring.get(game_id) for game_id in range(1, 4001)}
+    ring.add("worker-3")
+    after = {game_id: ring.get(game_id) for game_id in range(1, 4001)}
+
+    moved = [game_id for game_id in before if before[game_id] != after[game_id]]
+    # only games of the new worker move, about a quarter of them
+    assert all(after[game_id] == "worker-3" for game_id in moved)
+    assert 0.15 < len(moved) / len(before) < 0.35
+
+    ring.remove("worker-3")
+    assert {game_id: ring.get(game_id) for game_id in before} == before
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from assets import insultgenerator
+from assets.insultgenerator import InsultGenerator, InsultPool, compose
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the insult APIs, /slow answers after 2 seconds.
+    """
+    def do_GET(self):
+        if self.path.startswith('/slow'):
+            time.sleep(2)
+            body = 'slow'
+        elif self.path.startswith('/adjective'):
+            body = 'stubby'
+        elif self.path.startswith('/noun'):
+            body = json.dumps([{'word': 'stub'}])
+        elif self.path.startswith('/insult'):
+            body = json.dumps({'insult': 'stub insult'})
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_server():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:{}'.format(server.server_port)
+
+def stub_generator(url, **kwargs):
+    # all APIs on the stub server, mockeries are not stubbed and fail
+    urls = {'adjective_api': url + '/adjective',
+            'noun_api': url + '/noun?rel=',
+            'insult_api': url + '/insult',
+            'mockery_api': url + '/missing'}
+    urls.update(kwargs)
+    return InsultGenerator(**urls)
+
+def run(generator, coroutine):
+    # closes the session of the generator on the loop it was created on
+    async def run_and_close():
+        try:
+            return await coroutine
+        finally:
+            await generator.close()
+    return asyncio.run(run_and_close())
+
+def player(name, **attr):
+    player = {'name': name, 'finished': False, 'penalty': 0, 'king': False,
+              'has_received_initial_cards': True}
+    player.update(attr)
+    return player
+
+
+def test_words_from_stub_server():
+    url = start_stub_server()
+    generator = stub_generator(url)
+
+    words = run(generator, generator.get_words())
+
+    assert words == ('stubby', 'stubby', 'stubby', 'stub')
+
+def test_slow_api_falls_back_to_corpus():
+    url = start_stub_server()
+    generator = stub_generator(url, adjective_api=url + '/slow',
+                               noun_api=url + '/slow?', timeout=0.2)
+
+    start = time.time()
+    adj1, adj2, adj3, noun = run(generator, generator.get_words())
+
+    # the adjectives are fetched concurrently
+    assert time.time() - start < 1
+    assert {adj1, adj2, adj3} <= set(insultgenerator.ADJECTIVES)
+    assert noun in insultgenerator.NOUNS
+
+def test_unreachable_api_falls_back_to_corpus():
+    url = start_stub_server()
+    generator = stub_generator(url, insult_api=url + '/missing')
+
+    assert run(generator, generator.get_insult()) in insultgenerator.INSULTS
+
+def test_failing_api_leaves_no_requests_running():
+    url = start_stub_server()
+    generator = stub_generator(url, adjective_api=url + '/missing')
+
+    async def get_words():
+        try:
+            await generator.get_words(offline=False)
+        except Exception:
+            # the other adjectives are not left fetching in the background
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert run(generator, get_words()) == set()
+
+def test_compose():
+    sender, receiver = player('bene'), player('lara')
+    words = ('slimy', 'soggy', 'lumpy', 'toad')
+
+    assert (compose(sender, receiver, 0.65, words)
+            == 'bene just called lara a slimy, soggy toad!')
+    assert (compose(sender, receiver, 0.75, insult='stub insult')
+            == 'bene yells at lara: stub insult')
+
+def test_pool_prefetches_words():
+    url = start_stub_server()
+    pool = InsultPool(stub_generator(url), size=4)
+
+    async def fill_and_take():
+        pool.start()
+        await asyncio.sleep(0.5)
+        items = [pool.take("words") for _ in range(4)]
+        pool.stop()
+        await pool.generator.close()
+        return items
+
+    items = asyncio.run(fill_and_take())
+
+    assert items == [('stubby', 'stubby', 'stubby', 'stub')] * 4
+    assert pool.get_stats()["words"]["hits"] == 4
+    assert pool.get_stats()["words"]["misses"] == 0
+
+def test_pool_backs_off_and_misses_when_api_fails():
+    url = start_stub_server()
+    pool = InsultPool(stub_generator(url), size=2)
+
+    async def take_while_failing():
+        pool.start()
+        await asyncio.sleep(0.3)
+        item = pool.take("mockeries")
+        pool.stop()
+        await pool.generator.close()
+        return item
+
+    item = asyncio.run(take_while_failing())
+    stats = pool.get_stats()["mockeries"]
+
+    assert item in insultgenerator.MOCKERIES
+    assert stats["misses"] == 1
+    # the first refill failed, the retry waits for the backoff
+    assert stats["failures"] == 2
@@ -0,0 +1,95 @@
+import copy
+
+from assets.game import Inegleit
+
+
+def new_game(seed, n_players=3):
+    inegleit = Inegleit(seed=seed)
+    for i in range(n_players):
+        inegleit.add_player("player{}".format(i))
+        inegleit.deal_cards(i + 1, 7)
+    inegleit.start_game()
+    return inegleit
+
+def play(inegleit, player_id, card_id):
+    if inegleit.deck.get_card(card_id).attr["color"] == "black":
+        return inegleit.play_black_card(player_id, card_id)
+    return inegleit.play_card(player_id, card_id)
+
+def check_against_validate_move(inegleit, player_id):
+    moves = inegleit.get_legal_moves(player_id)
+    allowed = set(moves["play"]) | set(moves["inegleit"])
+
+    for card in inegleit.players[player_id].attr["hand"]:
+        card_id = card.attr["id"]
+        response = play(copy.deepcopy(inegleit), player_id, card_id)
+        assert response["requestValid"] == (card_id in allowed), (
+            moves, card, response)
+
+def test_cached_until_state_changes():
+    inegleit = new_game(seed=1)
+
+    moves = inegleit.get_legal_moves(1)
+    assert inegleit.get_legal_moves(1) is moves
+    assert moves["version"] == inegleit.version
+
+    inegleit.event_cant_play(1)
+    assert inegleit.get_legal_moves(1) is not moves
+    assert inegleit.get_legal_moves(1)["play"] == []
+
+def test_unknown_player():
+    inegleit = new_game(seed=1)
+    assert not inegleit.get_legal_moves(42)["requestValid"]
+
+def test_moves_match_validate_move():
+    for seed in range(5):
+        inegleit = new_game(seed)
+
+        for _ in range(40):
+            for player_id in inegleit.players:
+                check_against_validate_move(inegleit, player_id)
+
+            player_id = inegleit.get_active_player_id()
+            moves = inegleit.get_legal_moves(player_id)
+
+            if moves["chooseColor"]:
+                response = inegleit.event_choose_color(player_id, "red")
+            elif moves["play"]:
+                response = play(inegleit, player_id, moves["play"][0])
+            elif moves["sayUnoFirst"]:
+                response = inegleit.event_uno(player_id)
+            elif moves["canPickUp"]:
+                response = inegleit.event_pickup_card(player_id)
+            else:
+                response = inegleit.event_cant_play(player_id)
+
+            assert response["requestValid"], (moves, response)
+
+            if any(p.attr["finished"] for p in inegleit.players.values()):
+                break
+
+def test_last_card_on_chosen_color_needs_uno():
+    inegleit = new_game(seed=1)
+    player_id = inegleit.get_active_player_id()
+    player = inegleit.players[player_id]
+    card = next(card for card in player.attr["hand"]
+                if card.attr["color"] != "black")
+    for other in list(player.attr["hand"]):
+        if other is not card:
+            player.remove_card(other)
+    # a black card lies on top, the color of the last card is chosen
+    black = next(card for card in inegleit.deck.allcards
+                 if card.attr["color"] == "black")
+    inegleit.deck.pile.append(black)
+    inegleit.chosen_color = card.attr["color"]
+    inegleit.publish()
+
+    moves = inegleit.get_legal_moves(player_id)
+    assert moves["play"] == [] and moves["sayUnoFirst"]
+    check_against_validate_move(inegleit, player_id)
+
+    inegleit.event_uno(player_id)
+    assert inegleit.get_legal_moves(player_id)["play"] == [card.attr["id"]]
+    response = inegleit.play_card(player_id, card.attr["id"])
+    assert response["requestValid"] and "playerFinished" in response
+    assert inegleit.chosen_color == ""
@@ -0,0 +1,41 @@
+import logging
+import threading
+
+from assets.logqueue import setup_logging
+
+
+class Card():
+    # remembers the thread formatting it
+    threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "red 7"
+
+def test_records_are_formatted_and_written_in_the_background(tmp_path):
+    logger = logging.getLogger("test_logqueue.background")
+    path = tmp_path / "inegleit.log"
+    listener = setup_logging(logger, str(path), level="INFO")
+
+    logger.info("%s played %s", "bene", Card())
+    logger.debug("%s is not logged", Card())
+    listener.stop()
+
+    assert path.read_text().splitlines()[-1].endswith("INFO - bene played red 7")
+    assert "not logged" not in path.read_text()
+    assert Card.threads and threading.main_thread() not in Card.threads
+
+def test_log_is_rotated(tmp_path):
+    logger = logging.getLogger("test_logqueue.rotation")
+    path = tmp_path / "inegleit.log"
+    listener = setup_logging(logger, str(path), level="DEBUG", max_bytes=1000,
+                             backup_count=2)
+
+    for i in range(200):
+        logger.debug("move %s", i)
+    listener.stop()
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["inegleit.log", "inegleit.log.1", "inegleit.log.2"]
+    assert all(p.stat().st_size <= 1000 for p in tmp_path.iterdir())
+    assert "move 199" in path.read_text()
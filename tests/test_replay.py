@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from assets.game import Inegleit
+
+
+def play_some_moves(inegleit, n=60):
+    # lets the active player do the first legal move
+    for _ in range(n):
+        player_id = inegleit.get_active_player_id()
+        moves = inegleit.get_legal_moves(player_id)
+
+        if moves["chooseColor"]:
+            inegleit.event_choose_color(player_id, "blue")
+        elif moves["play"]:
+            card_id = moves["play"][0]
+            if inegleit.deck.get_card(card_id).attr["color"] == "black":
+                inegleit.play_black_card(player_id, card_id)
+            else:
+                inegleit.play_card(player_id, card_id)
+        elif moves["canPickUp"]:
+            inegleit.event_pickup_card(player_id)
+        else:
+            inegleit.event_cant_play(player_id)
+
+def new_game(seed=None):
+    inegleit = Inegleit(seed=seed)
+    for name in ("bene", "lara", "tom"):
+        inegleit.add_player(name)
+    for player_id in inegleit.players:
+        inegleit.deal_cards(player_id, 7)
+    inegleit.start_game()
+    return inegleit
+
+def hands(inegleit):
+    return {player_id: inegleit.get_cards(player_id)
+            for player_id in inegleit.players}
+
+def test_games_do_not_share_the_generator():
+    first = new_game(seed=7)
+    random.seed(1)
+    new_game(seed=8)
+    second = new_game(seed=7)
+
+    assert hands(first) == hands(second)
+    assert list(first.deck.draw) == list(second.deck.draw)
+
+def test_replay_from_move_log():
+    inegleit = new_game()
+    play_some_moves(inegleit)
+    inegleit.reset_game(1)
+    for name in ("anna", "lara"):
+        inegleit.add_player(name)
+        inegleit.deal_cards(inegleit.unique_id - 1, 7)
+    inegleit.start_game()
+    play_some_moves(inegleit, 20)
+
+    log = inegleit.get_move_log()
+    replayed = Inegleit.replay(log["seed"], log["moves"])
+
+    assert replayed.get_state() == inegleit.get_state()
+    assert hands(replayed) == hands(inegleit)
+    assert list(replayed.deck.draw) == list(inegleit.deck.draw)
+    assert replayed.moves == inegleit.moves
+
+def test_replay_runs_only_recorded_commands():
+    for move in (["load_json", [{}]], ["to_json", []], ["add_player", "bene"]):
+        with pytest.raises(ValueError):
+            Inegleit.replay(1, [move])
+
+def test_raising_command_is_not_logged():
+    inegleit = Inegleit(seed=3)
+    inegleit.add_player("bene")
+    with pytest.raises(KeyError):
+        inegleit.play_card(99, 3)
+    inegleit.add_player("lara")
+
+    log = inegleit.get_move_log()
+    replayed = Inegleit.replay(log["seed"], log["moves"])
+
+    assert log["moves"] == [["add_player", ["bene"]], ["add_player", ["lara"]]]
+    assert replayed.get_state() == inegleit.get_state()
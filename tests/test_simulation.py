@@ -0,0 +1,74 @@
+import pytest
+
+from assets.game import Inegleit
+from simulation.bots import Bot, make_bots
+from simulation.engine import play_game, simulate
+from simulation.parallel import simulate_parallel
+from simulation.stats import MAX_SEEDS, Stats
+
+
+def test_same_seed_same_game():
+    policies = ["lowest", "random", "random"]
+    first, result = play_game(make_bots(policies, 3), seed=3)
+    second, again = play_game(make_bots(policies, 3), seed=3)
+
+    assert result == again
+    assert first.moves == second.moves
+    assert result["finished"]
+    assert len(result["winners"]) == 2
+
+def test_replay_simulated_game():
+    inegleit, result = play_game(make_bots(["random"] * 4, 5), seed=5)
+
+    log = inegleit.get_move_log()
+    replayed = Inegleit.replay(log["seed"], log["moves"])
+
+    assert replayed.get_state() == inegleit.get_state()
+    assert replayed.winners == inegleit.winners
+
+def test_simulate_many_games():
+    stats = simulate(50, ["random", "random", "lowest"], seed=1)
+    report = stats.get_report()
+
+    assert report["games"] == 50
+    assert report["errorCount"] == 0
+    assert report["errors"] == []
+    assert report["unfinishedCount"] == 0
+    assert report["unfinished"] == []
+    assert sum(report["lengths"].values()) == 50
+    assert all(size >= 2 for size in report["penaltyStacks"])
+
+def test_merged_stats_equal_single_run():
+    single = simulate(20, ["random", "lowest"], seed=2)
+    merged = simulate(10, ["random", "lowest"], seed=3)
+    merged.merge(simulate(10, ["random", "lowest"], seed=4))
+
+    # the same number of games, reduced in two parts
+    assert merged.games == single.games
+    assert merged.seats == {0: 20, 1: 20}
+    assert sum(merged.wins.values()) == 20
+
+def test_errors_beyond_the_kept_seeds_are_counted():
+    first, second = Stats(), Stats()
+    for seed in range(MAX_SEEDS + 5):
+        first.add_error(seed, ValueError(seed))
+    second.add_error(-1, ValueError(-1))
+
+    report = first.merge(second).get_report()
+    assert report["errorCount"] == MAX_SEEDS + 6
+    assert len(report["errors"]) == MAX_SEEDS
+
+def test_parallel_result_independent_of_workers():
+    policies = ["random", "random", "random"]
+    one = simulate_parallel(30, policies, seed=5, workers=1, chunk_size=7)
+    two = simulate_parallel(30, policies, seed=5, workers=2, chunk_size=7)
+
+    assert one.get_report() == two.get_report()
+    assert one.games == 30
+
+def test_policies_implement_turn():
+    class Idle(Bot):
+        pass
+
+    with pytest.raises(TypeError):
+        Idle()
@@ -0,0 +1,60 @@
+from assets.game import Inegleit
+
+
+def new_game():
+    inegleit = Inegleit(seed=1)
+    inegleit.add_player("bene")
+    inegleit.add_player("lara")
+    inegleit.pop_delta()
+    return inegleit
+
+def test_no_delta_without_change():
+    inegleit = new_game()
+    version = inegleit.version
+
+    inegleit.get_cards(1)
+    inegleit.get_all_players()
+
+    assert inegleit.pop_delta() is None
+    assert inegleit.version == version
+
+def test_delta_contains_only_changed_fields():
+    inegleit = new_game()
+    version = inegleit.version
+
+    inegleit.deal_cards(2, 7)
+    delta = inegleit.pop_delta()
+
+    assert delta["since"] == version
+    assert delta["version"] > version
+    assert "changes" not in delta
+    assert delta["players"] == {2: {"numberOfCards": 7,
+                                    "gotInitialCards": True}}
+
+def test_deltas_are_consecutive():
+    inegleit = new_game()
+    inegleit.start_game()
+    first = inegleit.pop_delta()
+    inegleit.event_cant_play(1)
+    second = inegleit.pop_delta()
+
+    assert first["changes"]["topCard"] == inegleit.get_top_card()
+    assert second["since"] == first["version"]
+    assert second["changes"] == {"turn": 2, "activePlayerName": "lara"}
+
+def test_reset_removes_players_and_keeps_version():
+    inegleit = new_game()
+    version = inegleit.version
+
+    inegleit.reset_game(1)
+    delta = inegleit.pop_delta()
+
+    assert delta["since"] == version
+    assert sorted(delta["removedPlayers"]) == [1, 2]
+
+def test_snapshot():
+    inegleit = new_game()
+    snapshot = inegleit.get_snapshot()
+
+    assert snapshot["version"] == inegleit.version
+    assert [p["name"] for p in snapshot["state"]["players"]] == ["bene", "lara"]
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+
+from assets.gamemanager import GameManager
+from assets.store import SQLiteStore
+from simulation.bots import make_bots
+
+
+def workers(tmp_path, n=2, **kwargs):
+    # game managers of n processes sharing the database
+    path = str(tmp_path / "games.db")
+    return [GameManager(store=SQLiteStore(path), **kwargs) for _ in range(n)]
+
+def play(managers, game_id, bots, n):
+    # the workers take turns serving the requests
+    async def requests():
+        for i in range(n):
+            games = managers[i % len(managers)]
+            inegleit = await games.get_game(game_id)
+            player_id = inegleit.get_active_player_id()
+            moves = inegleit.get_legal_moves(player_id)
+            command, args = bots[player_id - 1].turn(inegleit, player_id, moves)
+            await games.execute(inegleit, command, *args)
+    asyncio.run(requests())
+
+def setup_game(games, seed=5):
+    game_id = asyncio.run(games.create_game(seed=seed))["game"]["id"]
+
+    async def requests():
+        for name in ("bene", "lara", "tom"):
+            await games.join_game(game_id, name)
+        inegleit = await games.get_game(game_id)
+        for player_id in list(inegleit.players):
+            await games.execute(inegleit, "deal_cards", player_id, 7)
+        await games.execute(inegleit, "start_game")
+    asyncio.run(requests())
+    return game_id
+
+def get_game(games, game_id):
+    return asyncio.run(games.get_game(game_id))
+
+def dump(inegleit):
+    return json.dumps(inegleit.to_json(), sort_keys=True)
+
+
+def test_workers_serve_the_same_game(tmp_path):
+    first, second = workers(tmp_path, snapshot_interval=10)
+    game_id = setup_game(first)
+    play([first, second], game_id, make_bots(["random"] * 3, 5), 60)
+
+    # a third process loads the game from a snapshot and the tail
+    third, = workers(tmp_path, 1)
+    assert dump(get_game(first, game_id)) == dump(get_game(second, game_id))
+    assert dump(get_game(third, game_id)) == dump(get_game(first, game_id))
+    assert (get_game(third, game_id).count_moves()
+            == get_game(first, game_id).count_moves())
+    assert third.snapshots[game_id] > 0
+
+def test_snapshot_prunes_the_moves(tmp_path):
+    games, = workers(tmp_path, 1, snapshot_interval=10)
+    game_id = setup_game(games)
+    play([games], game_id, make_bots(["random"] * 3, 5), 40)
+
+    snapshot_moves = games.store.load_snapshot(game_id)[0]
+    assert snapshot_moves > 0
+    first, = games.store.connect().execute(
+        "SELECT MIN(seq) FROM moves WHERE game_id = ?", (game_id,)).fetchone()
+    assert first is None or first >= snapshot_moves
+    assert len(games.store.get_moves(game_id, snapshot_moves)) == \
+        get_game(games, game_id).count_moves() - snapshot_moves
+
+def test_stale_worker_runs_the_command_again(tmp_path):
+    first, second = workers(tmp_path)
+    game_id = setup_game(first)
+
+    stale = get_game(second, game_id)
+    inegleit = get_game(first, game_id)
+    player_id = inegleit.get_active_player_id()
+    asyncio.run(first.execute(inegleit, "event_pickup_card", player_id))
+
+    # the second worker did not see the pickup, the store refuses its
+    # append and the command is run on the latest state
+    stale.event_cant_play(player_id)
+    assert not second.store.append_moves(game_id, stale.count_moves() - 1,
+                                         stale.moves[-1:], stale.get_info())
+    second.restore(stale, *second.fetch_game(game_id))
+    response = asyncio.run(second.execute(stale, "event_cant_play", player_id))
+
+    assert response["requestValid"]
+    assert dump(get_game(first, game_id)) == dump(get_game(second, game_id))
+
+def test_hand_deltas_of_different_workers_fit(tmp_path):
+    first, second = workers(tmp_path)
+    game_id = setup_game(first)
+    clients = {}    # {player_id: (version, card ids)}
+
+    for games in (first, second, second, first, second) * 3:
+        play([games], game_id, make_bots(["lowest"] * 3, 1), 2)
+        inegleit = get_game(games, game_id)
+        for player_id, delta in inegleit.pop_hand_deltas().items():
+            version, cards = clients.get(player_id, (0, set()))
+            # a delta is only applied on the version it starts from
+            if version == delta["since"]:
+                cards = (cards | set(delta["added"])) - set(delta["removed"])
+                clients[player_id] = delta["version"], cards
+            else:
+                snapshot = inegleit.players[player_id].get_hand_snapshot()
+                clients[player_id] = (snapshot["version"],
+                                      {card["id"] for card in snapshot["cards"]})
+
+    inegleit = get_game(first, game_id)
+    for player_id, (version, cards) in clients.items():
+        assert cards == {card["id"] for card in inegleit.get_cards(player_id)}
+
+def test_chat_and_close_are_shared(tmp_path):
+    first, second = workers(tmp_path)
+    game_id = asyncio.run(first.create_game("table"))["game"]["id"]
+
+    first.get_chat(game_id).add_message("bene", "hallo")
+    second.get_chat(game_id).add_message("lara", "hoi")
+    history = first.get_chat(game_id).get_history(limit=2)
+    assert [m["text"] for m in history["messages"]] == ["hallo", "hoi"]
+    assert history["hasMore"]
+
+    assert [game["name"] for game in second.list_games()] == ["table"]
+    assert asyncio.run(second.close_game(game_id))["requestValid"]
+    assert get_game(first, game_id) is None
+    assert first.list_games() == []
+
+class SlowStore(SQLiteStore):
+    # the calls of get_moves wait for the given delays in turn
+
+    delays = ()
+
+    def get_moves(self, game_id, start=0):
+        if self.delays:
+            time.sleep(self.delays[0])
+            self.delays = self.delays[1:]
+        return super().get_moves(game_id, start)
+
+def test_refresh_and_execute_are_serialized(tmp_path):
+    second, = workers(tmp_path, 1)
+    first = GameManager(store=SlowStore(str(tmp_path / "games.db")))
+    game_id = setup_game(first)
+    inegleit = get_game(first, game_id)
+    # the game of first falls behind
+    play([second], game_id, make_bots(["random"] * 3, 5), 20)
+    player_id = get_game(second, game_id).get_active_player_id()
+
+    async def requests():
+        # the refresh gets the stored commands only after the command ran
+        first.store.delays = (0, 0.1)
+        await asyncio.gather(
+            first.execute(inegleit, "event_pickup_card", player_id),
+            first.get_game(game_id))
+    asyncio.run(requests())
+
+    stored = get_game(workers(tmp_path, 1)[0], game_id)
+    assert inegleit.count_moves() == stored.count_moves()
+    assert dump(inegleit) == dump(stored)
+
+class SlowCheckStore(SQLiteStore):
+    # both requests check the id before either creates the game
+
+    def has_game(self, game_id):
+        time.sleep(0.05)
+        return super().has_game(game_id)
+
+def test_concurrent_creates_get_their_own_ids(tmp_path):
+    games = GameManager(store=SlowCheckStore(str(tmp_path / "games.db")))
+
+    async def requests():
+        return await asyncio.gather(*[games.create_game(game_id=game_id)
+                                      for game_id in (7, 7, None, None)])
+    responses = asyncio.run(requests())
+
+    assert [response["requestValid"] for response in responses] == [True, False, True, True]
+    assert len({response["game"]["id"] for response in responses
+                if response["requestValid"]}) == 3